@@ -0,0 +1,564 @@
+#!/usr/bin/env python3
+"""
+Autocomplete index for Seoltoir browser.
+Keeps history and bookmarks in memory as prefix-searchable host, path and
+title tokens ranked by frecency, so omnibox suggestions never wait on the
+database. A trigram index over host and title tokens corrects typos.
+"""
+
+import bisect
+import heapq
+from collections import Counter
+import math
+import re
+import threading
+import time
+from datetime import datetime
+
+from .debug import debug_print
+from .database import FRECENCY_HALF_LIFE_DAYS
+
+TOKEN_PATTERN = re.compile(r"\w+")
+SCHEME_PATTERN = re.compile(r"^[a-z][a-z0-9+.-]*://")
+
+# frecency = visits * 0.5 ** (age / half-life), so log2(frecency) differs from
+# log2(visits) + last_visit / half-life only by a term that is the same for every
+# entry: ranking by the latter never needs updating as time passes
+HALF_LIFE_SECONDS = FRECENCY_HALF_LIFE_DAYS * 86400
+# A bookmark ranks like twice the visits
+BOOKMARK_BONUS = 1.0
+
+
+def strip_url(url: str) -> str:
+    """Lowercases a URL and drops the scheme and a leading "www."."""
+    url = SCHEME_PATTERN.sub("", (url or "").strip().lower())
+    return url[4:] if url.startswith("www.") else url
+
+
+def bounded_prefix_distance(word: str, token: str, max_distance: int) -> tuple[int, int]:
+    """Fewest edits turning word into a prefix of token, and that prefix's length.
+
+    Adjacent transpositions count as one edit. The distance is max_distance + 1
+    once it is certainly larger than max_distance.
+    """
+    a, b = word, token[:len(word) + max_distance]
+    if len(b) < len(a) - max_distance:
+        return max_distance + 1, 0
+    # Only cells within max_distance of the diagonal can stay within the bound
+    too_far = max_distance + 1
+    before_previous = None
+    previous = [j if j <= max_distance else too_far for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [too_far] * (len(b) + 1)
+        if i <= max_distance:
+            current[0] = i
+        for j in range(max(1, i - max_distance), min(len(b), i + max_distance) + 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before_previous[j - 2] + 1)
+            current[j] = value
+        if min(current) > max_distance:
+            return too_far, 0
+        before_previous, previous = previous, current
+    # The word may be a prefix of the token, so any prefix of about its length will do
+    length = min(range(max(len(a) - max_distance, 0), len(b) + 1), key=lambda j: previous[j])
+    return min(previous[length], too_far), length
+
+
+def trigrams(word: str) -> set[str]:
+    """Trigrams of a word padded at the start, so that leading letters weigh more."""
+    word = "^^" + word
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def _timestamp(value) -> float:
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class _Entry:
+    """A history entry or bookmark in the index."""
+    __slots__ = ("url", "title", "visit_count", "last_visit", "is_bookmark", "rank")
+
+    def __init__(self, url, title, visit_count, last_visit, is_bookmark):
+        self.url = url
+        self.title = title or ""
+        self.visit_count = visit_count
+        self.last_visit = last_visit
+        self.is_bookmark = is_bookmark
+        self.rank = 0.0
+        self.update_rank()
+
+    def update_rank(self):
+        self.rank = (math.log2(max(self.visit_count, 1)) + self.last_visit / HALF_LIFE_SECONDS
+                     + (BOOKMARK_BONUS if self.is_bookmark else 0.0))
+
+
+class AutocompleteIndex:
+    """Ranked prefix search over history and bookmarks, kept current through database change events."""
+
+    # Prefixes up to this length always have a precomputed list of their best entries
+    TOP_PREFIX_LENGTH = 3
+    # Entries kept per precomputed prefix
+    TOP_K = 32
+    # Host, path and title tokens indexed per entry
+    MAX_TOKENS_PER_ENTRY = 24
+    MAX_TOKEN_LENGTH = 40
+    # Most entries looked at when a prefix has no precomputed list
+    MAX_SCAN = 5000
+    # History rows loaded per database query while building
+    BUILD_BATCH_SIZE = 5000
+    # Query words at least this long are also matched with typos
+    FUZZY_MIN_LENGTH = 4
+    # Host and title tokens sharing a trigram with a word that get their edit distance checked
+    FUZZY_VERIFY_LIMIT = 48
+    # Trigrams in more tokens than this are too common to find typos with
+    FUZZY_MAX_TRIGRAM_TOKENS = 20000
+    # Corrections tried per query word
+    FUZZY_MAX_CORRECTIONS = 5
+    # Rank lost per edit; one edit ranks like an eighth of the visits
+    FUZZY_PENALTY = 3.0
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = []        # doc id -> _Entry, None once removed
+        self.doc_ids = {}        # url -> doc id
+        self.postings = {}       # token -> doc ids
+        self.sorted_tokens = []  # every token, sorted, so a prefix is a contiguous range
+        self.top_entries = {}    # prefix -> doc ids of its best entries, best first
+        self.fuzzy_tokens = set()  # host and title tokens, the vocabulary typos are corrected to
+        self.trigram_tokens = {}   # trigram -> fuzzy tokens containing it
+        self.corrections_cache = {}  # query word -> corrections, while the vocabulary is unchanged
+        self.pending_events = []
+
+        self.is_ready = False
+        self.is_building = False
+        self.is_stopped = False
+
+        # Statistics
+        self.build_seconds = 0.0
+        self.queries = 0
+        self.last_query_ms = 0.0
+
+    @classmethod
+    def tokenize(cls, url: str, title: str) -> list[str]:
+        """Host labels and path segments of a URL (without its query) and the words of its title."""
+        stripped = strip_url(url)
+        for separator in ("?", "#"):
+            stripped = stripped.split(separator, 1)[0]
+        words = TOKEN_PATTERN.findall(stripped + " " + (title or "").lower())
+        tokens = [word for word in dict.fromkeys(words) if 1 < len(word) <= cls.MAX_TOKEN_LENGTH]
+        return tokens[:cls.MAX_TOKENS_PER_ENTRY]
+
+    @classmethod
+    def host_and_title_tokens(cls, url: str, title: str) -> list[str]:
+        """Tokens of the host and title only; path segments are too arbitrary to correct typos to."""
+        host = re.split(r"[/?#]", strip_url(url), 1)[0]
+        words = TOKEN_PATTERN.findall(host + " " + (title or "").lower())
+        return [word for word in dict.fromkeys(words) if cls.FUZZY_MIN_LENGTH <= len(word) <= cls.MAX_TOKEN_LENGTH]
+
+    # Building
+
+    def start_build(self, db_manager):
+        """Load history and bookmarks in a background thread; search() returns nothing until done."""
+        if self.is_building or self.is_ready:
+            return
+        self.is_building = True
+        threading.Thread(target=self.build, args=(db_manager,), daemon=True).start()
+
+    def build(self, db_manager):
+        """Load history and bookmarks, then apply the changes queued meanwhile."""
+        self.is_building = True
+        started = time.perf_counter()
+        try:
+            for url, title, added_date in db_manager.get_bookmarks():
+                self._add_entry(url, title, 0, _timestamp(added_date), True)
+
+            after_id = 0
+            while not self.is_stopped:
+                rows = db_manager.get_history_batch(after_id, self.BUILD_BATCH_SIZE)
+                if not rows:
+                    break
+                for _, url, title, visit_count, last_visit in rows:
+                    self._add_entry(url, title, visit_count or 1, _timestamp(last_visit), False)
+                after_id = rows[-1][0]
+                time.sleep(0)  # Hand the GIL back to the UI between batches
+
+            self._rebuild_top_entries()
+            self._rebuild_trigrams()
+        except Exception as e:
+            debug_print(f"[OMNIBOX] Error building autocomplete index: {e}")
+            with self.lock:
+                # The omnibox keeps querying the database
+                self.is_stopped = True
+                self.is_building = False
+                self.pending_events = []
+            return
+
+        with self.lock:
+            self.is_ready = True
+            self.is_building = False
+            # Changes made while building were queued, apply them on top of what was loaded
+            for event, data in self.pending_events:
+                self._apply(event, data)
+            self.pending_events = []
+        self.build_seconds = time.perf_counter() - started
+        debug_print(f"[OMNIBOX] Autocomplete index built: {len(self.doc_ids)} entries, "
+                    f"{len(self.postings)} tokens in {self.build_seconds:.2f}s")
+
+    def _rebuild_top_entries(self):
+        """Sort the tokens and fill the prefix lists, walking entries from best to worst."""
+        self.sorted_tokens = sorted(self.postings)
+        # Tokens shared by many entries get lists for all of their prefixes, not just the short ones
+        hot_prefixes = {token[:end] for token, docs in self.postings.items() if len(docs) > self.TOP_K
+                        for end in range(self.TOP_PREFIX_LENGTH + 1, len(token) + 1)}
+
+        top_entries = {}
+        # Tokens whose prefix lists are all full; no later (worse) entry can get into them
+        saturated_tokens = set()
+        live = [doc_id for doc_id, entry in enumerate(self.entries) if entry is not None]
+        live.sort(key=lambda doc_id: self.entries[doc_id].rank, reverse=True)
+        for doc_id in live:
+            entry = self.entries[doc_id]
+            for token in self.tokenize(entry.url, entry.title):
+                if token in saturated_tokens:
+                    continue
+                is_saturated = True
+                for end in range(1, len(token) + 1):
+                    prefix = token[:end]
+                    if end > self.TOP_PREFIX_LENGTH and prefix not in hot_prefixes:
+                        break
+                    top = top_entries.get(prefix)
+                    if top is None:
+                        top_entries[prefix] = top = [doc_id]
+                    elif len(top) < self.TOP_K and top[-1] != doc_id:
+                        top.append(doc_id)
+                    is_saturated = is_saturated and len(top) >= self.TOP_K
+                if is_saturated:
+                    saturated_tokens.add(token)
+        self.top_entries = top_entries
+
+    # Updates
+
+    def on_database_change(self, event: str, data: dict):
+        """DatabaseManager change listener; may be called from any thread."""
+        with self.lock:
+            if self.is_ready:
+                self._apply(event, data)
+            elif not self.is_stopped:
+                self.pending_events.append((event, data))
+
+    def _apply(self, event: str, data: dict):
+        if event == "visit":
+            self._add_entry(data["url"], data["title"], 1, _timestamp(data["time"]), False, is_visit=True)
+        elif event == "bookmark-added":
+            self._add_entry(data["url"], data["title"], 0, _timestamp(data["time"]), True)
+        elif event == "bookmark-removed":
+            self._unmark(data["url"], bookmark=True)
+        elif event == "history-removed":
+            for url in data["urls"]:
+                self._unmark(url, bookmark=False)
+        elif event == "history-cleared":
+            self._clear_history()
+
+    def _add_entry(self, url: str, title: str, visit_count: int, last_visit: float,
+                   is_bookmark: bool, is_visit: bool = False):
+        doc_id = self.doc_ids.get(url)
+        if doc_id is None:
+            doc_id = len(self.entries)
+            entry = _Entry(url, title, visit_count, last_visit, is_bookmark)
+            self.entries.append(entry)
+            self.doc_ids[url] = doc_id
+            self._add_postings(doc_id, self.tokenize(url, entry.title))
+            self._add_fuzzy_tokens(self.host_and_title_tokens(url, entry.title))
+        else:
+            entry = self.entries[doc_id]
+            if is_visit:
+                entry.visit_count += 1
+            else:
+                entry.visit_count = max(entry.visit_count, visit_count)
+            entry.last_visit = max(entry.last_visit, last_visit)
+            entry.is_bookmark = entry.is_bookmark or is_bookmark
+            if title and title != entry.title:
+                entry.title = title
+                # Tokens of the old title stay posted; search() checks candidates against the current ones
+                self._add_postings(doc_id, self.tokenize(url, title))
+                self._add_fuzzy_tokens(self.host_and_title_tokens(url, title))
+            entry.update_rank()
+
+        if self.is_ready:
+            self._promote(doc_id)
+
+    def _add_postings(self, doc_id: int, tokens: list[str]):
+        for token in tokens:
+            docs = self.postings.get(token)
+            if docs is None:
+                self.postings[token] = [doc_id]
+                if self.is_ready:
+                    bisect.insort(self.sorted_tokens, token)
+            elif docs[-1] != doc_id:
+                docs.append(doc_id)
+
+    def _add_fuzzy_tokens(self, tokens: list[str]):
+        for token in tokens:
+            if token not in self.fuzzy_tokens:
+                self.fuzzy_tokens.add(token)
+                self.corrections_cache.clear()
+                if self.is_ready:
+                    for trigram in trigrams(token):
+                        self.trigram_tokens.setdefault(trigram, []).append(token)
+
+    def _rebuild_trigrams(self):
+        trigram_tokens = {}
+        # Tokens on the most pages come first in every list
+        for token in sorted(self.fuzzy_tokens, key=lambda token: len(self.postings.get(token, ())), reverse=True):
+            for trigram in trigrams(token):
+                tokens = trigram_tokens.get(trigram)
+                if tokens is None:
+                    trigram_tokens[trigram] = [token]
+                else:
+                    tokens.append(token)
+        self.trigram_tokens = trigram_tokens
+
+    def _unmark(self, url: str, bookmark: bool):
+        """Drop the bookmark or the visits of an entry, and the entry once it has neither."""
+        doc_id = self.doc_ids.get(url)
+        if doc_id is None:
+            return
+        entry = self.entries[doc_id]
+        if bookmark:
+            entry.is_bookmark = False
+        else:
+            entry.visit_count = 0
+
+        self._withdraw(doc_id)
+        if entry.is_bookmark or entry.visit_count:
+            entry.update_rank()
+            self._promote(doc_id)
+        else:
+            # Postings keep the id; it is skipped from now on
+            self.entries[doc_id] = None
+            del self.doc_ids[url]
+
+    def _clear_history(self):
+        bookmarks = [entry for entry in self.entries if entry is not None and entry.is_bookmark]
+        self.entries = []
+        self.doc_ids = {}
+        self.postings = {}
+        self.fuzzy_tokens = set()
+        self.corrections_cache = {}
+        # Reload the bookmarks like a build, without keeping the views current one entry at a time
+        self.is_ready = False
+        for entry in bookmarks:
+            self._add_entry(entry.url, entry.title, 0, entry.last_visit, True)
+        self._rebuild_top_entries()
+        self._rebuild_trigrams()
+        self.is_ready = True
+
+    def _rank(self, doc_id: int) -> float:
+        entry = self.entries[doc_id]
+        return entry.rank if entry is not None else -math.inf
+
+    def _prefixes(self, doc_id: int):
+        entry = self.entries[doc_id]
+        prefixes = set()
+        for token in self.tokenize(entry.url, entry.title):
+            for end in range(1, len(token) + 1):
+                if token[:end] in self.top_entries:
+                    prefixes.add(token[:end])
+        return prefixes
+
+    def _promote(self, doc_id: int):
+        """Place an entry whose rank went up in the prefix lists it now belongs to."""
+        rank = self.entries[doc_id].rank
+        for prefix in self._prefixes(doc_id):
+            top = self.top_entries[prefix]
+            if doc_id in top:
+                top.remove(doc_id)
+            if len(top) >= self.TOP_K and rank <= self._rank(top[-1]):
+                continue
+            position = 0
+            while position < len(top) and self._rank(top[position]) >= rank:
+                position += 1
+            top.insert(position, doc_id)
+            del top[self.TOP_K:]
+
+    def _withdraw(self, doc_id: int):
+        for prefix in self._prefixes(doc_id):
+            top = self.top_entries[prefix]
+            if doc_id in top:
+                top.remove(doc_id)
+
+    # Searching
+
+    def search(self, query: str, limit: int = 10) -> list[tuple]:
+        """Best entries whose tokens start with every word of the query, typos allowed, as (url, title, is_bookmark)."""
+        if not self.is_ready:
+            return []
+        stripped_query = strip_url(query)
+        words = TOKEN_PATTERN.findall(stripped_query)
+        if not words:
+            return []
+
+        started = time.perf_counter()
+        with self.lock:
+            # The best entries for the longest word usually match the other words too
+            matches = self._matching(self._candidates(max(words, key=len)), words, limit)
+            if len(matches) < limit and len(words) > 1:
+                matches = self._matching(self._intersect(words), words, limit)
+            if len(matches) < limit:
+                # Fill up with pages that match once typos are corrected, ranked together with the exact ones
+                matches = self._fuzzy_matching(words, matches, limit)
+            # Pages whose address starts with what was typed come first, as inline completions
+            matches.sort(key=lambda entry: not strip_url(entry.url).startswith(stripped_query))
+            results = [(entry.url, entry.title, entry.is_bookmark) for entry in matches]
+
+        self.queries += 1
+        self.last_query_ms = (time.perf_counter() - started) * 1000.0
+        return results
+
+    def _candidates(self, prefix: str) -> list[int]:
+        """Best doc ids with a token starting with prefix, best first."""
+        top = self.top_entries.get(prefix)
+        if top is not None:
+            return top
+
+        docs, _ = self._scan(prefix)
+        ranked = heapq.nlargest(self.TOP_K, docs, key=self._rank)
+        if len(docs) > self.TOP_K:
+            # A prefix this common will be typed again; keep its list like a short prefix's
+            self.top_entries[prefix] = ranked
+        return ranked
+
+    def _intersect(self, words: list[str]) -> list[int]:
+        """Best doc ids with a token starting with each of the selective words, best first."""
+        sets = []
+        for word in set(words):
+            top = self.top_entries.get(word)
+            if top is not None and len(top) < self.TOP_K:
+                # A list that is not full holds every entry with the prefix
+                sets.append(set(top))
+            elif top is None or len(word) > self.TOP_PREFIX_LENGTH:
+                docs, is_complete = self._scan(word)
+                if is_complete:
+                    sets.append(docs)
+            # Short, common words only filter the candidates of the others
+        if not sets:
+            return self._candidates(max(words, key=len))
+        return heapq.nlargest(self.TOP_K, set.intersection(*sets), key=self._rank)
+
+    def _scan(self, prefix: str) -> tuple[set[int], bool]:
+        """Doc ids with a token starting with prefix, and False if there were more than MAX_SCAN."""
+        docs = set()
+        position = bisect.bisect_left(self.sorted_tokens, prefix)
+        while position < len(self.sorted_tokens) and self.sorted_tokens[position].startswith(prefix):
+            postings = self.postings[self.sorted_tokens[position]]
+            if len(docs) + len(postings) > self.MAX_SCAN:
+                return docs, False
+            docs.update(postings)
+            position += 1
+        return docs, True
+
+    def _matching(self, doc_ids, words: list[str], limit: int) -> list[_Entry]:
+        matches = []
+        for doc_id in doc_ids:
+            entry = self.entries[doc_id]
+            if entry is None:
+                continue
+            tokens = self.tokenize(entry.url, entry.title)
+            if all(any(token.startswith(word) for token in tokens) for word in words):
+                matches.append(entry)
+                if len(matches) >= limit:
+                    break
+        return matches
+
+    def _corrections(self, word: str) -> dict[str, int]:
+        """Prefixes of host and title tokens within a few edits of word, with their edit distance."""
+        corrections = self.corrections_cache.get(word)
+        if corrections is None:
+            if len(self.corrections_cache) >= 256:
+                self.corrections_cache.clear()
+            # Typing on after a typo asks for the same word again with every keystroke
+            corrections = self.corrections_cache[word] = self._find_corrections(word)
+        return corrections
+
+    def _find_corrections(self, word: str) -> dict[str, int]:
+        max_distance = 1 if len(word) < 7 else 2
+        shared = Counter()
+        for trigram in sorted(trigrams(word)):
+            tokens = self.trigram_tokens.get(trigram, ())
+            if len(tokens) <= self.FUZZY_MAX_TRIGRAM_TOKENS:
+                shared.update(tokens)
+
+        # Tokens sharing the most trigrams are the likeliest corrections; ties keep the
+        # order of the trigram lists, which put tokens on many pages first
+        corrections = {}
+        for token, _ in shared.most_common(self.FUZZY_VERIFY_LIMIT):
+            distance, length = bounded_prefix_distance(word, token, max_distance)
+            if 0 < distance <= max_distance and length >= self.FUZZY_MIN_LENGTH - 1:
+                corrections[token[:length]] = min(distance, corrections.get(token[:length], distance))
+            if len(corrections) >= self.FUZZY_MAX_CORRECTIONS:
+                break
+        return corrections
+
+    def _fuzzy_matching(self, words: list[str], matches: list[_Entry], limit: int) -> list[_Entry]:
+        alternatives = []
+        for word in words:
+            word_alternatives = {word: 0}
+            if len(word) >= self.FUZZY_MIN_LENGTH:
+                word_alternatives.update(self._corrections(word))
+            alternatives.append(word_alternatives)
+        key_alternatives = max(alternatives, key=len)
+        if len(key_alternatives) == 1:
+            return matches
+
+        scores = {entry.url: (entry.rank, entry) for entry in matches}
+        candidates = set()
+        for alternative in key_alternatives:
+            candidates.update(self._candidates(alternative))
+        for doc_id in candidates:
+            entry = self.entries[doc_id]
+            if entry is None or entry.url in scores:
+                continue
+            tokens = self.tokenize(entry.url, entry.title)
+            distance = 0
+            for word_alternatives in alternatives:
+                distances = [d for alternative, d in word_alternatives.items()
+                             if any(token.startswith(alternative) for token in tokens)]
+                if not distances:
+                    break
+                distance += min(distances)
+            else:
+                scores[entry.url] = (entry.rank - self.FUZZY_PENALTY * distance, entry)
+
+        ranked = sorted(scores.values(), key=lambda score: score[0], reverse=True)
+        return [entry for _, entry in ranked[:limit]]
+
+    def get_frecency(self, url: str) -> float:
+        """Visits to a URL decayed by age, as frecency_score() in the database computes it; 0 if unknown."""
+        with self.lock:
+            doc_id = self.doc_ids.get(url)
+            entry = self.entries[doc_id] if doc_id is not None else None
+            if entry is None or not entry.visit_count:
+                return 0.0
+            age = max(time.time() - entry.last_visit, 0.0)
+            return entry.visit_count * 0.5 ** (age / HALF_LIFE_SECONDS)
+
+    def get_stats(self) -> dict:
+        """Get index statistics."""
+        return {
+            'is_ready': self.is_ready,
+            'entries': len(self.doc_ids),
+            'tokens': len(self.postings),
+            'fuzzy_tokens': len(self.fuzzy_tokens),
+            'cached_prefixes': len(self.top_entries),
+            'build_seconds': self.build_seconds,
+            'queries': self.queries,
+            'last_query_ms': self.last_query_ms,
+        }
+
+    def cleanup(self):
+        """Stop a build that is still running."""
+        self.is_stopped = True
@@ -2,18 +2,20 @@ import gi
 gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
 gi.require_version("WebKit", "6.0")
-from gi.repository import Gtk, WebKit, Gio, GLib, Pango, GObject
+from gi.repository import Gtk, Adw, WebKit, Gio, GLib, Pango, GObject
 
+import json
 import os
 import requests
-import threading
 import urllib.parse
 from .debug import debug_print
 
 from .database import DatabaseManager
 from .adblock_parser import AdblockParser
 from .https_everywhere_rules import HttpsEverywhereRules
-from .opensearch_parser import OpenSearchParser
+from .http_client import HttpClient
+from .favicon_store import get_origin
+from .executor_service import ExecutorService, CancellationToken
 from .password_manager import PasswordManager
 from .pip_window import PiPWindow
 
@@ -32,14 +34,19 @@ class SeoltoirBrowserView(Gtk.Box):
         "opensearch-discovered": (GObject.SignalFlags.RUN_FIRST, None, (str, str)),
         "find-matches-found": (GObject.SignalFlags.RUN_FIRST, None, (int,)),
         "reader-mode-changed": (GObject.SignalFlags.RUN_FIRST, None, (bool,)),
+        "webview-created": (GObject.SignalFlags.RUN_FIRST, None, ()),
     }
 
     _adblock_parser_instance = None
     _https_everywhere_rules_instance = None
-    _opensearch_parser_instance = None
     _ad_block_filter_data = None
     _css_ad_block_scripts_by_domain = {}
 
+    # Delay after load before page text is read for the history content index
+    CONTENT_EXTRACTION_DELAY_MS = 2000
+    # Delay after load before a page WebKit found no icon for gets one fetched by the favicon store
+    FAVICON_FALLBACK_DELAY_MS = 1500
+
     @classmethod
     def _initialize_global_contexts_and_filters(cls):
         app = Gio.Application.get_default()
@@ -55,9 +62,6 @@ class SeoltoirBrowserView(Gtk.Box):
         if cls._https_everywhere_rules_instance is None:
             cls._load_https_everywhere_rules(settings)
         
-        if cls._opensearch_parser_instance is None:
-            cls._opensearch_parser_instance = OpenSearchParser()
-        
     @classmethod
     def _get_domain_from_uri(cls, uri: str) -> str:
         try:
@@ -96,7 +100,7 @@ class SeoltoirBrowserView(Gtk.Box):
             for url in filter_urls:
                 debug_print(f"Downloading adblock filter: {url}")
                 try:
-                    response = requests.get(url, timeout=10)
+                    response = HttpClient.get_default().get(url, kind="filter-list")
                     response.raise_for_status()
                     all_rules_content.append(response.text)
                     debug_print(f"Successfully downloaded {url}")
@@ -120,7 +124,7 @@ class SeoltoirBrowserView(Gtk.Box):
                 debug_print("No filter lists downloaded successfully.")
                 GLib.idle_add(cls._reapply_filters_to_all_webviews)
 
-        threading.Thread(target=_download_and_parse_filters, daemon=True).start()
+        ExecutorService.get_default().submit(ExecutorService.NETWORK, _download_and_parse_filters)
 
     @classmethod
     def _load_https_everywhere_rules(cls, settings: Gio.Settings):
@@ -135,7 +139,7 @@ class SeoltoirBrowserView(Gtk.Box):
         def _download_and_parse_https_rules():
             debug_print(f"Downloading HTTPS Everywhere rules: {rules_url}")
             try:
-                response = requests.get(rules_url, timeout=30)
+                response = HttpClient.get_default().get(rules_url, kind="filter-list")
                 response.raise_for_status()
                 rules_parser = HttpsEverywhereRules()
                 rules_parser.parse_rules_from_string(response.text)
@@ -148,7 +152,7 @@ class SeoltoirBrowserView(Gtk.Box):
                 debug_print(f"Error parsing HTTPS Everywhere rules: {e}")
                 cls._https_everywhere_rules_instance = None
         
-        threading.Thread(target=_download_and_parse_https_rules, daemon=True).start()
+        ExecutorService.get_default().submit(ExecutorService.NETWORK, _download_and_parse_https_rules)
 
     @classmethod
     def _reapply_filters_to_all_webviews(cls):
@@ -215,19 +219,33 @@ class SeoltoirBrowserView(Gtk.Box):
         instance.container_id = container_id
         instance.is_private = (container_id == "private" or web_view.get_web_context().is_ephemeral())
         instance.blocked_count_for_page = 0
+        instance._content_extraction_timer_id = None
+        instance._favicon_fallback_timer_id = None
+        instance._settings_handler_ids = []
+        instance.restore_record = None
+        instance.restore_placeholder = None
+        instance.is_prerendering = False
+        instance.cancellation_token = CancellationToken()
         instance._setup_signals_and_properties()
         instance._configure_webkit_settings()
         instance._setup_content_blocking()
         instance.append(instance.webview)
         return instance
 
-    def __init__(self, db_manager: DatabaseManager, is_private: bool = False, container_id: str = "default"):
+    def __init__(self, db_manager: DatabaseManager, is_private: bool = False, container_id: str = "default",
+                 restore_record: dict = None):
         super().__init__(orientation=Gtk.Orientation.VERTICAL)
 
         self.db_manager = db_manager
         self.is_private = is_private
         self.container_id = container_id
         self.blocked_count_for_page = 0
+        self._content_extraction_timer_id = None
+        self._favicon_fallback_timer_id = None
+        self._settings_handler_ids = []
+        self.is_prerendering = False
+        # Cancelled when the tab is closed, so its queued background work is skipped
+        self.cancellation_token = CancellationToken()
         self.is_reading_mode_active = False
         self._inspector_open = False
         self._inspector_signals_connected = False
@@ -243,8 +261,21 @@ class SeoltoirBrowserView(Gtk.Box):
         
         self.settings = Gio.Settings.new(Gio.Application.get_default().get_application_id())
 
+        # Deferred tabs keep only their session record until first shown; no WebView or web process
+        self.webview = None
+        self.restore_record = restore_record
+        self.restore_placeholder = None
+        if restore_record is not None:
+            self._show_restore_placeholder()
+        else:
+            self._create_webview()
+
+    def _create_webview(self):
+        """Create the WebView with its container session, content blocking and settings handlers."""
+        is_private = self.is_private
+
         # Get context and network session from container manager
-        self.context, self.network_session = self.get_context_and_network_session(is_private, container_id)
+        self.context, self.network_session = self.get_context_and_network_session(is_private, self.container_id)
         
         # --- CHANGED: Create a UserContentManager and pass it to the WebView ---
         self.user_content_manager = WebKit.UserContentManager.new()
@@ -273,16 +304,89 @@ class SeoltoirBrowserView(Gtk.Box):
         self._setup_content_blocking()
         self._setup_inspector_signals()
 
-        self.settings.connect("changed::enable-ad-blocking", self._on_ad_blocking_setting_changed)
-        self.settings.connect("changed::user-agent", self._on_user_agent_setting_changed)
-        self.settings.connect("changed::enable-webrtc", self._on_webrtc_setting_changed)
-        self.settings.connect("changed::enable-doh", self._on_doh_setting_changed)
-        self.settings.connect("changed::doh-provider-url", self._on_doh_setting_changed)
-        self.settings.connect("changed::enable-dot", self._on_dot_setting_changed)
-        self.settings.connect("changed::dot-provider-host", self._on_dot_setting_changed)
-        self.settings.connect("changed::dot-provider-port", self._on_dot_setting_changed)
-        self.settings.connect("changed::adblock-filter-urls", self._on_adblock_urls_setting_changed)
-        self.settings.connect("changed::enable-https-everywhere", self._on_https_everywhere_setting_changed)
+        self._connect_setting("enable-ad-blocking", self._on_ad_blocking_setting_changed)
+        self._connect_setting("user-agent", self._on_user_agent_setting_changed)
+        self._connect_setting("enable-webrtc", self._on_webrtc_setting_changed)
+        self._connect_setting("enable-doh", self._on_doh_setting_changed)
+        self._connect_setting("doh-provider-url", self._on_doh_setting_changed)
+        self._connect_setting("enable-dot", self._on_dot_setting_changed)
+        self._connect_setting("dot-provider-host", self._on_dot_setting_changed)
+        self._connect_setting("dot-provider-port", self._on_dot_setting_changed)
+        self._connect_setting("adblock-filter-urls", self._on_adblock_urls_setting_changed)
+        self._connect_setting("enable-https-everywhere", self._on_https_everywhere_setting_changed)
+
+    def _connect_setting(self, key: str, handler):
+        """Connect a settings change handler that teardown() disconnects again."""
+        self._settings_handler_ids.append(self.settings.connect(f"changed::{key}", handler))
+
+    def teardown(self):
+        """Release a view that will never be shown: stop its page, its web process and its handlers."""
+        self.cancellation_token.cancel()
+        self._cancel_favicon_fallback()
+        if self._content_extraction_timer_id:
+            GLib.source_remove(self._content_extraction_timer_id)
+            self._content_extraction_timer_id = None
+        for handler_id in self._settings_handler_ids:
+            self.settings.disconnect(handler_id)
+        self._settings_handler_ids = []
+        if self.webview is not None:
+            self.webview.stop_loading()
+            # Scripts, timers and connections of a loaded page only stop with its web process
+            self.webview.terminate_web_process()
+
+    def _show_restore_placeholder(self):
+        """Show the saved title and URL of a deferred tab without creating a WebView."""
+        self.restore_placeholder = Adw.StatusPage(
+            icon_name="web-browser-symbolic",
+            title=self.restore_record.get("title") or "",
+            description=GLib.markup_escape_text(self.restore_record.get("url") or ""),
+        )
+        self.restore_placeholder.set_vexpand(True)
+        self.restore_placeholder.set_hexpand(True)
+        self.append(self.restore_placeholder)
+
+    def is_deferred(self) -> bool:
+        """Whether the tab is still a session record without a WebView."""
+        return self.webview is None
+
+    def ensure_webview(self) -> WebKit.WebView:
+        """Create the WebView of a deferred tab, restoring its back/forward history."""
+        if self.webview is not None:
+            return self.webview
+
+        record, self.restore_record = self.restore_record or {}, None
+        if self.restore_placeholder:
+            self.remove(self.restore_placeholder)
+            self.restore_placeholder = None
+        self._create_webview()
+
+        state = record.get("serialized_state")
+        current_item = None
+        if state:
+            try:
+                self.webview.restore_session_state(WebKit.WebViewSessionState.new(GLib.Bytes.new(state)))
+                current_item = self.webview.get_back_forward_list().get_current_item()
+            except (AttributeError, TypeError, GLib.Error) as e:
+                debug_print(f"[PERF] Could not restore session state for {record.get('url')}: {e}")
+
+        if current_item:
+            self.webview.go_to_back_forward_list_item(current_item)
+        elif record.get("url"):
+            self.load_url(record["url"])
+
+        debug_print(f"[PERF] Created WebView for deferred tab: {record.get('url')}")
+        self.emit("webview-created")
+        return self.webview
+
+    def serialize_session_state(self) -> bytes:
+        """Serialize the back/forward history of the tab; deferred tabs return their saved state."""
+        if self.webview is None:
+            return (self.restore_record or {}).get("serialized_state")
+        try:
+            return self.webview.get_session_state().serialize().get_data()
+        except (AttributeError, GLib.Error) as e:
+            debug_print(f"Could not serialize session state: {e}")
+            return None
 
     def _setup_inspector_signals(self):
         """Set up inspector signals for proper state tracking."""
@@ -298,9 +402,9 @@ class SeoltoirBrowserView(Gtk.Box):
         except Exception as e:
             debug_print(f"[DEVELOPER] Error setting up inspector signals: {e}")
 
-        self.settings.connect("changed::https-everywhere-rules-url", self._on_https_everywhere_setting_changed)
-        self.settings.connect("changed::enable-javascript", self._on_javascript_setting_changed)
-        self.settings.connect("changed::javascript-exceptions", self._on_javascript_setting_changed)
+        self._connect_setting("https-everywhere-rules-url", self._on_https_everywhere_setting_changed)
+        self._connect_setting("enable-javascript", self._on_javascript_setting_changed)
+        self._connect_setting("javascript-exceptions", self._on_javascript_setting_changed)
 
         self.webview.connect("resource-load-started", self._on_resource_load_started)
         self.webview.connect("load-changed", self._on_load_changed)
@@ -308,8 +412,8 @@ class SeoltoirBrowserView(Gtk.Box):
         self.webview.connect("permission-request", self._on_permission_request)
         self.webview.connect("show-notification", self._on_show_notification)
 
-        self.settings.connect("changed::default-font-family", self._on_font_setting_changed)
-        self.settings.connect("changed::default-font-size", self._on_font_setting_changed)
+        self._connect_setting("default-font-family", self._on_font_setting_changed)
+        self._connect_setting("default-font-size", self._on_font_setting_changed)
 
         enable_ad_blocking = self.settings.get_boolean("enable-ad-blocking")
         SeoltoirBrowserView.apply_ad_block_filter(self.user_content_manager, enable_ad_blocking)
@@ -626,140 +730,7 @@ class SeoltoirBrowserView(Gtk.Box):
         custom_ua = self.settings.get_string("user-agent")
         settings.set_user_agent(custom_ua if custom_ua else None)
 
-        user_content_manager = self.user_content_manager
-        user_content_manager.remove_all_scripts()  # Remove all scripts before adding new ones
-
-        canvas_spoof_script = """
-        (function() {
-            const addNoise = (value, factor = 0.001) => value * (1 + (Math.random() - 0.5) * factor);
-            const randomInt = (min, max) => Math.floor(Math.random() * (max - min + 1)) + min;
-
-            const createSpoofedMethod = (originalMethod, type = 'float') => {
-                return function(...args) {
-                    const result = originalMethod.apply(this, args);
-                    if (typeof result === type) {
-                        return type === 'float' ? addNoise(result, 0.000001) : randomInt(result - 1, result + 1);
-                    }
-                    return result;
-                };
-            };
-
-            const spoofWebGL = (gl) => {
-                const originalGetParameter = gl.getParameter;
-                gl.getParameter = function(pname) {
-                    const result = originalGetParameter.apply(this, arguments);
-                    if (typeof result === 'number' && [
-                        gl.MAX_COMBINED_TEXTURE_IMAGE_UNITS,
-                        gl.MAX_CUBE_MAP_TEXTURE_SIZE,
-                        gl.MAX_RENDERBUFFER_SIZE,
-                        gl.MAX_TEXTURE_SIZE,
-                        gl.MAX_VIEWPORT_DIMS,
-                    ].includes(pname)) {
-                        if (typeof result === 'number') {
-                            return addNoise(result, 0.0001);
-                        }
-                    } else if (typeof result === 'string' && [
-                        gl.RENDERER, gl.VENDOR, gl.VERSION, gl.SHADING_LANGUAGE_VERSION
-                    ].includes(pname)) {
-                        return result + ' (spoofed)';
-                    }
-                    return result;
-                };
-            };
-
-            const originalGetContext = HTMLCanvasElement.prototype.getContext;
-            HTMLCanvasElement.prototype.getContext = function(contextType, contextAttributes) {
-                const context = originalGetContext.apply(this, arguments);
-                if (context && (contextType === 'webgl' || contextType === 'webgl2')) {
-                    spoofWebGL(context);
-                }
-                return context;
-            };
-
-            const originalToDataURL = HTMLCanvasElement.prototype.toDataURL;
-            HTMLCanvasElement.prototype.toDataURL = function(type, encoderOptions) {
-                const context = this.getContext('2d');
-                if (context) {
-                    const imageData = context.getImageData(0, 0, this.width, this.height);
-                    if (imageData && imageData.data) {
-                        for (let i = 0; i < 20; i++) {
-                            const pixelIndex = randomInt(0, imageData.data.length / 4 - 1) * 4;
-                            imageData.data[pixelIndex + 0] = addNoise(imageData.data[pixelIndex + 0], 0.01);
-                            imageData.data[pixelIndex + 1] = addNoise(imageData.data[pixelIndex + 1], 0.01);
-                            imageData.data[pixelIndex + 2] = addNoise(imageData.data[pixelIndex + 2], 0.01);
-                        }
-                    }
-                    context.putImageData(imageData, 0, 0);
-                }
-                return originalToDataURL.apply(this, arguments);
-            };
-
-            const originalGetImageData = CanvasRenderingContext2D.prototype.getImageData;
-            CanvasRenderingContext2D.prototype.getImageData = function(sx, sy, sw, sh) {
-                const imageData = originalGetImageData.apply(this, arguments);
-                if (imageData && imageData.data) {
-                    for (let i = 0; i < 20; i++) {
-                        const pixelIndex = randomInt(0, imageData.data.length / 4 - 1) * 4;
-                        imageData.data[pixelIndex + 0] = addNoise(imageData.data[pixelIndex + 0], 0.01);
-                        imageData.data[pixelIndex + 1] = addNoise(imageData.data[pixelIndex + 1], 0.01);
-                        imageData.data[pixelIndex + 2] = addNoise(imageData.data[pixelIndex + 2], 0.01);
-                    }
-                }
-                return imageData;
-            };
-
-            if (window.AudioContext) {
-                const originalCreateOscillator = AudioContext.prototype.createOscillator;
-                AudioContext.prototype.createOscillator = function() {
-                    const oscillator = originalCreateOscillator.apply(this, arguments);
-                    oscillator.frequency.value = addNoise(oscillator.frequency.value, 0.001);
-                    return oscillator;
-                };
-
-                const originalCreateAnalyser = AudioContext.prototype.createAnalyser;
-                AudioContext.prototype.createAnalyser = function() {
-                    const analyser = originalCreateAnalyser.apply(this, arguments);
-                    analyser.fftSize = randomInt(analyser.fftSize - 2, analyser.fftSize + 2);
-                    return analyser;
-                };
-            }
-
-            const spoofedFonts = ["Arial", "Courier New", "Georgia", "Times New Roman", "Verdana", "Roboto", "Noto Sans", "Open Sans", "Segoe UI"];
-            Object.defineProperty(navigator, 'fonts', {
-                get: () => ({
-                    ready: Promise.resolve(),
-                    check: () => true,
-                    forEach: (callback) => {
-                        spoofedFonts.forEach(font => callback({ family: font, style: 'normal', weight: 'normal' }));
-                    },
-                    keys: () => spoofedFonts.values(),
-                    values: () => spoofedFonts.values(),
-                    entries: () => {
-                        const entries = spoofedFonts.map(font => [font, { family: font, style: 'normal', weight: 'normal' }]);
-                        return entries.values();
-                    },
-                        for (const font of spoofedFonts) {
-                            yield { family: font, style: 'normal', weight: 'normal' };
-                        }
-                    }
-                })
-            });
-
-            Object.defineProperty(navigator, 'hardwareConcurrency', {
-                get: () => randomInt(2, 8)
-            });
-            Object.defineProperty(navigator, 'deviceMemory', {
-                get: () => randomInt(4, 16)
-            });
-        })();
-        """
-        canvas_script = WebKit.UserScript.new(
-            canvas_spoof_script,
-            WebKit.UserContentInjectedFrames.ALL_FRAMES,
-            WebKit.UserScriptInjectionTime.START,
-            None, None
-        )
-        user_content_manager.add_script(canvas_script)
+        # Injected scripts come from the shared user script registry, attached once per WebView
 
         # --- HTTPS Everywhere rules injection ---
         if self._https_everywhere_rules_instance:
@@ -810,119 +781,19 @@ class SeoltoirBrowserView(Gtk.Box):
         # --- Adblock Plus signals ---
         # Note: AdblockParser is not a GObject, so no signals to connect
 
-        # --- Inject favicon extractor ---
-        debug_print("[DEBUG] About to inject favicon extractor...")
-        self._inject_favicon_extractor()
+        # --- Favicons come from the container's WebKit favicon database ---
+        self.webview.connect("notify::favicon", self._on_webkit_favicon_changed)
         
-        # --- Inject password form detection (only for non-private browsing) ---
-        if self.password_manager:
-            debug_print("[DEBUG] About to inject password form detection...")
+        # --- Shared user scripts; password form detection only for non-private browsing ---
+        with_passwords = bool(getattr(self, 'password_manager', None))
+        app = Gio.Application.get_default()
+        if hasattr(app, 'user_script_registry'):
+            app.user_script_registry.attach(self.webview.get_user_content_manager(), with_passwords=with_passwords)
+        if with_passwords:
             self._inject_password_form_detection()
         
         debug_print("[DEBUG] === _setup_signals_and_properties COMPLETE ===")
 
-    def _inject_favicon_extractor(self):
-        """Inject JavaScript to extract favicon URLs from the page."""
-        debug_print("[DEBUG] === _inject_favicon_extractor STARTING ===")
-        favicon_script = """
-        (function() {
-            console.log('[FAVICON-JS] Script starting...');
-            function findFavicon() {
-                console.log('[FAVICON-JS] Looking for favicon links...');
-                const links = document.querySelectorAll('link[rel*="icon"]');
-                const favicons = [];
-                
-                console.log('[FAVICON-JS] Found ' + links.length + ' icon links');
-                
-                for (let link of links) {
-                    const href = link.href;
-                    const rel = link.rel;
-                    const sizes = link.sizes ? link.sizes.value : '';
-                    
-                    console.log('[FAVICON-JS] Found link: ' + href + ' (rel: ' + rel + ')');
-                    
-                    if (href) {
-                        favicons.push({
-                            url: href,
-                            rel: rel,
-                            sizes: sizes
-                        });
-                    }
-                }
-                
-                // If no favicon links found, try to construct default favicon URL
-                if (favicons.length === 0) {
-                    const defaultFavicon = window.location.origin + '/favicon.ico';
-                    console.log('[FAVICON-JS] No links found, trying default: ' + defaultFavicon);
-                    favicons.push({
-                        url: defaultFavicon,
-                        rel: 'icon',
-                        sizes: ''
-                    });
-                }
-                
-                return favicons;
-            }
-            
-            const favicons = findFavicon();
-            if (favicons.length > 0) {
-                console.log('[FAVICON-JS] Posting message with URL: ' + favicons[0].url);
-                // Emit the favicon URL to the Python side
-                if (window.webkit && window.webkit.messageHandlers && window.webkit.messageHandlers.faviconHandler) {
-                    window.webkit.messageHandlers.faviconHandler.postMessage(favicons[0].url);
-                    console.log('[FAVICON-JS] Message posted successfully');
-                } else {
-                    console.log('[FAVICON-JS] ERROR: faviconHandler not available!');
-                }
-            } else {
-                console.log('[FAVICON-JS] No favicons found');
-            }
-        })();
-        """
-        
-        # Create a user script to inject the favicon extractor
-        debug_print("[DEBUG] Creating UserScript...")
-        try:
-            script = WebKit.UserScript.new(
-                favicon_script,
-                WebKit.UserContentInjectedFrames.ALL_FRAMES,
-                WebKit.UserScriptInjectionTime.END,
-                None,
-                None
-            )
-            debug_print("[DEBUG] UserScript created successfully")
-        except Exception as e:
-            debug_print(f"[DEBUG] ERROR creating UserScript: {e}")
-            return
-        
-        # Add the script to the user content manager
-        debug_print("[DEBUG] Adding script to user content manager...")
-        try:
-            self.user_content_manager.add_script(script)
-            debug_print("[DEBUG] Script added successfully")
-        except Exception as e:
-            debug_print(f"[DEBUG] ERROR adding script: {e}")
-            return
-        
-        # Register a message handler to receive the favicon URL
-        debug_print("[DEBUG] Registering message handler...")
-        try:
-            self.user_content_manager.register_script_message_handler("faviconHandler")
-            debug_print("[DEBUG] Message handler registered")
-        except Exception as e:
-            debug_print(f"[DEBUG] ERROR registering handler: {e}")
-            return
-            
-        debug_print("[DEBUG] Connecting to signal...")
-        try:
-            self.user_content_manager.connect("script-message-received::faviconHandler", self._on_favicon_message_received)
-            debug_print("[DEBUG] Signal connected successfully")
-        except Exception as e:
-            debug_print(f"[DEBUG] ERROR connecting signal: {e}")
-            return
-            
-        debug_print("[DEBUG] === _inject_favicon_extractor COMPLETE ===")
-
     def _on_adblock_blocked(self, parser, uri, options):
         self.blocked_count_for_page += 1
         self.emit("blocked-count-changed", self.blocked_count_for_page)
@@ -935,6 +806,13 @@ class SeoltoirBrowserView(Gtk.Box):
             # Reset blocked count on new page load
             self.blocked_count_for_page = 0
 
+            self._cancel_favicon_fallback()
+            # Show a known icon right away instead of after the page has loaded
+            app = Gio.Application.get_default()
+            cached_icon = app.favicon_store.get_cached_icon(webview.get_uri()) if hasattr(app, 'favicon_store') else None
+            if cached_icon:
+                self.emit("favicon-changed", cached_icon)
+
             # --- CHANGED: Reapply content blocking on every page load ---
             SeoltoirBrowserView.apply_ad_block_filter(self.user_content_manager, self.settings.get_boolean("enable-ad-blocking"))
 
@@ -951,13 +829,9 @@ class SeoltoirBrowserView(Gtk.Box):
             favicon = self.webview.get_favicon()
             debug_print(f"[DEBUG] FINISHED: uri={uri}, title={title}, favicon={favicon} (type: {type(favicon)})")
             
-            # Save to history if not in private browsing mode
-            if not self.is_private and uri and uri.startswith(('http://', 'https://')):
-                try:
-                    self.db_manager.add_history_entry(uri, title or uri)
-                    debug_print(f"[DEBUG] Added to history: {uri}")
-                except Exception as e:
-                    debug_print(f"[DEBUG] Error adding to history: {e}")
+            # Save to history if not in private browsing mode; prerendered pages once they are shown
+            if not self.is_prerendering:
+                self._record_visit(uri, title)
             
             debug_print("[DEBUG] Emitting uri-changed signal...")
             self.emit("uri-changed", uri)
@@ -967,9 +841,8 @@ class SeoltoirBrowserView(Gtk.Box):
                 debug_print(f"[DEBUG] *** EMITTING WEBKIT FAVICON: {favicon} ***")
                 self.emit("favicon-changed", favicon)
             else:
-                debug_print("[DEBUG] No WebKit favicon available, trying JavaScript extraction.")
-                # Try to fetch favicon from domain root as fallback
-                self._fetch_favicon_fallback(uri)
+                # WebKit often finds the icon just after the load; fall back only if it does not
+                self._schedule_favicon_fallback(uri)
             debug_print("[DEBUG] Emitting navigation signals...")
             self.emit("can-go-back-changed", self.webview.can_go_back())
             self.emit("can-go-forward-changed", self.webview.can_go_forward())
@@ -980,6 +853,67 @@ class SeoltoirBrowserView(Gtk.Box):
             # Detect OpenSearch descriptors on the page
             self._detect_opensearch_descriptors()
 
+    def _record_visit(self, uri, title):
+        if not self.is_private and uri and uri.startswith(('http://', 'https://')):
+            try:
+                self.db_manager.add_history_entry(uri, title or uri)
+                debug_print(f"[DEBUG] Added to history: {uri}")
+            except Exception as e:
+                debug_print(f"[DEBUG] Error adding to history: {e}")
+            self._schedule_page_content_extraction(uri)
+
+    def start_prerender(self):
+        """Load pages silently and without recording visits until finish_prerender()."""
+        self.is_prerendering = True
+        self.webview.set_is_muted(True)
+
+    def finish_prerender(self):
+        """Show a prerendered page: unmute it and record its visit if it has already loaded."""
+        self.is_prerendering = False
+        self.webview.set_is_muted(False)
+        if not self.webview.is_loading():
+            self._record_visit(self.webview.get_uri(), self.webview.get_title())
+
+    def _schedule_page_content_extraction(self, uri):
+        """Queue the page text for the history content index once the page has settled."""
+        app = Gio.Application.get_default()
+        indexer = getattr(app, 'page_content_indexer', None)
+        if not indexer or not indexer.should_index(self.is_private, self.container_id):
+            return
+        if self._content_extraction_timer_id:
+            GLib.source_remove(self._content_extraction_timer_id)
+        # Wait until post-load scripts and layout have finished before reading the DOM
+        self._content_extraction_timer_id = GLib.timeout_add(
+            self.CONTENT_EXTRACTION_DELAY_MS, self._extract_page_content, uri
+        )
+
+    def _extract_page_content(self, uri):
+        self._content_extraction_timer_id = None
+        if not self.webview or self.webview.get_uri() != uri:
+            return False  # Navigated away in the meantime
+
+        from .page_content_indexer import PageContentIndexer
+        script = f"""
+        (function() {{
+            var body = document.body;
+            return body ? body.innerText.slice(0, {PageContentIndexer.MAX_TEXT_LENGTH * 2}) : "";
+        }})();
+        """
+        self.webview.evaluate_javascript(script, -1, None, None, None, self._on_page_content_extracted, uri)
+        return False
+
+    def _on_page_content_extracted(self, webview, result, uri):
+        try:
+            value = webview.evaluate_javascript_finish(result)
+            text = value.to_string() if value and value.is_string() else ""
+        except Exception as e:
+            debug_print(f"[INDEX] Could not extract page text for {uri}: {e}")
+            return
+
+        app = Gio.Application.get_default()
+        if text and hasattr(app, 'page_content_indexer'):
+            app.page_content_indexer.queue_page(uri, text)
+
     def _on_title_changed(self, webview, pspec):
         """Handle title changes in the webview."""
         title = webview.get_title()
@@ -1019,117 +953,19 @@ class SeoltoirBrowserView(Gtk.Box):
     def _on_javascript_setting_changed(self, settings, key):
         self._configure_webkit_settings()
 
-    def _on_favicon_message_received(self, user_content_manager, message):
-        """Handle the received favicon URL and fetch the favicon."""
-        debug_print(f"[DEBUG] === _on_favicon_message_received CALLED ===")
-        debug_print(f"[DEBUG] user_content_manager: {user_content_manager}")
-        debug_print(f"[DEBUG] message: {message}")
-        try:
-            favicon_url = message.get_js_value().to_string()
-            debug_print(f"[DEBUG] *** FAVICON MESSAGE RECEIVED: {favicon_url} ***")
-        except Exception as e:
-            debug_print(f"[DEBUG] ERROR extracting favicon URL: {e}")
-            return
-        
-        # Fetch the favicon in a background thread
-        def fetch_favicon():
-            try:
-                import requests
-                from PIL import Image
-                import io
-                
-                response = requests.get(favicon_url, timeout=5)
-                response.raise_for_status()
-                
-                # Convert the image to PNG format that GTK can handle
-                image_data = response.content
-                image = Image.open(io.BytesIO(image_data))
-                
-                # Convert to RGBA if needed
-                if image.mode != 'RGBA':
-                    image = image.convert('RGBA')
-                
-                # Resize to a reasonable size for icons (16x16 or 32x32)
-                if image.size[0] > 32 or image.size[1] > 32:
-                    image.thumbnail((32, 32), Image.Resampling.LANCZOS)
-                
-                # Convert to PNG bytes
-                png_buffer = io.BytesIO()
-                image.save(png_buffer, format='PNG')
-                png_data = png_buffer.getvalue()
-                
-                # Convert to base64 and create BytesIcon
-                import base64
-                base64_data = base64.b64encode(png_data).decode('ascii')
-                icon_bytes = GLib.Bytes.new(png_data)
-                icon = Gio.BytesIcon.new(icon_bytes)
-                
-                # Emit the favicon signal on the main thread
-                GLib.idle_add(self.emit, "favicon-changed", icon)
-                debug_print(f"[DEBUG] Successfully converted favicon to base64 from {favicon_url}")
-                
-            except ImportError:
-                # PIL not available, try with raw data
-                try:
-                    response = requests.get(favicon_url, timeout=5)
-                    response.raise_for_status()
-                    
-                    icon_data = response.content
-                    # Always convert to PNG for consistency
-                    try:
-                        from PIL import Image
-                        import io
-                        
-                        # Load the image and convert to PNG
-                        image = Image.open(io.BytesIO(icon_data))
-                        if image.mode != 'RGBA':
-                            image = image.convert('RGBA')
-                        
-                        # Resize to 32x32 for consistency
-                        if image.size != (32, 32):
-                            image = image.resize((32, 32), Image.Resampling.LANCZOS)
-                        
-                        # Save as PNG
-                        png_buffer = io.BytesIO()
-                        image.save(png_buffer, format='PNG')
-                        png_data = png_buffer.getvalue()
-                        
-                        icon_bytes = GLib.Bytes.new(png_data)
-                        icon = Gio.BytesIcon.new(icon_bytes)
-                        
-                        GLib.idle_add(self.emit, "favicon-changed", icon)
-                        debug_print(f"[DEBUG] Successfully normalized favicon to PNG from {favicon_url}")
-                        
-                    except Exception as e:
-                        debug_print(f"[DEBUG] Failed to normalize favicon: {e}")
-                        # Fallback to raw data if PIL fails
-                        if len(icon_data) > 0 and icon_data.startswith(b'\x89PNG'):
-                            icon_bytes = GLib.Bytes.new(icon_data)
-                            icon = Gio.BytesIcon.new(icon_bytes)
-                            GLib.idle_add(self.emit, "favicon-changed", icon)
-                            debug_print(f"[DEBUG] Used raw PNG data for {favicon_url}")
-                        else:
-                            debug_print(f"[DEBUG] Cannot use raw data for {favicon_url}")
-                    
-                except Exception as e:
-                    debug_print(f"[DEBUG] Failed to fetch favicon from {favicon_url}: {e}")
-                    
-            except Exception as e:
-                debug_print(f"[DEBUG] Failed to fetch/convert favicon from {favicon_url}: {e}")
-        
-        # Start the favicon fetch in a background thread
-        import threading
-        threading.Thread(target=fetch_favicon, daemon=True).start()
-
     def load_url(self, url: str):
         """Load the given URL in the internal WebKit.WebView."""
         self.webview.load_uri(url)
 
     def get_uri(self):
-        return self.webview.get_uri() if hasattr(self, 'webview') and self.webview else None
+        if getattr(self, 'webview', None):
+            return self.webview.get_uri()
+        return (getattr(self, 'restore_record', None) or {}).get("url")
 
     def get_title(self):
-        return self.webview.get_title() if hasattr(self, 'webview') and self.webview else None
+        if getattr(self, 'webview', None):
+            return self.webview.get_title()
+        return (getattr(self, 'restore_record', None) or {}).get("title")
 
     def find_text(self, text, find_options, max_matches=1000):
         """Find text in the current web page using WebKit's search functionality."""
@@ -1156,105 +992,37 @@ class SeoltoirBrowserView(Gtk.Box):
             self.webview.search_text('', 0, False, True, True)
         # If there is a more appropriate method in your WebKitGTK version, use it here.
 
+    def _on_webkit_favicon_changed(self, webview, pspec):
+        favicon = webview.get_favicon()
+        if favicon:
+            self._cancel_favicon_fallback()
+            self.emit("favicon-changed", favicon)
+
+    def _schedule_favicon_fallback(self, uri):
+        self._cancel_favicon_fallback()
+        self._favicon_fallback_timer_id = GLib.timeout_add(
+            self.FAVICON_FALLBACK_DELAY_MS, self._fetch_favicon_fallback, uri
+        )
+
+    def _cancel_favicon_fallback(self):
+        if self._favicon_fallback_timer_id:
+            GLib.source_remove(self._favicon_fallback_timer_id)
+            self._favicon_fallback_timer_id = None
+
     def _fetch_favicon_fallback(self, uri):
-        """Try to fetch favicon.ico from the domain root as a fallback."""
-        try:
-            import urllib.parse
-            parsed = urllib.parse.urlparse(uri)
-            domain = parsed.netloc
-            favicon_url = f"https://{domain}/favicon.ico"
-            debug_print(f"[DEBUG] Trying to fetch favicon from: {favicon_url}")
-            
-            # Fetch the favicon in a background thread
-            def fetch_favicon():
-                try:
-                    import requests
-                    from PIL import Image
-                    import io
-                    
-                    response = requests.get(favicon_url, timeout=5)
-                    response.raise_for_status()
-                    
-                    # Convert the image to PNG format that GTK can handle
-                    image_data = response.content
-                    image = Image.open(io.BytesIO(image_data))
-                    
-                    # Convert to RGBA if needed
-                    if image.mode != 'RGBA':
-                        image = image.convert('RGBA')
-                    
-                    # Resize to a reasonable size for icons (16x16 or 32x32)
-                    if image.size[0] > 32 or image.size[1] > 32:
-                        image.thumbnail((32, 32), Image.Resampling.LANCZOS)
-                    
-                    # Convert to PNG bytes
-                    png_buffer = io.BytesIO()
-                    image.save(png_buffer, format='PNG')
-                    png_data = png_buffer.getvalue()
-                    
-                    # Convert the PNG data to a GIcon
-                    icon_bytes = GLib.Bytes.new(png_data)
-                    icon = Gio.BytesIcon.new(icon_bytes)
-                    
-                    # Emit the favicon signal on the main thread
-                    GLib.idle_add(self.emit, "favicon-changed", icon)
-                    debug_print(f"[DEBUG] Successfully fetched and converted favicon from {favicon_url}")
-                    
-                except ImportError:
-                    # PIL not available, try with raw data
-                    try:
-                        response = requests.get(favicon_url, timeout=5)
-                        response.raise_for_status()
-                        
-                        icon_data = response.content
-                        # Always convert to PNG for consistency
-                        try:
-                            from PIL import Image
-                            import io
-                            
-                            # Load the image and convert to PNG
-                            image = Image.open(io.BytesIO(icon_data))
-                            if image.mode != 'RGBA':
-                                image = image.convert('RGBA')
-                            
-                            # Resize to 32x32 for consistency
-                            if image.size != (32, 32):
-                                image = image.resize((32, 32), Image.Resampling.LANCZOS)
-                            
-                            # Save as PNG
-                            png_buffer = io.BytesIO()
-                            image.save(png_buffer, format='PNG')
-                            png_data = png_buffer.getvalue()
-                            
-                            icon_bytes = GLib.Bytes.new(png_data)
-                            icon = Gio.BytesIcon.new(icon_bytes)
-                            
-                            GLib.idle_add(self.emit, "favicon-changed", icon)
-                            debug_print(f"[DEBUG] Successfully normalized fallback favicon to PNG from {favicon_url}")
-                            
-                        except Exception as e:
-                            debug_print(f"[DEBUG] Failed to normalize fallback favicon: {e}")
-                            # Fallback to raw data if PIL fails
-                            if len(icon_data) > 0 and icon_data.startswith(b'\x89PNG'):
-                                icon_bytes = GLib.Bytes.new(icon_data)
-                                icon = Gio.BytesIcon.new(icon_bytes)
-                                GLib.idle_add(self.emit, "favicon-changed", icon)
-                                debug_print(f"[DEBUG] Used raw PNG fallback data for {favicon_url}")
-                            else:
-                                debug_print(f"[DEBUG] Cannot use raw fallback data for {favicon_url}")
-                        
-                    except Exception as e:
-                        debug_print(f"[DEBUG] Failed to fetch favicon from {favicon_url}: {e}")
-                        
-                except Exception as e:
-                    debug_print(f"[DEBUG] Failed to fetch/convert favicon from {favicon_url}: {e}")
-            
-            # Start the favicon fetch in a background thread
-            import threading
-            threading.Thread(target=fetch_favicon, daemon=True).start()
-            
-        except Exception as e:
-            debug_print(f"[DEBUG] Error in favicon fallback for {uri}: {e}")
+        """Show the stored icon of the page's origin, falling back to its /favicon.ico."""
+        self._favicon_fallback_timer_id = None
+        app = Gio.Application.get_default()
+        if not hasattr(app, 'favicon_store') or not self.webview or self.webview.get_uri() != uri:
+            return False
+        app.favicon_store.load(uri, None, self.container_id, self._on_favicon_loaded,
+                               token=self.cancellation_token, is_private=self.is_private)
+        return False
+
+    def _on_favicon_loaded(self, origin, icon):
+        # The tab may have moved on to another site meanwhile
+        if self.webview and get_origin(self.webview.get_uri()) == origin:
+            self.emit("favicon-changed", icon)
 
 
     def _get_domain_from_url(self, url: str) -> str:
@@ -1566,13 +1334,17 @@ class SeoltoirBrowserView(Gtk.Box):
         self.show_javascript_console()
 
     def _detect_opensearch_descriptors(self):
-        """Detect OpenSearch descriptors on the current page."""
-        if not self._opensearch_parser_instance:
+        """Detect OpenSearch descriptors on the current page, scanning each origin only once in a while."""
+        app = Gio.Application.get_default()
+        discovery = getattr(app, 'opensearch_discovery', None)
+        if not discovery or not self.webview:
             return
         
-        # Check if webview is properly initialized
-        if not self.webview or not hasattr(self.webview, 'run_javascript'):
-            debug_print("[DEBUG] WebView not ready for JavaScript execution")
+        uri = self.webview.get_uri()
+        if self.is_private or not discovery.should_scan(uri):
+            # Known origin, or a private tab that must not fetch: report known search engines only
+            for title, href in discovery.get_new_descriptors(uri):
+                self.emit("opensearch-discovered", title, href)
             return
         
         # JavaScript to find OpenSearch descriptors
@@ -1590,48 +1362,39 @@ class SeoltoirBrowserView(Gtk.Box):
                 if (rel && type && href) {
                     if (rel.toLowerCase() === 'search' && 
                         type.toLowerCase() === 'application/opensearchdescription+xml') {
-                        
-                        // Convert relative URLs to absolute
-                        var absoluteHref = href;
-                        if (!href.startsWith('http://') && !href.startsWith('https://')) {
-                            absoluteHref = new URL(href, window.location.href).href;
-                        }
-                        
-                        openSearchLinks.push({
-                            title: link.getAttribute('title') || document.title || 'Unknown',
-                            href: absoluteHref
-                        });
+                        openSearchLinks.push([link.getAttribute('title') || document.title || 'Unknown',
+                                              new URL(href, window.location.href).href]);
                     }
                 }
             }
             
-            return openSearchLinks;
+            return JSON.stringify(openSearchLinks);
         })();
         """
         
         # Execute JavaScript and handle results
-        self.webview.run_javascript(javascript_code, None, self._on_opensearch_discovery_complete, None)
+        self.webview.evaluate_javascript(javascript_code, -1, None, None, None,
+                                         self._on_opensearch_discovery_complete, uri)
     
-    def _on_opensearch_discovery_complete(self, webview, result, user_data):
-        """Handle OpenSearch discovery results."""
+    def _on_opensearch_discovery_complete(self, webview, result, uri):
+        """Hand the OpenSearch links found on a page to the discovery cache."""
         try:
-            js_result = webview.run_javascript_finish(result)
-            if js_result:
-                value = js_result.get_js_value()
-                if value and value.is_array():
-                    # Process each OpenSearch descriptor found
-                    for i in range(value.get_array_length()):
-                        item = value.get_array_element(i)
-                        if item and item.is_object():
-                            title = item.get_property('title').to_string() if item.has_property('title') else 'Unknown'
-                            href = item.get_property('href').to_string() if item.has_property('href') else ''
-                            
-                            if href:
-                                debug_print(f"[DEBUG] Found OpenSearch descriptor: {title} at {href}")
-                                # Emit signal with the title and URL
-                                self.emit("opensearch-discovered", title, href)
+            value = webview.evaluate_javascript_finish(result)
+            links = json.loads(value.to_string()) if value and value.is_string() else []
         except Exception as e:
             debug_print(f"[DEBUG] Error processing OpenSearch discovery: {e}")
+            return
+        
+        app = Gio.Application.get_default()
+        app.opensearch_discovery.record_scan(uri, [tuple(link) for link in links],
+                                             self._on_opensearch_descriptor_found,
+                                             token=self.cancellation_token, container_id=self.container_id,
+                                             is_private=self.is_private)
+    
+    def _on_opensearch_descriptor_found(self, origin, title, href):
+        if self.webview and get_origin(self.webview.get_uri()) == origin:
+            debug_print(f"[DEBUG] Found OpenSearch descriptor: {title} at {href}")
+            self.emit("opensearch-discovered", title, href)
 
     def _on_permission_request(self, webview, request):
         """Handle WebKit permission requests."""
@@ -1861,227 +1624,9 @@ class SeoltoirBrowserView(Gtk.Box):
         debug_print("[DEBUG] Notification closed")
 
     def _inject_password_form_detection(self):
-        """Inject JavaScript to detect password forms and handle autofill."""
+        """Receive messages from the shared password form detection script."""
         debug_print("[DEBUG] === _inject_password_form_detection STARTING ===")
         
-        password_script = """
-        (function() {
-            console.log('[PASSWORD-JS] Password form detection script starting...');
-            
-            // Keep track of processed forms to avoid duplicates
-            window.seoltoirProcessedForms = window.seoltoirProcessedForms || new Set();
-            
-            function findPasswordForms() {
-                console.log('[PASSWORD-JS] Looking for password forms...');
-                const forms = document.querySelectorAll('form');
-                const passwordForms = [];
-                
-                forms.forEach((form, index) => {
-                    const formId = form.id || `form-${index}`;
-                    if (window.seoltoirProcessedForms.has(formId)) {
-                        return; // Skip already processed forms
-                    }
-                    
-                    const passwordInputs = form.querySelectorAll('input[type="password"]');
-                    const usernameInputs = form.querySelectorAll('input[type="text"], input[type="email"], input[name*="user"], input[name*="login"], input[name*="email"]');
-                    
-                    if (passwordInputs.length > 0) {
-                        console.log('[PASSWORD-JS] Found password form:', formId);
-                        
-                        const formData = {
-                            formId: formId,
-                            action: form.action || window.location.href,
-                            method: form.method || 'POST',
-                            passwordFields: [],
-                            usernameFields: []
-                        };
-                        
-                        // Collect password field info
-                        passwordInputs.forEach((input, idx) => {
-                            formData.passwordFields.push({
-                                id: input.id || `password-${idx}`,
-                                name: input.name || '',
-                                placeholder: input.placeholder || '',
-                                autocomplete: input.autocomplete || ''
-                            });
-                        });
-                        
-                        // Collect username field info
-                        usernameInputs.forEach((input, idx) => {
-                            formData.usernameFields.push({
-                                id: input.id || `username-${idx}`,
-                                name: input.name || '',
-                                type: input.type || '',
-                                placeholder: input.placeholder || '',
-                                autocomplete: input.autocomplete || ''
-                            });
-                        });
-                        
-                        passwordForms.push(formData);
-                        window.seoltoirProcessedForms.add(formId);
-                        
-                        // Add form submit listener for password save detection
-                        form.addEventListener('submit', function(e) {
-                            handleFormSubmit(formData, form);
-                        });
-                    }
-                });
-                
-                return passwordForms;
-            }
-            
-            function handleFormSubmit(formData, form) {
-                console.log('[PASSWORD-JS] Form submitted:', formData.formId);
-                
-                const submitData = {
-                    type: 'password_form_submit',
-                    formId: formData.formId,
-                    url: window.location.href,
-                    action: formData.action,
-                    username: '',
-                    password: '',
-                    title: document.title
-                };
-                
-                // Get actual values from form fields
-                const passwordField = form.querySelector('input[type="password"]');
-                if (passwordField && passwordField.value) {
-                    submitData.password = passwordField.value;
-                }
-                
-                // Try to find username value
-                const usernameField = form.querySelector('input[type="text"], input[type="email"]') ||
-                                    form.querySelector('input[name*="user"], input[name*="login"], input[name*="email"]');
-                if (usernameField && usernameField.value) {
-                    submitData.username = usernameField.value;
-                }
-                
-                // Only proceed if we have both username and password
-                if (submitData.username && submitData.password) {
-                    console.log('[PASSWORD-JS] Sending password save data');
-                    if (window.webkit && window.webkit.messageHandlers && window.webkit.messageHandlers.passwordHandler) {
-                        window.webkit.messageHandlers.passwordHandler.postMessage(submitData);
-                    }
-                }
-            }
-            
-            function requestAutofill() {
-                const passwordForms = findPasswordForms();
-                
-                if (passwordForms.length > 0) {
-                    console.log('[PASSWORD-JS] Requesting autofill for forms');
-                    const autofillRequest = {
-                        type: 'password_autofill_request',
-                        url: window.location.href,
-                        forms: passwordForms
-                    };
-                    
-                    if (window.webkit && window.webkit.messageHandlers && window.webkit.messageHandlers.passwordHandler) {
-                        window.webkit.messageHandlers.passwordHandler.postMessage(autofillRequest);
-                    }
-                }
-            }
-            
-            function fillPassword(username, password, formId) {
-                console.log('[PASSWORD-JS] Filling password for form:', formId);
-                
-                const form = formId ? document.getElementById(formId) || document.querySelector(`form:nth-child(${formId})`) : document.querySelector('form');
-                if (!form) {
-                    console.log('[PASSWORD-JS] Form not found for autofill');
-                    return false;
-                }
-                
-                // Fill username
-                const usernameField = form.querySelector('input[type="text"], input[type="email"]') ||
-                                    form.querySelector('input[name*="user"], input[name*="login"], input[name*="email"]');
-                if (usernameField) {
-                    usernameField.value = username;
-                    usernameField.dispatchEvent(new Event('input', { bubbles: true }));
-                    usernameField.dispatchEvent(new Event('change', { bubbles: true }));
-                }
-                
-                // Fill password
-                const passwordField = form.querySelector('input[type="password"]');
-                if (passwordField) {
-                    passwordField.value = password;
-                    passwordField.dispatchEvent(new Event('input', { bubbles: true }));
-                    passwordField.dispatchEvent(new Event('change', { bubbles: true }));
-                }
-                
-                console.log('[PASSWORD-JS] Password filled successfully');
-                return true;
-            }
-            
-            // Expose fillPassword function globally for external calls
-            window.seoltoirFillPassword = fillPassword;
-            
-            // Initial form detection
-            const forms = findPasswordForms();
-            if (forms.length > 0) {
-                console.log('[PASSWORD-JS] Found', forms.length, 'password forms');
-                // Request autofill for existing forms
-                setTimeout(requestAutofill, 100);
-            }
-            
-            // Watch for dynamically added forms
-            const observer = new MutationObserver(function(mutations) {
-                let shouldCheck = false;
-                mutations.forEach(function(mutation) {
-                    if (mutation.type === 'childList') {
-                        mutation.addedNodes.forEach(function(node) {
-                            if (node.nodeType === Node.ELEMENT_NODE) {
-                                if (node.tagName === 'FORM' || node.querySelector('form')) {
-                                    shouldCheck = true;
-                                }
-                            }
-                        });
-                    }
-                });
-                
-                if (shouldCheck) {
-                    console.log('[PASSWORD-JS] DOM changed, checking for new forms...');
-                    setTimeout(function() {
-                        const newForms = findPasswordForms();
-                        if (newForms.length > 0) {
-                            setTimeout(requestAutofill, 100);
-                        }
-                    }, 500);
-                }
-            });
-            
-            observer.observe(document.body, {
-                childList: true,
-                subtree: true
-            });
-            
-            console.log('[PASSWORD-JS] Password form detection initialized');
-        })();
-        """
-        
-        # Create a user script to inject the password form detection
-        debug_print("[DEBUG] Creating password UserScript...")
-        try:
-            script = WebKit.UserScript.new(
-                password_script,
-                WebKit.UserContentInjectedFrames.ALL_FRAMES,
-                WebKit.UserScriptInjectionTime.END,
-                None,
-                None
-            )
-            debug_print("[DEBUG] Password UserScript created successfully")
-        except Exception as e:
-            debug_print(f"[DEBUG] ERROR creating password UserScript: {e}")
-            return
-        
-        # Add the script to the user content manager
-        debug_print("[DEBUG] Adding password script to user content manager...")
-        try:
-            self.user_content_manager.add_script(script)
-            debug_print("[DEBUG] Password script added successfully")
-        except Exception as e:
-            debug_print(f"[DEBUG] ERROR adding password script: {e}")
-            return
-        
         # Register a message handler to receive password form data
         debug_print("[DEBUG] Registering password message handler...")
         try:
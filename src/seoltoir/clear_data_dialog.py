@@ -147,4 +147,12 @@ class ClearBrowsingDataDialog(Adw.Dialog):
             data_manager.clear(types_to_clear, 0, None, None)
             debug_print("Cleared cache from default context")
         
+        if hasattr(app, 'favicon_store'):
+            app.favicon_store.clear()
+        if hasattr(app, 'container_manager'):
+            for data_manager in app.container_manager.container_data_managers.values():
+                favicon_database = data_manager.get_favicon_database() if hasattr(data_manager, 'get_favicon_database') else None
+                if favicon_database:
+                    favicon_database.clear()
+        
         debug_print("Cache cleared from all containers.")
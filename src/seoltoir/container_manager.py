@@ -7,6 +7,7 @@ from gi.repository import WebKit, Gio, GLib, Soup
 
 import os
 import shutil # For rmtree
+from .http_client import HttpClient
 
 class ContainerManager:
     """
@@ -109,6 +110,10 @@ class ContainerManager:
             WebKit.CookieAcceptPolicy.NO_THIRD_PARTY
         )
 
+        # Tab icons are fetched in the container's own session and kept in its own favicon database
+        if hasattr(data_manager, 'set_favicons_enabled'):
+            data_manager.set_favicons_enabled(True)
+
         #print(f"WARNING: Cannot configure DoH/DoT or explicit TLS policy for container '{container_id}'. API (NetworkSession.get_soup_session) is missing. Using system defaults.")
 
         app = Gio.Application.get_default()
@@ -151,6 +156,7 @@ class ContainerManager:
         if container_id in self.container_contexts:
             context = self.container_contexts.pop(container_id)
             data_manager = self.container_data_managers.pop(container_id)
+            HttpClient.get_default().close_container(container_id)
 
             if data_manager:
                 data_manager.clear(WebKit.WebsiteDataTypes.ALL, 0, None, None)
@@ -1,21 +1,154 @@
 import sqlite3
 import os
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 import json # For session data
+import re
+import hashlib
+import zlib
+import uuid
 from .debug import debug_print
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Visits lose half of their ranking weight every FRECENCY_HALF_LIFE_DAYS days
+FRECENCY_HALF_LIFE_DAYS = 30.0
+
+
+def frecency_score(visit_count, last_visit) -> float:
+    """Scores a history entry by how often and how recently it was visited."""
+    try:
+        age_days = (datetime.now() - datetime.fromisoformat(last_visit)).total_seconds() / 86400
+    except (TypeError, ValueError):
+        age_days = 365.0
+    return (visit_count or 1) * 0.5 ** (max(age_days, 0.0) / FRECENCY_HALF_LIFE_DAYS)
+
+
+def decompress_text(data) -> str:
+    """Inflates page text stored by store_page_contents()."""
+    if data is None:
+        return ""
+    return zlib.decompress(data).decode("utf-8", errors="replace")
+
+
+def compress_session_state(state: bytes) -> tuple[str, bytes]:
+    """Compresses serialized WebKit session state; returns (codec, data)."""
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=9).compress(state)
+    return "zlib", zlib.compress(state, 9)
+
+
+def decompress_session_state(codec: str, data: bytes) -> bytes:
+    """Inflates session state stored by compress_session_state()."""
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("Session state is zstd compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    return bytes(data)
+
+
+def replay_session_journal(tabs: list[dict], windows: list[dict], records) -> tuple[list[dict], list[dict]]:
+    """Applies (event, tab_key, payload) journal records in order to session tabs and windows.
+
+    Tabs are positioned after the tab whose key is in the record's "after" field,
+    so records stay valid whatever happens to unjournaled (private) tabs.
+    Window records carry the window id as their key.
+    """
+    tabs = [dict(tab) for tab in tabs]
+    windows = {window["window_id"]: dict(window) for window in windows}
+
+    def index_of(tab_key):
+        for i, tab in enumerate(tabs):
+            if tab.get("tab_key") == tab_key:
+                return i
+        return None
+
+    for event, tab_key, payload in records:
+        data = json.loads(payload) if payload else {}
+        if event == "window":
+            windows.setdefault(data["window_id"], {}).update(data)
+            continue
+        if event == "close-window":
+            windows.pop(data["window_id"], None)
+            tabs = [tab for tab in tabs if tab.get("window_id") != data["window_id"]]
+            continue
+
+        index = index_of(tab_key)
+        if event in ("open", "move"):
+            if event == "open":
+                tab = tabs.pop(index) if index is not None else {"tab_key": tab_key}
+            elif index is not None:
+                tab = tabs.pop(index)
+            else:
+                continue
+            tab.update({key: value for key, value in data.items() if key != "after"})
+            after_index = index_of(data.get("after")) if data.get("after") else None
+            tabs.insert(after_index + 1 if after_index is not None else 0, tab)
+        elif event in ("navigate", "pin") and index is not None:
+            tabs[index].update(data)
+        elif event == "select" and index is not None:
+            window_id = tabs[index].get("window_id")
+            for tab in tabs:
+                if tab.get("window_id") == window_id:
+                    tab["is_selected"] = False
+            tabs[index]["is_selected"] = True
+        elif event == "close" and index is not None:
+            tabs.pop(index)
+    return tabs, list(windows.values())
+
+
+def build_fts_prefix_query(text: str) -> str:
+    """Turns free text into an FTS5 query matching every word as a prefix."""
+    words = re.findall(r"\w+", text.lower())
+    return " ".join(f'"{word}"*' for word in words)
+
+
 class DatabaseManager:
+    # Markers around matched words in search_page_content() snippets
+    SNIPPET_MATCH_START = "\x02"
+    SNIPPET_MATCH_END = "\x03"
+    # Seconds the conversion of an existing file to incremental auto-vacuum may take
+    # at exit; a longer one is rolled back and tried again at the next exit
+    AUTO_VACUUM_CONVERSION_TIME_BUDGET = 20
+
     def __init__(self, db_path):
         self.db_path = db_path
+        self.change_listeners = []
         self._create_tables()
+        self.is_incremental_vacuum = self._get_auto_vacuum_mode() == 2
+        self._load_site_preferences()
+
+    def add_change_listener(self, callback):
+        """Calls callback(event, data) after history or bookmarks change, from the writing thread."""
+        self.change_listeners.append(callback)
+
+    def _notify_change(self, event: str, **data):
+        for callback in self.change_listeners:
+            try:
+                callback(event, data)
+            except Exception as e:
+                debug_print(f"[DB] Error in change listener for {event}: {e}")
 
     def _get_connection(self):
-        return sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        conn.create_function("frecency", 2, frecency_score)
+        conn.create_function("decompress_text", 1, decompress_text, deterministic=True)
+        return conn
 
     def _create_tables(self):
         conn = self._get_connection()
         cursor = conn.cursor()
 
+        # Only takes effect on a fresh file; existing ones are converted by enable_incremental_vacuum()
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # WAL lets background writers (page indexing) run without blocking UI reads
+        cursor.execute("PRAGMA journal_mode=WAL")
+
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS history (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -48,6 +181,46 @@ class DatabaseManager:
             )
         """)
 
+        # Session changes since the last snapshot, replayed on top of it at startup
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS session_journal (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                event TEXT NOT NULL,
+                tab_key TEXT NOT NULL,
+                payload TEXT,
+                timestamp TIMESTAMP NOT NULL
+            )
+        """)
+        self._ensure_column(cursor, "session", "tab_key", "TEXT")
+        self._ensure_column(cursor, "session", "state_hash", "TEXT")
+        self._ensure_column(cursor, "session", "container_id", "TEXT NOT NULL DEFAULT 'default'")
+        self._ensure_column(cursor, "session", "is_pinned", "INTEGER NOT NULL DEFAULT 0")
+        self._ensure_column(cursor, "session", "is_selected", "INTEGER NOT NULL DEFAULT 0")
+        # Snapshots saved by older versions have no tab keys for journal records to refer to
+        cursor.execute("UPDATE session SET tab_key = lower(hex(randomblob(16))) WHERE tab_key IS NULL")
+
+        # Geometry of the windows in the session snapshot
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS session_windows (
+                window_id INTEGER PRIMARY KEY,
+                window_index INTEGER NOT NULL,
+                width INTEGER,
+                height INTEGER,
+                is_maximized INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+
+        # Compressed WebKit session states, shared by tabs and journal records with identical history
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS session_state_blobs (
+                state_hash TEXT PRIMARY KEY,
+                codec TEXT NOT NULL,
+                data BLOB NOT NULL,
+                raw_size INTEGER NOT NULL,
+                stored_size INTEGER NOT NULL
+            )
+        """)
+
         # Zoom levels table for per-site zoom persistence
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS zoom_levels (
@@ -97,9 +270,130 @@ class DatabaseManager:
             )
         """)
 
+        # OpenSearch descriptors found on each origin, or that it has none, until the result expires
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS opensearch_discovery (
+                origin TEXT PRIMARY KEY,
+                descriptors TEXT NOT NULL,
+                expires TIMESTAMP NOT NULL
+            )
+        """)
+
+        # Compressed visible text of visited pages, one row per history entry
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS page_content (
+                history_id INTEGER PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                compressed_text BLOB NOT NULL,
+                indexed_date TIMESTAMP NOT NULL
+            )
+        """)
+
+        # Retention pruning and recent-history listing walk these in time order
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_history_last_visit ON history(last_visit)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_notification_history_timestamp ON notification_history(timestamp)")
+
+        self._create_fts_tables(cursor)
+        self._create_page_content_index(cursor)
+
         conn.commit()
         conn.close()
 
+    def _ensure_column(self, cursor, table: str, column: str, definition: str):
+        """Adds a column to a table created by an older version."""
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def _load_site_preferences(self):
+        """Mirrors the small per-site preference tables in memory for lookups on every navigation."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT domain, zoom_level FROM zoom_levels")
+        self._zoom_levels = dict(cursor.fetchall())
+        cursor.execute("SELECT domain, permission FROM notification_permissions")
+        self._notification_permissions = dict(cursor.fetchall())
+        conn.close()
+        debug_print(f"[DB] Cached {len(self._zoom_levels)} zoom levels and "
+                    f"{len(self._notification_permissions)} notification permissions")
+
+    def _create_fts_tables(self, cursor):
+        """Creates FTS5 indexes over history and bookmarks, kept in sync by triggers."""
+        self.fts_enabled = True
+        for table in ("history", "bookmarks"):
+            fts_table = f"{table}_fts"
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_table,))
+            is_new = cursor.fetchone() is None
+            try:
+                # External content tables: the index stores tokens only, rows live in the base table
+                cursor.execute(f"""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table}
+                    USING fts5(title, url, content='{table}', content_rowid='id')
+                """)
+            except sqlite3.OperationalError as e:
+                debug_print(f"[DB] FTS5 unavailable, falling back to substring search: {e}")
+                self.fts_enabled = False
+                return
+
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+                    INSERT INTO {fts_table}(rowid, title, url) VALUES (new.id, new.title, new.url);
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+                    INSERT INTO {fts_table}({fts_table}, rowid, title, url) VALUES ('delete', old.id, old.title, old.url);
+                END
+            """)
+            # Visit counter bumps don't touch indexed columns, so only reindex on title/url changes
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF title, url ON {table} BEGIN
+                    INSERT INTO {fts_table}({fts_table}, rowid, title, url) VALUES ('delete', old.id, old.title, old.url);
+                    INSERT INTO {fts_table}(rowid, title, url) VALUES (new.id, new.title, new.url);
+                END
+            """)
+
+            if is_new:
+                # Index rows that existed before the FTS table was introduced
+                cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+                debug_print(f"[DB] Built full-text index {fts_table}")
+
+    def _create_page_content_index(self, cursor):
+        """Creates the FTS5 index over page text; the text itself stays compressed."""
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS history_page_content_delete AFTER DELETE ON history BEGIN
+                DELETE FROM page_content WHERE history_id = old.id;
+            END
+        """)
+        if not self.fts_enabled:
+            return
+
+        # The index reads document text through this view, so snippets are inflated on demand
+        cursor.execute("""
+            CREATE VIEW IF NOT EXISTS page_content_text AS
+            SELECT history_id, decompress_text(compressed_text) AS body FROM page_content
+        """)
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS page_content_fts
+            USING fts5(body, content='page_content_text', content_rowid='history_id')
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS page_content_fts_insert AFTER INSERT ON page_content BEGIN
+                INSERT INTO page_content_fts(rowid, body) VALUES (new.history_id, decompress_text(new.compressed_text));
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS page_content_fts_delete AFTER DELETE ON page_content BEGIN
+                INSERT INTO page_content_fts(page_content_fts, rowid, body) VALUES ('delete', old.history_id, decompress_text(old.compressed_text));
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS page_content_fts_update AFTER UPDATE OF compressed_text ON page_content BEGIN
+                INSERT INTO page_content_fts(page_content_fts, rowid, body) VALUES ('delete', old.history_id, decompress_text(old.compressed_text));
+                INSERT INTO page_content_fts(rowid, body) VALUES (new.history_id, decompress_text(new.compressed_text));
+            END
+        """)
+
     def add_history_entry(self, url: str, title: str):
         conn = self._get_connection()
         cursor = conn.cursor()
@@ -117,6 +411,7 @@ class DatabaseManager:
             """, (now, title, url))
         conn.commit()
         conn.close()
+        self._notify_change("visit", url=url, title=title, time=now)
 
     def get_history(self, limit=100) -> list[tuple]: # Change limit to None for all history
         conn = self._get_connection()
@@ -133,13 +428,144 @@ class DatabaseManager:
         conn.close()
         return history_entries
 
+    def get_history_batch(self, after_id: int = 0, limit: int = 5000) -> list[tuple]:
+        """Gets (id, url, title, visit_count, last_visit) rows with ids after after_id, in id order."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, url, title, visit_count, last_visit
+            FROM history
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (after_id, limit))
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+
+    def search_history(self, query: str, limit: int = 10) -> list[tuple]:
+        """Prefix-searches history titles and URLs, best matches first."""
+        fts_query = build_fts_prefix_query(query)
+        if not fts_query:
+            return []
+        if not self.fts_enabled:
+            return self._search_history_like(query, limit)
+
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            # Take the best textual matches, then favour frequently and recently visited pages
+            cursor.execute("""
+                SELECT h.url, h.title, h.last_visit
+                FROM (
+                    SELECT rowid, bm25(history_fts, 2.0, 1.0) AS score
+                    FROM history_fts
+                    WHERE history_fts MATCH ?
+                    ORDER BY score
+                    LIMIT ?
+                ) AS matches
+                JOIN history h ON h.id = matches.rowid
+                ORDER BY matches.score * (1.0 + frecency(h.visit_count, h.last_visit))
+                LIMIT ?
+            """, (fts_query, limit * 20, limit))
+            results = cursor.fetchall()
+        except sqlite3.OperationalError as e:
+            debug_print(f"[DB] History search failed for '{query}': {e}")
+            results = []
+        conn.close()
+        return results
+
+    def _search_history_like(self, query: str, limit: int) -> list[tuple]:
+        """Substring search used when SQLite lacks FTS5."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        pattern = f"%{query}%"
+        cursor.execute("""
+            SELECT url, title, last_visit
+            FROM history
+            WHERE url LIKE ? OR title LIKE ?
+            ORDER BY visit_count DESC, last_visit DESC
+            LIMIT ?
+        """, (pattern, pattern, limit))
+        results = cursor.fetchall()
+        conn.close()
+        return results
+
+    def store_page_contents(self, pages: list[tuple]) -> int:
+        """Stores extracted (url, text) pairs for history entries in one transaction."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        now = datetime.now().isoformat()
+        stored = 0
+        for url, text in pages:
+            cursor.execute("SELECT id FROM history WHERE url = ?", (url,))
+            row = cursor.fetchone()
+            if not row or not text:
+                continue
+            history_id = row[0]
+            content_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+            cursor.execute("SELECT content_hash FROM page_content WHERE history_id = ?", (history_id,))
+            existing = cursor.fetchone()
+            if existing and existing[0] == content_hash:
+                continue  # Unchanged since the last visit, skip recompressing and reindexing
+
+            compressed = zlib.compress(text.encode("utf-8"), 6)
+            if existing:
+                cursor.execute("""
+                    UPDATE page_content
+                    SET content_hash = ?, compressed_text = ?, indexed_date = ?
+                    WHERE history_id = ?
+                """, (content_hash, compressed, now, history_id))
+            else:
+                cursor.execute("""
+                    INSERT INTO page_content (history_id, content_hash, compressed_text, indexed_date)
+                    VALUES (?, ?, ?, ?)
+                """, (history_id, content_hash, compressed, now))
+            stored += 1
+        conn.commit()
+        conn.close()
+        return stored
+
+    def search_page_content(self, query: str, limit: int = 20) -> list[tuple]:
+        """Searches visited page text, returning (url, title, snippet, last_visit).
+
+        Matched words in the snippet are wrapped in SNIPPET_MATCH_START/END markers.
+        """
+        fts_query = build_fts_prefix_query(query)
+        if not fts_query or not self.fts_enabled:
+            return []
+
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT h.url, h.title,
+                       snippet(page_content_fts, 0, ?, ?, '…', 12),
+                       h.last_visit
+                FROM page_content_fts
+                JOIN history h ON h.id = page_content_fts.rowid
+                WHERE page_content_fts MATCH ?
+                ORDER BY rank
+                LIMIT ?
+            """, (self.SNIPPET_MATCH_START, self.SNIPPET_MATCH_END, fts_query, limit))
+            results = cursor.fetchall()
+        except sqlite3.OperationalError as e:
+            debug_print(f"[DB] Page content search failed for '{query}': {e}")
+            results = []
+        conn.close()
+        return results
+
     def clear_history(self):
         conn = self._get_connection()
         cursor = conn.cursor()
         cursor.execute("DELETE FROM history")
+        # Which origins were scanned for search engines is history too
+        cursor.execute("DELETE FROM opensearch_discovery")
         conn.commit()
         conn.close()
         debug_print("History cleared.")
+        self._notify_change("history-cleared")
 
     def add_bookmark(self, url: str, title: str) -> bool:
         conn = self._get_connection()
@@ -152,6 +578,7 @@ class DatabaseManager:
             """, (url, title, now))
             conn.commit()
             conn.close()
+            self._notify_change("bookmark-added", url=url, title=title, time=now)
             return True
         except sqlite3.IntegrityError:
             debug_print(f"Bookmark for {url} already exists.")
@@ -164,6 +591,7 @@ class DatabaseManager:
         cursor.execute("DELETE FROM bookmarks WHERE url = ?", (url,))
         conn.commit()
         conn.close()
+        self._notify_change("bookmark-removed", url=url)
 
     def get_bookmarks(self) -> list[tuple]:
         conn = self._get_connection()
@@ -173,6 +601,40 @@ class DatabaseManager:
         conn.close()
         return bookmarks
 
+    def search_bookmarks(self, query: str, limit: int = 10) -> list[tuple]:
+        """Prefix-searches bookmark titles and URLs, best matches first."""
+        fts_query = build_fts_prefix_query(query)
+        if not fts_query:
+            return []
+
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            if self.fts_enabled:
+                cursor.execute("""
+                    SELECT b.url, b.title, b.added_date
+                    FROM bookmarks_fts
+                    JOIN bookmarks b ON b.id = bookmarks_fts.rowid
+                    WHERE bookmarks_fts MATCH ?
+                    ORDER BY bm25(bookmarks_fts, 2.0, 1.0)
+                    LIMIT ?
+                """, (fts_query, limit))
+            else:
+                pattern = f"%{query}%"
+                cursor.execute("""
+                    SELECT url, title, added_date
+                    FROM bookmarks
+                    WHERE url LIKE ? OR title LIKE ?
+                    ORDER BY title ASC
+                    LIMIT ?
+                """, (pattern, pattern, limit))
+            results = cursor.fetchall()
+        except sqlite3.OperationalError as e:
+            debug_print(f"[DB] Bookmark search failed for '{query}': {e}")
+            results = []
+        conn.close()
+        return results
+
     def is_bookmarked(self, url: str) -> bool:
         conn = self._get_connection()
         cursor = conn.cursor()
@@ -189,56 +651,227 @@ class DatabaseManager:
         conn.close()
         return list(set(domains))
 
-    def save_session(self, session_data: list[dict]):
-        """Saves current session tabs to the database."""
+    def save_session(self, session_data: list[dict], windows: list[dict] = None):
+        """Saves current session tabs and windows to the database, replacing the snapshot and journal."""
         conn = self._get_connection()
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM session") # Clear previous session
-        for i, tab_data in enumerate(session_data):
-            cursor.execute("""
-                INSERT INTO session (window_id, tab_index, url, title, is_private, serialized_state)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                1, # Simple window_id for now, assuming single window
-                i,
-                tab_data.get("url", ""),
-                tab_data.get("title", ""),
-                1 if tab_data.get("is_private", False) else 0,
-                tab_data.get("serialized_state", "") # Store serialized state if available
-            ))
+        self._write_session_snapshot(cursor, session_data, windows)
+        cursor.execute("DELETE FROM session_journal")
+        self._delete_unused_session_states(cursor)
         conn.commit()
         conn.close()
         debug_print(f"Session saved with {len(session_data)} tabs.")
 
     def load_session(self) -> list[dict]:
-        """Loads session tabs from the database."""
+        """Loads the session snapshot tabs from the database."""
         conn = self._get_connection()
         cursor = conn.cursor()
+        session_entries = self._attach_session_states(cursor, self._read_session_snapshot(cursor))
+        conn.close()
+        debug_print(f"Loaded session with {len(session_entries)} tabs.")
+        return session_entries
+
+    def _read_session_snapshot(self, cursor) -> list[dict]:
+        """Reads snapshot tabs with their state_hash; states are attached by _attach_session_states()."""
         cursor.execute("""
-            SELECT url, title, is_private, serialized_state
+            SELECT tab_key, window_id, url, title, is_private, container_id, is_pinned, is_selected,
+                   state_hash, serialized_state
             FROM session
             ORDER BY tab_index ASC
         """)
         session_entries = []
-        for url, title, is_private_int, serialized_state in cursor.fetchall():
+        for (tab_key, window_id, url, title, is_private_int, container_id, is_pinned, is_selected,
+             state_hash, legacy_state) in cursor.fetchall():
             session_entries.append({
+                "tab_key": tab_key,
+                "window_id": window_id or 1,
                 "url": url,
                 "title": title,
                 "is_private": bool(is_private_int),
-                "serialized_state": serialized_state # Deserialize later in WebKit
+                "container_id": container_id or "default",
+                "is_pinned": bool(is_pinned),
+                "is_selected": bool(is_selected),
+                "state_hash": state_hash,
+                # Sessions saved by older versions kept the state inline as latin1 text
+                "serialized_state": legacy_state.encode("latin1") if legacy_state else None,
             })
-        conn.close()
-        debug_print(f"Loaded session with {len(session_entries)} tabs.")
         return session_entries
 
-    def get_zoom_level(self, domain: str) -> float:
-        """Get the zoom level for a specific domain."""
+    def _read_session_windows(self, cursor) -> list[dict]:
+        cursor.execute("""
+            SELECT window_id, width, height, is_maximized
+            FROM session_windows
+            ORDER BY window_index ASC
+        """)
+        return [{"window_id": window_id, "width": width, "height": height, "is_maximized": bool(is_maximized)}
+                for window_id, width, height, is_maximized in cursor.fetchall()]
+
+    def _attach_session_states(self, cursor, tabs: list[dict]) -> list[dict]:
+        """Replaces the state_hash of each tab with its decompressed serialized_state bytes."""
+        for tab in tabs:
+            state_hash = tab.pop("state_hash", None)
+            if not state_hash:
+                continue
+            cursor.execute("SELECT codec, data FROM session_state_blobs WHERE state_hash = ?", (state_hash,))
+            row = cursor.fetchone()
+            try:
+                tab["serialized_state"] = decompress_session_state(*row) if row else None
+            except (ValueError, zlib.error) as e:
+                debug_print(f"Could not decompress session state for {tab.get('url')}: {e}")
+                tab["serialized_state"] = None
+        return tabs
+
+    def _store_session_state(self, cursor, state: bytes) -> str:
+        """Stores serialized session state bytes once per distinct content; returns its hash."""
+        if not state:
+            return None
+        state_hash = hashlib.sha1(state).hexdigest()
+        cursor.execute("SELECT 1 FROM session_state_blobs WHERE state_hash = ?", (state_hash,))
+        if cursor.fetchone() is None:
+            codec, data = compress_session_state(state)
+            cursor.execute("""
+                INSERT INTO session_state_blobs (state_hash, codec, data, raw_size, stored_size)
+                VALUES (?, ?, ?, ?, ?)
+            """, (state_hash, codec, data, len(state), len(data)))
+        return state_hash
+
+    def _delete_unused_session_states(self, cursor):
+        """Removes states no longer referenced by the snapshot or the journal."""
+        cursor.execute("""
+            DELETE FROM session_state_blobs
+            WHERE state_hash NOT IN (SELECT state_hash FROM session WHERE state_hash IS NOT NULL)
+            AND state_hash NOT IN (
+                SELECT json_extract(payload, '$.state_hash') FROM session_journal
+                WHERE json_extract(payload, '$.state_hash') IS NOT NULL
+            )
+        """)
+
+    def _write_session_snapshot(self, cursor, session_data: list[dict], windows: list[dict] = None):
+        cursor.execute("DELETE FROM session") # Clear previous session
+        for i, tab_data in enumerate(session_data):
+            # Tabs replayed from the journal already reference a stored state
+            state_hash = tab_data.get("state_hash") or self._store_session_state(
+                cursor, tab_data.get("serialized_state"))
+            cursor.execute("""
+                INSERT INTO session (window_id, tab_index, tab_key, url, title, is_private,
+                                     container_id, is_pinned, is_selected, state_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                tab_data.get("window_id") or 1,
+                i,
+                tab_data.get("tab_key") or uuid.uuid4().hex,
+                tab_data.get("url", ""),
+                tab_data.get("title", ""),
+                1 if tab_data.get("is_private", False) else 0,
+                tab_data.get("container_id") or "default",
+                1 if tab_data.get("is_pinned", False) else 0,
+                1 if tab_data.get("is_selected", False) else 0,
+                state_hash
+            ))
+
+        cursor.execute("DELETE FROM session_windows")
+        for i, window in enumerate(windows or []):
+            cursor.execute("""
+                INSERT INTO session_windows (window_id, window_index, width, height, is_maximized)
+                VALUES (?, ?, ?, ?, ?)
+            """, (window["window_id"], i, window.get("width"), window.get("height"),
+                  1 if window.get("is_maximized") else 0))
+
+    def append_session_journal(self, records: list[tuple]):
+        """Appends (event, tab_key, payload) session journal records in one transaction.
+
+        A serialized_state in a payload is stored as a session state blob and
+        the record references it by state_hash.
+        """
         conn = self._get_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT zoom_level FROM zoom_levels WHERE domain = ?", (domain,))
-        result = cursor.fetchone()
+        now = datetime.now().isoformat()
+        rows = []
+        for event, tab_key, payload in records:
+            if "serialized_state" in payload:
+                payload = dict(payload)
+                payload["state_hash"] = self._store_session_state(cursor, payload.pop("serialized_state"))
+                payload["serialized_state"] = None  # Supersedes a legacy inline state
+            rows.append((event, tab_key, json.dumps(payload), now))
+        cursor.executemany("""
+            INSERT INTO session_journal (event, tab_key, payload, timestamp)
+            VALUES (?, ?, ?, ?)
+        """, rows)
+        conn.commit()
+        conn.close()
+
+    def load_session_with_journal(self) -> list[dict]:
+        """Loads the session tabs as last journaled: the snapshot with the journal replayed."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        tabs, _ = self._replay_session(cursor)
+        tabs = self._attach_session_states(cursor, tabs)
+        conn.close()
+        debug_print(f"Loaded session with {len(tabs)} tabs from snapshot and journal.")
+        return tabs
+
+    def load_session_windows(self) -> list[dict]:
+        """Loads the journaled session grouped by window; each window dict has its tabs in order."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        tabs, windows = self._replay_session(cursor)
+        tabs = self._attach_session_states(cursor, tabs)
+        conn.close()
+
+        windows_by_id = {window["window_id"]: dict(window, tabs=[]) for window in windows}
+        for tab in tabs:
+            # Tabs saved before windows were recorded get a window without geometry
+            window = windows_by_id.setdefault(tab["window_id"], {"window_id": tab["window_id"], "tabs": []})
+            window["tabs"].append(tab)
+        return [window for window in windows_by_id.values() if window["tabs"]]
+
+    def _replay_session(self, cursor) -> tuple[list[dict], list[dict]]:
+        tabs = self._read_session_snapshot(cursor)
+        windows = self._read_session_windows(cursor)
+        cursor.execute("SELECT event, tab_key, payload FROM session_journal ORDER BY seq ASC")
+        return replay_session_journal(tabs, windows, cursor.fetchall())
+
+    def compact_session_journal(self) -> int:
+        """Folds the journal into the snapshot; returns the number of records folded."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        # Take the write lock up front so no record is appended between reading and deleting
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT event, tab_key, payload FROM session_journal ORDER BY seq ASC")
+        records = cursor.fetchall()
+        if records:
+            tabs, windows = replay_session_journal(
+                self._read_session_snapshot(cursor), self._read_session_windows(cursor), records)
+            self._write_session_snapshot(cursor, tabs, windows)
+            cursor.execute("DELETE FROM session_journal")
+            self._delete_unused_session_states(cursor)
+        conn.commit()
+        conn.close()
+        return len(records)
+
+    def get_session_state_stats(self) -> dict:
+        """Returns the number of stored session states and their raw and compressed sizes."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(stored_size), 0)
+            FROM session_state_blobs
+        """)
+        count, raw_bytes, stored_bytes = cursor.fetchone()
+        cursor.execute("SELECT COUNT(*) FROM session WHERE state_hash IS NOT NULL")
+        referencing_tabs = cursor.fetchone()[0]
         conn.close()
-        return result[0] if result else 1.0  # Default zoom level is 1.0 (100%)
+        return {
+            "states": count,
+            "tabs_with_state": referencing_tabs,
+            "raw_bytes": raw_bytes,
+            "stored_bytes": stored_bytes,
+            "codec": "zstd" if zstandard is not None else "zlib",
+        }
+
+    def get_zoom_level(self, domain: str) -> float:
+        """Get the zoom level for a specific domain."""
+        return self._zoom_levels.get(domain, 1.0)  # Default zoom level is 1.0 (100%)
 
     def set_zoom_level(self, domain: str, zoom_level: float):
         """Set the zoom level for a specific domain."""
@@ -258,6 +891,7 @@ class DatabaseManager:
             """, (zoom_level, now, domain))
         conn.commit()
         conn.close()
+        self._zoom_levels[domain] = zoom_level
         debug_print(f"Set zoom level for {domain} to {zoom_level}")
 
     def remove_zoom_level(self, domain: str):
@@ -267,6 +901,7 @@ class DatabaseManager:
         cursor.execute("DELETE FROM zoom_levels WHERE domain = ?", (domain,))
         conn.commit()
         conn.close()
+        self._zoom_levels.pop(domain, None)
         debug_print(f"Removed zoom level for {domain}")
 
     def get_all_zoom_levels(self) -> list[tuple]:
@@ -412,6 +1047,17 @@ class DatabaseManager:
         conn.commit()
         conn.close()
 
+    def update_search_engines_last_used(self, last_used: dict):
+        """Write the last used timestamps of several search engines (engine id -> ISO time) at once."""
+        if not last_used:
+            return
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.executemany("UPDATE search_engines SET last_used = ? WHERE id = ?",
+                           [(timestamp, engine_id) for engine_id, timestamp in last_used.items()])
+        conn.commit()
+        conn.close()
+
     def reorder_search_engines(self, engine_positions: list[tuple]):
         """Reorder search engines by updating their positions."""
         conn = self._get_connection()
@@ -430,6 +1076,39 @@ class DatabaseManager:
         conn.close()
         return count > 0
 
+    def get_opensearch_discoveries(self) -> list[tuple]:
+        """Get the unexpired OpenSearch discovery results as (origin, descriptors JSON, expires)."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT origin, descriptors, expires FROM opensearch_discovery WHERE expires > ?",
+                       (datetime.now().isoformat(),))
+        discoveries = cursor.fetchall()
+        conn.close()
+        return discoveries
+
+    def set_opensearch_discoveries(self, discoveries: list[tuple]):
+        """Store OpenSearch discovery results given as (origin, descriptors JSON, expires) in one transaction."""
+        if not discoveries:
+            return
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.executemany("""
+            INSERT OR REPLACE INTO opensearch_discovery (origin, descriptors, expires)
+            VALUES (?, ?, ?)
+        """, discoveries)
+        conn.commit()
+        conn.close()
+
+    def prune_opensearch_discoveries(self) -> int:
+        """Delete expired OpenSearch discovery results; returns the number deleted."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM opensearch_discovery WHERE expires <= ?", (datetime.now().isoformat(),))
+        deleted = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return deleted
+
     def set_notification_permission(self, domain: str, permission: str) -> bool:
         """Set notification permission for a domain (allow, deny, default)."""
         conn = self._get_connection()
@@ -450,17 +1129,13 @@ class DatabaseManager:
         
         conn.commit()
         conn.close()
+        self._notification_permissions[domain] = permission
         debug_print(f"Set notification permission for {domain} to {permission}")
         return True
 
     def get_notification_permission(self, domain: str) -> str:
         """Get notification permission for a domain."""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT permission FROM notification_permissions WHERE domain = ?", (domain,))
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result else "default"
+        return self._notification_permissions.get(domain, "default")
 
     def update_notification_last_used(self, domain: str):
         """Update the last used timestamp for notification permission."""
@@ -487,6 +1162,7 @@ class DatabaseManager:
         cursor.execute("DELETE FROM notification_permissions WHERE domain = ?", (domain,))
         conn.commit()
         conn.close()
+        self._notification_permissions.pop(domain, None)
         debug_print(f"Removed notification permission for {domain}")
 
     def log_notification(self, domain: str, title: str, body: str = None):
@@ -527,3 +1203,159 @@ class DatabaseManager:
         conn.commit()
         conn.close()
         debug_print("Notification history cleared")
+
+    def prune_history(self, max_age_days: int = 0, max_entries: int = 0,
+                      keep_bookmarked: bool = True, keep_frecency: float = 0.0,
+                      batch_size: int = 500) -> int:
+        """Deletes at most batch_size expired history entries, oldest first.
+
+        Entries older than max_age_days or beyond the newest max_entries are
+        expired, unless they are bookmarked (with keep_bookmarked) or their
+        frecency reaches keep_frecency. A limit of 0 disables it.
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        exclusions = ""
+        params = []
+        if keep_bookmarked:
+            exclusions += " AND url NOT IN (SELECT url FROM bookmarks)"
+        if keep_frecency > 0:
+            exclusions += " AND frecency(visit_count, last_visit) < ?"
+            params.append(keep_frecency)
+
+        expired = []
+        if max_age_days > 0:
+            cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+            cursor.execute(f"""
+                SELECT id, url FROM history
+                WHERE last_visit < ?{exclusions}
+                ORDER BY last_visit ASC
+                LIMIT ?
+            """, [cutoff] + params + [batch_size])
+            expired = cursor.fetchall()
+
+        if max_entries > 0 and len(expired) < batch_size:
+            cursor.execute("SELECT COUNT(*) FROM history")
+            excess = cursor.fetchone()[0] - len(expired) - max_entries
+            if excess > 0:
+                # Skip past the rows already selected by age, they are the oldest ones
+                cursor.execute(f"""
+                    SELECT id, url FROM history
+                    WHERE 1{exclusions}
+                    ORDER BY last_visit ASC
+                    LIMIT ? OFFSET ?
+                """, params + [min(excess, batch_size - len(expired)), len(expired)])
+                expired.extend(cursor.fetchall())
+
+        if expired:
+            # Triggers drop the matching full-text and page content rows
+            cursor.executemany("DELETE FROM history WHERE id = ?", [(row[0],) for row in expired])
+        conn.commit()
+        conn.close()
+        if expired:
+            self._notify_change("history-removed", urls=[row[1] for row in expired])
+        return len(expired)
+
+    def prune_notification_history(self, max_age_days: int, batch_size: int = 500) -> int:
+        """Deletes at most batch_size notification log entries older than max_age_days."""
+        if max_age_days <= 0:
+            return 0
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+        cursor.execute("""
+            DELETE FROM notification_history
+            WHERE id IN (
+                SELECT id FROM notification_history
+                WHERE timestamp < ?
+                ORDER BY timestamp ASC
+                LIMIT ?
+            )
+        """, (cutoff, batch_size))
+        deleted = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return deleted
+
+    def _get_auto_vacuum_mode(self) -> int:
+        conn = self._get_connection()
+        try:
+            return conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        finally:
+            conn.close()
+
+    def enable_incremental_vacuum(self, time_budget: float = None) -> bool:
+        """Switches the database to incremental auto-vacuum; returns True if it had to rebuild.
+
+        The rebuild locks the whole file, so it is meant to run once nothing
+        else writes, at exit. If it takes longer than time_budget seconds it
+        is rolled back, leaving the database as it was.
+        """
+        if self._get_auto_vacuum_mode() == 2:
+            self.is_incremental_vacuum = True
+            return False
+        conn = self._get_connection()
+        try:
+            if time_budget is not None:
+                deadline = time.monotonic() + time_budget
+                conn.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+            # Changing the mode of an existing database only takes effect after a full VACUUM
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        except sqlite3.Error as e:
+            debug_print(f"[DB] Could not switch to incremental auto-vacuum, trying again at next exit: {e}")
+            return False
+        finally:
+            conn.close()
+        self.is_incremental_vacuum = True
+        debug_print("[DB] Enabled incremental auto-vacuum")
+        return True
+
+    def incremental_vacuum(self, max_pages: int = 256) -> int:
+        """Returns up to max_pages free pages to the filesystem; returns the pages freed."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA freelist_count")
+        free_before = cursor.fetchone()[0]
+        # executescript() steps the pragma to completion; execute() frees a single page
+        conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)});")
+        cursor.execute("PRAGMA freelist_count")
+        freed = free_before - cursor.fetchone()[0]
+        conn.close()
+        return freed
+
+    def optimize(self):
+        """Refreshes query planner statistics and merges full-text index segments."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        if self.fts_enabled:
+            for fts_table in ("history_fts", "bookmarks_fts", "page_content_fts"):
+                cursor.execute(f"INSERT INTO {fts_table}({fts_table}, rank) VALUES ('merge', 500)")
+        conn.commit()
+        cursor.execute("PRAGMA optimize")
+        # Move WAL content into the main file so the next reads hit a compact file
+        cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.close()
+
+    def get_database_stats(self) -> dict:
+        """Returns file size, free pages and row counts of the main tables."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA page_size")
+        page_size = cursor.fetchone()[0]
+        cursor.execute("PRAGMA page_count")
+        page_count = cursor.fetchone()[0]
+        cursor.execute("PRAGMA freelist_count")
+        free_pages = cursor.fetchone()[0]
+        stats = {
+            "size_bytes": page_size * page_count,
+            "free_bytes": page_size * free_pages,
+        }
+        for table in ("history", "bookmarks", "page_content", "notification_history", "session"):
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            stats[f"{table}_rows"] = cursor.fetchone()[0]
+        cursor.execute("SELECT COALESCE(SUM(stored_size), 0) FROM session_state_blobs")
+        stats["session_state_bytes"] = cursor.fetchone()[0]
+        conn.close()
+        return stats
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Database maintenance for Seoltoir browser.
+Expires old history and notification log entries in small batches and
+returns the freed space to the filesystem, without blocking the UI.
+"""
+
+from gi.repository import GLib, Gio
+
+import time
+from .debug import debug_print
+from .executor_service import ExecutorService, Priority
+
+
+class DatabaseMaintenance:
+    """Runs retention pruning and incremental vacuum in the background."""
+
+    # Seconds after startup before the first pass, so it never slows down session restore
+    STARTUP_DELAY = 120
+    # Seconds between passes
+    PASS_INTERVAL = 1800
+    # Rows deleted per transaction
+    BATCH_SIZE = 500
+    # Batches per pass, so a huge backlog is worked off over several passes
+    MAX_BATCHES_PER_PASS = 40
+    # Pages handed back to the filesystem per vacuum step
+    VACUUM_PAGES_PER_STEP = 512
+
+    def __init__(self, application, db_manager):
+        self.db_manager = db_manager
+        self.settings = Gio.Settings.new(application.get_application_id())
+
+        self.pass_timer_id = None
+        self.idle_source_id = None
+        self.is_running = False
+        self.is_stopped = False
+        self.steps = []
+        self.batches_run = 0
+        self.pass_started = 0.0
+
+        # Statistics for the performance monitor
+        self.last_pass_time = None
+        self.last_pass_duration = 0.0
+        self.history_rows_pruned = 0
+        self.notification_rows_pruned = 0
+        self.pages_vacuumed = 0
+
+        self.pass_timer_id = GLib.timeout_add_seconds(self.STARTUP_DELAY, self._on_startup_delay_elapsed)
+        debug_print("[MAINT] Database maintenance initialized")
+
+    def _on_startup_delay_elapsed(self) -> bool:
+        self.pass_timer_id = GLib.timeout_add_seconds(self.PASS_INTERVAL, self._start_pass)
+        self._start_pass()
+        return False
+
+    def _start_pass(self) -> bool:
+        """Start a maintenance pass unless one is still running."""
+        if self.is_running or self.is_stopped:
+            return True
+
+        self.is_running = True
+        self.batches_run = 0
+        self.pass_started = time.time()
+        self.steps = [self._step_prune_history,
+                      self._step_prune_notifications, self._step_vacuum, self._step_optimize]
+        self._schedule_next_step()
+        return True  # Keep the periodic timer
+
+    def _schedule_next_step(self):
+        # Low priority idle: a step only starts once the main loop has nothing better to do
+        self.idle_source_id = GLib.idle_add(self._run_next_step, priority=GLib.PRIORITY_LOW)
+
+    def _run_next_step(self) -> bool:
+        self.idle_source_id = None
+        if self.is_stopped or not self.steps:
+            self._finish_pass()
+            return False
+        ExecutorService.get_default().submit(ExecutorService.DISK, self._run_step_in_thread, self.steps[0],
+                                             priority=Priority.LOW)
+        return False
+
+    def _run_step_in_thread(self, step):
+        """Run one short database transaction; runs in a worker thread."""
+        try:
+            step_done = step()
+        except Exception as e:
+            debug_print(f"[MAINT] Maintenance step {step.__name__} failed: {e}")
+            step_done = True
+        GLib.idle_add(self._on_step_finished, step_done)
+
+    def _on_step_finished(self, step_done: bool) -> bool:
+        if step_done and self.steps:
+            self.steps.pop(0)
+        self.batches_run += 1
+        if self.batches_run >= self.MAX_BATCHES_PER_PASS:
+            # Leave the rest of the backlog for the next pass
+            self.steps = [step for step in self.steps if step in (self._step_vacuum, self._step_optimize)]
+        self._schedule_next_step()
+        return False
+
+    def _finish_pass(self):
+        self.is_running = False
+        self.steps = []
+        self.last_pass_time = time.time()
+        self.last_pass_duration = self.last_pass_time - self.pass_started
+        debug_print(f"[MAINT] Maintenance pass finished in {self.last_pass_duration:.2f}s")
+
+    # Steps return True when done, False to be run again with the next batch
+
+    def _step_prune_history(self) -> bool:
+        deleted = self.db_manager.prune_history(
+            max_age_days=self.settings.get_int("history-max-age-days"),
+            max_entries=self.settings.get_int("history-max-entries"),
+            keep_bookmarked=self.settings.get_boolean("history-keep-bookmarked"),
+            keep_frecency=self.settings.get_double("history-keep-frecency-threshold"),
+            batch_size=self.BATCH_SIZE,
+        )
+        self.history_rows_pruned += deleted
+        if deleted:
+            debug_print(f"[MAINT] Pruned {deleted} history entries")
+        return deleted < self.BATCH_SIZE
+
+    def _step_prune_notifications(self) -> bool:
+        deleted = self.db_manager.prune_notification_history(
+            self.settings.get_int("notification-history-max-age-days"), self.BATCH_SIZE
+        )
+        self.notification_rows_pruned += deleted
+        return deleted < self.BATCH_SIZE
+
+    def _step_vacuum(self) -> bool:
+        if not self.db_manager.is_incremental_vacuum:
+            # Nothing to hand back until the file is converted at exit
+            return True
+        freed = self.db_manager.incremental_vacuum(self.VACUUM_PAGES_PER_STEP)
+        self.pages_vacuumed += freed
+        return freed < self.VACUUM_PAGES_PER_STEP
+
+    def _step_optimize(self) -> bool:
+        self.db_manager.optimize()
+        return True
+
+    def get_stats(self) -> dict:
+        """Get maintenance statistics."""
+        return {
+            'last_pass_time': self.last_pass_time,
+            'last_pass_duration': self.last_pass_duration,
+            'history_rows_pruned': self.history_rows_pruned,
+            'notification_rows_pruned': self.notification_rows_pruned,
+            'pages_vacuumed': self.pages_vacuumed,
+            'is_incremental_vacuum': self.db_manager.is_incremental_vacuum,
+            'is_running': self.is_running,
+        }
+
+    def cleanup(self):
+        """Stop scheduling maintenance work."""
+        self.is_stopped = True
+        if self.pass_timer_id:
+            GLib.source_remove(self.pass_timer_id)
+            self.pass_timer_id = None
+        if self.idle_source_id:
+            GLib.source_remove(self.idle_source_id)
+            self.idle_source_id = None
+        debug_print("[MAINT] Database maintenance cleaned up")
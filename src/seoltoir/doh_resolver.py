@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+DNS over HTTPS resolver for Seoltoir browser.
+Looks up host names for the browser's own fetches (favicons, suggestions,
+OpenSearch descriptions, filter lists) through the configured DoH provider,
+so with DoH enabled they do not reveal every host to the system resolver.
+"""
+
+import base64
+import ipaddress
+import socket
+import struct
+import threading
+import time
+import requests
+from .debug import debug_print
+
+
+class DohError(Exception):
+    """A host name could not be resolved through the DoH provider."""
+
+
+class DohResolver:
+    """Resolves host names with RFC 8484 queries to one DoH provider, caching answers for their TTL."""
+
+    # Seconds to wait for the provider
+    TIMEOUT = 5
+    # Bounds applied to the TTLs of answers
+    MIN_TTL = 30
+    MAX_TTL = 3600
+    # Host names whose answers are kept
+    MAX_CACHED_HOSTS = 512
+
+    RECORD_A = 1
+    RECORD_AAAA = 28
+
+    def __init__(self, provider_url: str):
+        self.provider_url = provider_url
+        self.lock = threading.Lock()
+        self.cache = {}  # host -> (expires monotonic time, address)
+        # The provider itself is found with the system resolver; that only reveals the provider
+        self.session = requests.Session()
+        self.session.trust_env = False
+
+        # Statistics
+        self.queries = 0
+        self.cache_hits = 0
+        self.failures = 0
+
+    def resolve(self, host: str) -> str:
+        """Get an address of host; raises DohError rather than falling back to the system resolver."""
+        host = host.rstrip(".").lower()
+        try:
+            ipaddress.ip_address(host)
+            return host
+        except ValueError:
+            pass
+        if host == "localhost":
+            return "127.0.0.1"
+
+        with self.lock:
+            cached = self.cache.get(host)
+            if cached and cached[0] > time.monotonic():
+                self.cache_hits += 1
+                return cached[1]
+
+        for record_type in (self.RECORD_A, self.RECORD_AAAA):
+            answer = self._query(host, record_type)
+            if answer:
+                address, ttl = answer
+                with self.lock:
+                    if len(self.cache) >= self.MAX_CACHED_HOSTS:
+                        self.cache.clear()
+                    self.cache[host] = (time.monotonic() + min(max(ttl, self.MIN_TTL), self.MAX_TTL), address)
+                return address
+        with self.lock:
+            self.failures += 1
+        raise DohError(f"{host} not found through {self.provider_url}")
+
+    def _query(self, host: str, record_type: int):
+        """Ask the provider for one record type; returns (address, ttl) or None."""
+        with self.lock:
+            self.queries += 1
+        query = self._build_query(host, record_type)
+        try:
+            response = self.session.get(
+                self.provider_url,
+                params={'dns': base64.urlsafe_b64encode(query).rstrip(b"=").decode()},
+                headers={'Accept': 'application/dns-message'},
+                timeout=self.TIMEOUT,
+            )
+            response.raise_for_status()
+            return self._parse_answer(response.content, record_type)
+        except (requests.RequestException, ValueError, struct.error, IndexError) as e:
+            debug_print(f"[HTTP] DoH lookup of {host} failed: {e}")
+            return None
+
+    @staticmethod
+    def _build_query(host: str, record_type: int) -> bytes:
+        # Id 0 as RFC 8484 recommends for caching, recursion desired, one question
+        header = struct.pack("!HHHHHH", 0, 0x0100, 1, 0, 0, 0)
+        name = b"".join(bytes([len(label)]) + label for label in
+                        (part.encode("idna") for part in host.split("."))) + b"\x00"
+        return header + name + struct.pack("!HH", record_type, 1)
+
+    @staticmethod
+    def _skip_name(message: bytes, offset: int) -> int:
+        while True:
+            length = message[offset]
+            if length == 0:
+                return offset + 1
+            if length & 0xC0 == 0xC0:
+                # Compression pointer: two bytes end the name
+                return offset + 2
+            offset += length + 1
+
+    def _parse_answer(self, message: bytes, record_type: int):
+        _, flags, question_count, answer_count, _, _ = struct.unpack("!HHHHHH", message[:12])
+        if flags & 0x000F:
+            return None  # NXDOMAIN or another error code
+        offset = 12
+        for _ in range(question_count):
+            offset = self._skip_name(message, offset) + 4
+        for _ in range(answer_count):
+            offset = self._skip_name(message, offset)
+            answer_type, _, ttl, length = struct.unpack("!HHIH", message[offset:offset + 10])
+            offset += 10
+            data = message[offset:offset + length]
+            offset += length
+            # CNAME records come first; the address record follows them
+            if answer_type == record_type == self.RECORD_A and length == 4:
+                return socket.inet_ntop(socket.AF_INET, data), ttl
+            if answer_type == record_type == self.RECORD_AAAA and length == 16:
+                return socket.inet_ntop(socket.AF_INET6, data), ttl
+        return None
+
+    def get_stats(self) -> dict:
+        """Get lookup statistics."""
+        with self.lock:
+            return {
+                'queries': self.queries,
+                'cache_hits': self.cache_hits,
+                'failures': self.failures,
+                'cached_hosts': len(self.cache),
+            }
+
+    def close(self):
+        self.session.close()
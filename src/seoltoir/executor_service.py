@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Executor service for Seoltoir browser.
+Runs background work on a few bounded worker pools, one per kind of work,
+instead of a new thread per task, so a burst of tasks (such as restoring
+hundreds of tabs) queues up rather than spawning hundreds of threads.
+"""
+
+from gi.repository import GLib
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from .debug import debug_print
+
+
+class Priority:
+    """Order in which queued tasks of a pool run; lower runs first."""
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+class CancellationToken:
+    """Marks work as no longer wanted, e.g. because the tab it was for was closed."""
+
+    def __init__(self, parent: "CancellationToken" = None):
+        self.parent = parent
+        self.event = threading.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    def is_cancelled(self) -> bool:
+        return self.event.is_set() or (self.parent is not None and self.parent.is_cancelled())
+
+
+class _Task:
+    __slots__ = ("function", "args", "callback", "token", "submitted")
+
+    def __init__(self, function, args, callback, token):
+        self.function = function
+        self.args = args
+        self.callback = callback
+        self.token = token
+        self.submitted = time.perf_counter()
+
+
+class _WorkerPool:
+    """A priority queue served by at most size threads, started as work arrives."""
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+        self.queue = []  # heap of (priority, sequence, _Task)
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.workers = 0
+        self.idle_workers = 0
+        self.running = 0
+        self.is_stopped = False
+
+        # Statistics
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.max_queue_depth = 0
+        self.total_wait_ms = 0.0
+        self.total_run_ms = 0.0
+
+    def submit(self, task: _Task, priority: int):
+        with self.condition:
+            if self.is_stopped:
+                return
+            heapq.heappush(self.queue, (priority, next(self.sequence), task))
+            self.submitted += 1
+            self.max_queue_depth = max(self.max_queue_depth, len(self.queue))
+            if self.idle_workers:
+                self.condition.notify_all()  # notify() could wake drain() instead of a worker
+            elif self.workers < self.size:
+                self.workers += 1
+                threading.Thread(target=self._work, name=f"seoltoir-{self.name}-{self.workers}",
+                                 daemon=True).start()
+
+    def _work(self):
+        while True:
+            with self.condition:
+                while not self.queue and not self.is_stopped:
+                    self.idle_workers += 1
+                    self.condition.wait()
+                    self.idle_workers -= 1
+                if self.is_stopped:
+                    self.workers -= 1
+                    return
+                _, _, task = heapq.heappop(self.queue)
+                self.running += 1
+            self._run(task)
+            with self.condition:
+                self.running -= 1
+                if not self.queue and not self.running:
+                    self.condition.notify_all()  # Wakes drain()
+
+    def _run(self, task: _Task):
+        started = time.perf_counter()
+        wait_ms = (started - task.submitted) * 1000.0
+        if task.token is not None and task.token.is_cancelled():
+            with self.condition:
+                self.cancelled += 1
+                self.total_wait_ms += wait_ms
+            return
+        try:
+            result = task.function(*task.args)
+            failed = False
+        except Exception as e:
+            debug_print(f"[PERF] Background task {getattr(task.function, '__name__', task.function)} "
+                        f"failed in the {self.name} pool: {e}")
+            failed = True
+        with self.condition:
+            self.total_wait_ms += wait_ms
+            self.total_run_ms += (time.perf_counter() - started) * 1000.0
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+        if not failed and task.callback is not None:
+            if task.token is None or not task.token.is_cancelled():
+                ExecutorService.run_on_main(task.callback, result)
+
+    def get_stats(self) -> dict:
+        with self.condition:
+            finished = self.completed + self.failed + self.cancelled
+            return {
+                'workers': self.workers,
+                'max_workers': self.size,
+                'running': self.running,
+                'queue_depth': len(self.queue),
+                'max_queue_depth': self.max_queue_depth,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'cancelled': self.cancelled,
+                'failed': self.failed,
+                'average_wait_ms': self.total_wait_ms / finished if finished else 0.0,
+                'average_run_ms': self.total_run_ms / (self.completed + self.failed)
+                                  if self.completed + self.failed else 0.0,
+            }
+
+    def drain(self, timeout: float) -> bool:
+        """Wait until every queued task has run; False if the timeout passed first."""
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.queue and not self.running, timeout)
+
+    def stop(self, keep_priority: int = None) -> list:
+        """Stop the workers and drop queued tasks, returning those of keep_priority or more urgent in order."""
+        with self.condition:
+            self.is_stopped = True
+            kept = [task for priority, _, task in sorted(self.queue)
+                    if keep_priority is not None and priority <= keep_priority]
+            self.queue.clear()
+            self.condition.notify_all()
+        return kept
+
+
+class ExecutorService:
+    """Application-wide bounded worker pools for network, CPU and disk work."""
+
+    NETWORK = "network"
+    CPU = "cpu"
+    DISK = "disk"
+
+    # Threads per pool; a single disk thread keeps database writes in submission order
+    POOL_SIZES = {
+        NETWORK: 6,
+        CPU: max(2, (os.cpu_count() or 2) // 2),
+        DISK: 1,
+    }
+
+    # Seconds shutdown waits for queued disk writes
+    DRAIN_TIMEOUT = 5
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    @classmethod
+    def get_default(cls) -> "ExecutorService":
+        """Get the executor shared by the whole browser."""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def __init__(self):
+        self.pools = {name: _WorkerPool(name, size) for name, size in self.POOL_SIZES.items()}
+        debug_print("[PERF] Executor service initialized")
+
+    def submit(self, pool: str, function, *args, priority: int = Priority.NORMAL,
+               token: CancellationToken = None, callback=None):
+        """Run function(*args) on a pool; callback(result) then runs on the main thread.
+
+        Tasks whose token is cancelled before they start are skipped, and
+        their callback is not called if it is cancelled while they run.
+        """
+        self.pools[pool].submit(_Task(function, args, callback, token), priority)
+
+    @staticmethod
+    def run_on_main(function, *args):
+        """Call function(*args) once from the GLib main loop."""
+        def call():
+            function(*args)
+            return False
+        GLib.idle_add(call)
+
+    def get_stats(self) -> dict:
+        """Get queue depth, latency and task counts of every pool."""
+        return {name: pool.get_stats() for name, pool in self.pools.items()}
+
+    def cleanup(self):
+        """Finish queued disk writes, drop other queued tasks and let idle workers exit.
+
+        If a long disk task keeps the queue from draining in time, queued
+        high priority disk writes (such as the last session journal records)
+        still run, in this thread; only low priority ones are dropped.
+        """
+        disk_pool = self.pools[self.DISK]
+        if not disk_pool.drain(self.DRAIN_TIMEOUT):
+            kept = disk_pool.stop(keep_priority=Priority.HIGH)
+            debug_print(f"[PERF] Gave up waiting for queued disk work; writing {len(kept)} urgent tasks now")
+            for task in kept:
+                disk_pool._run(task)
+        for pool in self.pools.values():
+            pool.stop()
+        debug_print("[PERF] Executor service cleaned up")
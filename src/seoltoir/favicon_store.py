@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Favicon store for Seoltoir browser.
+Keeps one normalized 32px PNG per origin in its own SQLite file, with the
+HTTP validators it was served with, and shares Gio.BytesIcons across tabs
+and windows, so repeat visits show their icon without any network or image
+work. Stale icons are shown at once and revalidated in the background.
+"""
+
+from gi.repository import GLib, Gio
+
+import io
+import os
+import re
+import sqlite3
+import time
+import urllib.parse
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from .debug import debug_print
+from .executor_service import ExecutorService, Priority
+from .http_client import HttpClient
+
+
+def get_origin(url: str) -> str:
+    """Get scheme://host[:port] of an http(s) URL, or "" for anything else."""
+    try:
+        parsed = urllib.parse.urlparse(url or "")
+    except ValueError:
+        return ""
+    if parsed.scheme not in ("http", "https") or not parsed.netloc:
+        return ""
+    return f"{parsed.scheme}://{parsed.netloc.lower()}"
+
+
+def normalize_icon(data: bytes, size: int) -> bytes:
+    """Convert downloaded icon data to a PNG no larger than size; None if it cannot be read."""
+    try:
+        from PIL import Image
+    except ImportError:
+        # Without PIL only PNGs can be shown, as they are
+        return data if data.startswith(b'\x89PNG') else None
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.mode != 'RGBA':
+            image = image.convert('RGBA')
+        if image.size[0] > size or image.size[1] > size:
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        png_buffer = io.BytesIO()
+        image.save(png_buffer, format='PNG')
+        return png_buffer.getvalue()
+    except Exception as e:
+        debug_print(f"[FAVICON] Could not normalize icon: {e}")
+        return None
+
+
+class _CachedIcon:
+    """An icon held in memory, with what is needed to revalidate it."""
+    __slots__ = ("icon", "icon_url", "etag", "last_modified", "expires_at")
+
+    def __init__(self, icon, icon_url: str, etag: str, last_modified: str, expires_at: float):
+        self.icon = icon
+        self.icon_url = icon_url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+
+class _Waiter:
+    """A tab waiting for the icon of an origin."""
+    __slots__ = ("origin", "callback", "token", "is_private")
+
+    def __init__(self, origin: str, callback, token, is_private: bool):
+        self.origin = origin
+        self.callback = callback
+        self.token = token
+        self.is_private = is_private
+
+    def is_cancelled(self) -> bool:
+        return self.token is not None and self.token.is_cancelled()
+
+    def deliver(self, icon):
+        if not self.is_cancelled():
+            self.callback(self.origin, icon)
+
+
+class _PendingFetch:
+    """A download of one icon URL shared by every tab waiting for it; also its cancellation token."""
+
+    def __init__(self, icon_url: str, container_id: str, is_conditional: bool, waiter: _Waiter):
+        self.icon_url = icon_url
+        self.container_id = container_id
+        self.is_conditional = is_conditional
+        self.waiters = [waiter]
+
+    @property
+    def key(self) -> tuple:
+        return (self.icon_url, self.container_id, self.is_conditional)
+
+    def is_cancelled(self) -> bool:
+        return all(waiter.is_cancelled() for waiter in self.waiters)
+
+
+class FaviconStore:
+    """Persistent per-origin favicon cache with an in-memory icon cache in front of it."""
+
+    # Pixel size icons are normalized to
+    ICON_SIZE = 32
+    # Icons kept in memory
+    MAX_MEMORY_ICONS = 256
+    # Bytes of PNG data kept on disk before the least recently used icons are evicted
+    MAX_DISK_BYTES = 8 * 1024 * 1024
+    # Seconds an icon is fresh when the server gave no lifetime, and the bounds applied to server lifetimes
+    DEFAULT_MAX_AGE = 7 * 24 * 3600
+    MIN_MAX_AGE = 3600
+    MAX_MAX_AGE = 30 * 24 * 3600
+
+    def __init__(self, data_dir: str):
+        self.db_path = os.path.join(data_dir, "favicons.db")
+        self.memory_cache = OrderedDict()  # origin -> _CachedIcon, least recently used first
+        self.pending_last_used = {}  # origin -> time, written with the next disk task
+        self.pending_reads = {}  # origin -> [(icon_url, container_id, _Waiter)] waiting for the disk
+        self.pending_fetches = {}  # (icon URL, container id, is conditional) -> _PendingFetch
+
+        # Statistics
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.coalesced = 0
+        self.revalidations = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.disk_bytes = 0
+
+        ExecutorService.get_default().submit(ExecutorService.DISK, self._create_tables, priority=Priority.HIGH)
+        debug_print("[FAVICON] Favicon store initialized")
+
+    def _get_connection(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def _create_tables(self):
+        conn = self._get_connection()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS favicons (
+                    origin TEXT PRIMARY KEY,
+                    icon_url TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    expires_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_favicons_last_used ON favicons(last_used)")
+            conn.commit()
+            self.disk_bytes = conn.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM favicons").fetchone()[0]
+        finally:
+            conn.close()
+
+    def get_cached_icon(self, page_url: str):
+        """Get the icon of a page's origin if it is in memory, without touching disk or network."""
+        cached = self.memory_cache.get(get_origin(page_url))
+        return cached.icon if cached else None
+
+    def load(self, page_url: str, icon_url: str, container_id: str, callback,
+             token=None, is_private: bool = False):
+        """Find the icon of a page, calling callback(origin, icon) on the main thread once it is known.
+
+        icon_url is the icon the page links to, or None to accept whatever
+        is stored for the origin and fall back to /favicon.ico. Private tabs
+        are shown icons but write nothing to disk, not even when an icon was
+        last used.
+        """
+        origin = get_origin(page_url)
+        if not origin:
+            return
+        waiter = _Waiter(origin, callback, token, is_private)
+        cached = self.memory_cache.get(origin)
+        if cached is not None:
+            self.memory_cache.move_to_end(origin)
+            if not is_private:
+                self.pending_last_used[origin] = time.time()
+            self.memory_hits += 1
+            self._use_cached(cached, icon_url, container_id, waiter)
+            return
+
+        # Tabs of the same site opening together share one disk read
+        pending_read = self.pending_reads.get(origin)
+        if pending_read is not None:
+            pending_read.append((icon_url, container_id, waiter))
+            self.coalesced += 1
+            return
+        self.pending_reads[origin] = [(icon_url, container_id, waiter)]
+        ExecutorService.get_default().submit(ExecutorService.DISK, self._read_entry, origin, priority=Priority.HIGH,
+                                             callback=lambda row: self._on_entry_read(origin, row))
+
+    def _use_cached(self, cached: _CachedIcon, icon_url: str, container_id: str, waiter: "_Waiter"):
+        waiter.deliver(cached.icon)
+        if icon_url and icon_url != cached.icon_url:
+            # The page now links a different icon; the old one shows until it arrives
+            self._fetch(icon_url, None, container_id, waiter)
+        elif not cached.is_fresh():
+            self.revalidations += 1
+            self._fetch(cached.icon_url, cached, container_id, waiter)
+
+    def _read_entry(self, origin: str):
+        """Read an origin's icon from disk; runs on the disk pool and writes nothing."""
+        conn = self._get_connection()
+        try:
+            return conn.execute("""
+                SELECT icon_url, data, etag, last_modified, expires_at FROM favicons WHERE origin = ?
+            """, (origin,)).fetchone()
+        except sqlite3.Error as e:
+            # Reported as a miss, so the tabs waiting for it are not left hanging
+            debug_print(f"[FAVICON] Error reading icon of {origin}: {e}")
+            return None
+        finally:
+            conn.close()
+
+
+    def _on_entry_read(self, origin: str, row):
+        if row is not None and origin not in self.memory_cache:
+            self.disk_hits += 1
+            stored_icon_url, data, etag, last_modified, expires_at = row
+            self._remember(origin, _CachedIcon(Gio.BytesIcon.new(GLib.Bytes.new(data)), stored_icon_url,
+                                               etag, last_modified, expires_at))
+
+        for icon_url, container_id, waiter in self.pending_reads.pop(origin, []):
+            cached = self.memory_cache.get(origin)
+            if cached is not None:
+                if not waiter.is_private:
+                    # Only visits outside private tabs are recorded
+                    self.pending_last_used[origin] = time.time()
+                self._use_cached(cached, icon_url, container_id, waiter)
+            else:
+                self.misses += 1
+                self._fetch(icon_url or origin + "/favicon.ico", None, container_id, waiter)
+
+    def _remember(self, origin: str, cached: _CachedIcon):
+        self.memory_cache[origin] = cached
+        self.memory_cache.move_to_end(origin)
+        while len(self.memory_cache) > self.MAX_MEMORY_ICONS:
+            self.memory_cache.popitem(last=False)
+
+
+    def _fetch(self, icon_url: str, cached: _CachedIcon, container_id: str, waiter: "_Waiter"):
+        """Download an icon, conditionally when a cached copy is being revalidated.
+
+        Every tab of the same container asking for the same icon URL, in the
+        same way, while it downloads waits on the same fetch, which is only
+        dropped once all of them are closed.
+        """
+        key = (icon_url, container_id, cached is not None)
+        pending_fetch = self.pending_fetches.get(key)
+        if pending_fetch is not None and not pending_fetch.is_cancelled():
+            pending_fetch.waiters.append(waiter)
+            self.coalesced += 1
+            return
+
+        pending_fetch = _PendingFetch(icon_url, container_id, cached is not None, waiter)
+        self.pending_fetches[key] = pending_fetch
+        self.fetches += 1
+        ExecutorService.get_default().submit(
+            ExecutorService.NETWORK, self._fetch_in_thread, icon_url, cached, container_id,
+            priority=Priority.LOW, token=pending_fetch,
+            callback=lambda result: self._on_downloaded(pending_fetch, result))
+
+    def _fetch_in_thread(self, icon_url: str, cached: _CachedIcon, container_id: str):
+        """Download an icon; runs on the network pool. Returns None on failure, no data when not modified."""
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                headers['If-Modified-Since'] = cached.last_modified
+        try:
+            response = HttpClient.get_default().get(icon_url, kind="favicon", container_id=container_id,
+                                                    headers=headers)
+        except Exception as e:
+            debug_print(f"[FAVICON] Failed to fetch {icon_url}: {e}")
+            return None
+
+        expires_at = time.time() + self._get_max_age(response.headers)
+        if response.status_code == 304 and cached is not None:
+            return (None, cached.etag, cached.last_modified, expires_at)
+        if response.status_code != 200:
+            debug_print(f"[FAVICON] Failed to fetch {icon_url}: HTTP {response.status_code}")
+            return None
+        return (response.content, response.headers.get('ETag'), response.headers.get('Last-Modified'), expires_at)
+
+    def _on_downloaded(self, pending_fetch: "_PendingFetch", result):
+        if result is None or result[0] is None:
+            self._on_fetched(pending_fetch, result)
+            return
+        # Decoding and scaling are CPU work; the network thread is free for the next download
+        content, etag, last_modified, expires_at = result
+        ExecutorService.get_default().submit(
+            ExecutorService.CPU, normalize_icon, content, self.ICON_SIZE,
+            priority=Priority.LOW, token=pending_fetch,
+            callback=lambda data: self._on_fetched(
+                pending_fetch, (data, etag, last_modified, expires_at) if data is not None else None))
+
+    def _get_max_age(self, headers) -> float:
+        """Seconds an icon stays fresh, from Cache-Control or Expires, within the store's bounds."""
+        max_age = None
+        match = re.search(r'max-age=(\d+)', headers.get('Cache-Control', ''))
+        if match:
+            max_age = int(match.group(1))
+        elif headers.get('Expires'):
+            try:
+                max_age = parsedate_to_datetime(headers['Expires']).timestamp() - time.time()
+            except (TypeError, ValueError):
+                pass
+        if max_age is None:
+            return self.DEFAULT_MAX_AGE
+        return min(max(max_age, self.MIN_MAX_AGE), self.MAX_MAX_AGE)
+
+
+    def _on_fetched(self, pending_fetch: "_PendingFetch", result):
+        if self.pending_fetches.get(pending_fetch.key) is pending_fetch:
+            del self.pending_fetches[pending_fetch.key]
+        if result is None:
+            return
+        data, etag, last_modified, expires_at = result
+        icon = Gio.BytesIcon.new(GLib.Bytes.new(data)) if data is not None else None
+
+        stored_origins = set()
+        for waiter in pending_fetch.waiters:
+            if waiter.origin in stored_origins:
+                waiter.deliver(self.memory_cache[waiter.origin].icon)
+                continue
+            if icon is None:
+                # Not modified: the icon already shown stays, it is just fresh again
+                cached = self.memory_cache.get(waiter.origin)
+                if cached is None or cached.icon_url != pending_fetch.icon_url:
+                    # Its copy was evicted or replaced meanwhile, so it needs the whole icon
+                    if not waiter.is_cancelled():
+                        self._fetch(pending_fetch.icon_url, None, pending_fetch.container_id, waiter)
+                    continue
+                self.not_modified += 1
+                cached.expires_at = expires_at
+            else:
+                cached = _CachedIcon(icon, pending_fetch.icon_url, etag, last_modified, expires_at)
+                waiter.deliver(icon)
+            self._remember(waiter.origin, cached)
+            stored_origins.add(waiter.origin)
+            if not waiter.is_private:
+                ExecutorService.get_default().submit(ExecutorService.DISK, self._write_entry, waiter.origin,
+                                                     pending_fetch.icon_url, data, etag, last_modified,
+                                                     expires_at, priority=Priority.LOW)
+
+    def _write_entry(self, origin: str, icon_url: str, data: bytes, etag: str, last_modified: str,
+                     expires_at: float):
+        """Store a fetched icon, or just its new lifetime when data is None; runs on the disk pool."""
+        now = time.time()
+        last_used, self.pending_last_used = self.pending_last_used, {}
+        conn = self._get_connection()
+        try:
+            if data is None:
+                conn.execute("UPDATE favicons SET expires_at = ?, last_used = ? WHERE origin = ?",
+                             (expires_at, now, origin))
+            else:
+                old_size = conn.execute("SELECT LENGTH(data) FROM favicons WHERE origin = ?", (origin,)).fetchone()
+                conn.execute("""
+                    INSERT OR REPLACE INTO favicons (origin, icon_url, data, etag, last_modified, expires_at, last_used)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (origin, icon_url, data, etag, last_modified, expires_at, now))
+                self.disk_bytes += len(data) - (old_size[0] if old_size else 0)
+            conn.executemany("UPDATE favicons SET last_used = ? WHERE origin = ?",
+                             [(used, used_origin) for used_origin, used in last_used.items()])
+            self._evict(conn)
+            conn.commit()
+        except sqlite3.Error as e:
+            debug_print(f"[FAVICON] Error storing icon of {origin}: {e}")
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Delete the least recently used icons until the store is within its size limit."""
+        if self.disk_bytes <= self.MAX_DISK_BYTES:
+            return
+        for origin, size in conn.execute("SELECT origin, LENGTH(data) FROM favicons ORDER BY last_used").fetchall():
+            if self.disk_bytes <= self.MAX_DISK_BYTES * 0.9:
+                break
+            conn.execute("DELETE FROM favicons WHERE origin = ?", (origin,))
+            self.disk_bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Forget every stored icon, e.g. when the user clears cached data."""
+        self.memory_cache.clear()
+        self.pending_last_used.clear()
+        ExecutorService.get_default().submit(ExecutorService.DISK, self._clear_in_thread, priority=Priority.HIGH)
+
+    def _clear_in_thread(self):
+        conn = self._get_connection()
+        try:
+            conn.execute("DELETE FROM favicons")
+            conn.commit()
+            self.disk_bytes = 0
+        finally:
+            conn.close()
+        debug_print("[FAVICON] Favicon store cleared")
+
+    def get_stats(self) -> dict:
+        """Get cache hit and size statistics."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_icons': len(self.memory_cache),
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            'fetches': self.fetches,
+            'coalesced': self.coalesced,
+            'in_flight': len(self.pending_fetches),
+            'revalidations': self.revalidations,
+            'not_modified': self.not_modified,
+            'evictions': self.evictions,
+            'disk_bytes': self.disk_bytes,
+        }
+
+    def cleanup(self):
+        if self.pending_last_used:
+            # Queued ahead of the disk pool drain at shutdown
+            ExecutorService.get_default().submit(ExecutorService.DISK, self._write_last_used,
+                                                 priority=Priority.LOW)
+        self.memory_cache.clear()
+        self.pending_reads.clear()
+        self.pending_fetches.clear()
+        debug_print("[FAVICON] Favicon store cleaned up")
+
+    def _write_last_used(self):
+        last_used, self.pending_last_used = self.pending_last_used, {}
+        conn = self._get_connection()
+        try:
+            conn.executemany("UPDATE favicons SET last_used = ? WHERE origin = ?",
+                             [(used, origin) for origin, used in last_used.items()])
+            conn.commit()
+        except sqlite3.Error as e:
+            debug_print(f"[FAVICON] Error recording icon use: {e}")
+        finally:
+            conn.close()
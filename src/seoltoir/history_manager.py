@@ -1,9 +1,10 @@
 import gi
 gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
-from gi.repository import Gtk, Adw, Gdk, GObject
+from gi.repository import Gtk, Adw, Gdk, GObject, GLib
 
 from .database import DatabaseManager
+from .page_content_indexer import snippet_to_markup
 from .ui_loader import UILoader
 
 class HistoryManager(Gtk.Box):
@@ -33,7 +34,6 @@ class HistoryManager(Gtk.Box):
         self.clear_button.connect("clicked", self._on_clear_history_clicked)
         self.search_entry.connect("search-changed", self._on_search_changed)
         self.history_listbox.connect("row-activated", self._on_row_activated)
-        self.history_listbox.set_filter_func(self._filter_history) # For search
 
         self.load_history()
 
@@ -45,17 +45,31 @@ class HistoryManager(Gtk.Box):
             self.history_listbox.remove(child)
             child = next_child
 
-        history_data = self.db_manager.get_history()
+        query = self.search_entry.get_text().strip()
+        if query:
+            # Search the full history index rather than only the recent rows on screen
+            history_data = self.db_manager.search_history(query, limit=200)
+        else:
+            history_data = self.db_manager.get_history()
         for url, title, last_visit_str in history_data:
-            row = Adw.ActionRow.new()
-            row.set_title(title or url)
-            row.set_subtitle(url)
-            # You might want to format last_visit_str here
-            row.set_extra_child(Gtk.Label.new(f"Visited: {last_visit_str[:16]}")) # Truncate for display
-            row.set_activatable(True) # Make row clickable
-            row.set_attribute("url", url) # Store URL as an attribute for easy retrieval
-            self.history_listbox.append(row)
-        self.history_listbox.invalidate_filter() # Apply filter after loading
+            self._append_history_row(url, title, GLib.markup_escape_text(url), last_visit_str)
+
+        if query:
+            # Pages whose text matched, with the matching passage as subtitle
+            listed_urls = {url for url, _, _ in history_data}
+            for url, title, snippet, last_visit_str in self.db_manager.search_page_content(query, limit=50):
+                if url not in listed_urls:
+                    self._append_history_row(url, title, snippet_to_markup(snippet), last_visit_str)
+
+    def _append_history_row(self, url, title, subtitle_markup, last_visit_str):
+        row = Adw.ActionRow.new()
+        row.set_title(GLib.markup_escape_text(title or url))
+        row.set_subtitle(subtitle_markup)
+        # You might want to format last_visit_str here
+        row.set_extra_child(Gtk.Label.new(f"Visited: {last_visit_str[:16]}")) # Truncate for display
+        row.set_activatable(True) # Make row clickable
+        row.set_attribute("url", url) # Store URL as an attribute for easy retrieval
+        self.history_listbox.append(row)
 
     def _on_row_activated(self, listbox, row):
         """Emits a signal when a history entry is clicked."""
@@ -70,14 +84,4 @@ class HistoryManager(Gtk.Box):
         self.load_history() # Refresh the list
 
     def _on_search_changed(self, entry):
-        self.history_listbox.invalidate_filter()
-
-    def _filter_history(self, row):
-        query = self.search_entry.get_text().strip().lower()
-        if not query:
-            return True
-        
-        title = row.get_title().lower()
-        subtitle = row.get_subtitle().lower()
-        
-        return query in title or query in subtitle
+        self.load_history()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP client for Seoltoir browser.
+Every fetch the browser makes outside of WebKit (search suggestions,
+OpenSearch descriptions, favicons, filter lists) goes through one pooled
+client, so connections are kept alive and reused instead of being set up
+again for every request. With DNS over HTTPS enabled, host names are looked
+up through the DoH provider instead of the system resolver.
+"""
+
+from gi.repository import Gio
+
+import contextlib
+import http.cookiejar
+import threading
+import time
+import urllib.parse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+from .debug import debug_print
+from .doh_resolver import DohResolver, DohError
+
+
+def _doh_pool_classes(resolver: DohResolver) -> dict:
+    """Connection pool classes, by scheme, whose connections look up their host with resolver."""
+
+    def resolving(connection_class):
+        class _DohConnection(connection_class):
+            def _new_conn(self):
+                # Only the socket goes to the looked up address; TLS still checks the host name
+                host_name = self._dns_host
+                try:
+                    self._dns_host = resolver.resolve(host_name)
+                except DohError as e:
+                    raise NewConnectionError(self, f"Failed to resolve {host_name}: {e}") from e
+                try:
+                    return super()._new_conn()
+                finally:
+                    self._dns_host = host_name
+        return _DohConnection
+
+    class _DohHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = resolving(HTTPConnection)
+
+    class _DohHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = resolving(HTTPSConnection)
+
+    return {'http': _DohHTTPConnectionPool, 'https': _DohHTTPSConnectionPool}
+
+
+class _DohAdapter(HTTPAdapter):
+    """An HTTPAdapter whose direct connections resolve host names through DNS over HTTPS."""
+
+    def __init__(self, resolver: DohResolver, **kwargs):
+        self.doh_resolver = resolver
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = _doh_pool_classes(self.doh_resolver)
+
+
+class HttpClient:
+    """Pooled requests sessions, one per container, with bounded concurrency, timeouts and metrics."""
+
+    USER_AGENT = ('Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                  'Chrome/91.0.4472.124 Safari/537.36')
+    # Hosts kept in each container's pool, and idle connections kept alive per host
+    POOL_HOSTS = 32
+    POOL_CONNECTIONS_PER_HOST = 4
+    # Requests running at once across all containers
+    MAX_CONCURRENT_REQUESTS = 8
+    # Seconds to connect, and to wait for data, by kind of request
+    CONNECT_TIMEOUT = 5
+    READ_TIMEOUTS = {
+        'suggestions': 5,
+        'favicon': 5,
+        'opensearch': 10,
+        'filter-list': 30,
+    }
+    DEFAULT_READ_TIMEOUT = 10
+    # Seconds a system proxy lookup is reused for a host
+    PROXY_CACHE_TTL = 60
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    @classmethod
+    def get_default(cls) -> "HttpClient":
+        """Get the client shared by the whole browser."""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = {}  # container id -> requests.Session
+        self.slots = threading.BoundedSemaphore(self.MAX_CONCURRENT_REQUESTS)
+        self.proxy_cache = {}  # (scheme, host) -> (time looked up, proxies dict)
+        self.doh_resolver = None
+
+        # DoH settings are read here and on change, on the main thread, never by the workers
+        application = Gio.Application.get_default()
+        self.settings = Gio.Settings.new(application.get_application_id()) if application else None
+        if self.settings:
+            self.settings.connect("changed::enable-doh", self._on_doh_setting_changed)
+            self.settings.connect("changed::doh-provider-url", self._on_doh_setting_changed)
+            self._on_doh_setting_changed(self.settings, None)
+
+        # Statistics
+        self.requests_by_kind = {}
+        self.errors = 0
+        self.bytes_received = 0
+        self.total_ms = 0.0
+
+    def _on_doh_setting_changed(self, settings, key):
+        provider_url = settings.get_string("doh-provider-url") if settings.get_boolean("enable-doh") else ""
+        with self.lock:
+            if provider_url == (self.doh_resolver.provider_url if self.doh_resolver else ""):
+                return
+            old_resolver = self.doh_resolver
+            self.doh_resolver = DohResolver(provider_url) if provider_url else None
+            # Pooled connections were made with the old resolver; new sessions use the new one
+            sessions, self.sessions = self.sessions, {}
+        for session in sessions.values():
+            session.close()
+        if old_resolver:
+            old_resolver.close()
+        debug_print(f"[HTTP] Resolving host names {'through ' + provider_url if provider_url else 'with the system resolver'}")
+
+    def _get_session(self, container_id: str) -> requests.Session:
+        with self.lock:
+            session = self.sessions.get(container_id)
+            if session is None:
+                session = requests.Session()
+                session.headers.update({'User-Agent': self.USER_AGENT})
+                # Proxies come from the system resolver WebKit uses, not the environment
+                session.trust_env = False
+                adapter_options = {'pool_connections': self.POOL_HOSTS,
+                                   'pool_maxsize': self.POOL_CONNECTIONS_PER_HOST, 'max_retries': 0}
+                if self.doh_resolver:
+                    adapter = _DohAdapter(self.doh_resolver, **adapter_options)
+                else:
+                    adapter = HTTPAdapter(**adapter_options)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                if container_id == "private":
+                    # Nothing a private tab fetches may leave a cookie behind
+                    session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+                self.sessions[container_id] = session
+            return session
+
+    def _get_proxies(self, url: str) -> dict:
+        """Look up the system proxy for a URL with the resolver WebKit's network process uses."""
+        parsed = urllib.parse.urlparse(url)
+        key = (parsed.scheme, parsed.hostname)
+        cached = self.proxy_cache.get(key)
+        if cached and time.monotonic() - cached[0] < self.PROXY_CACHE_TTL:
+            return cached[1]
+
+        proxies = {}
+        try:
+            proxy = Gio.ProxyResolver.get_default().lookup(url, None)[0]
+            if proxy and proxy != "direct://":
+                proxies = {parsed.scheme: proxy}
+        except Exception as e:
+            debug_print(f"[HTTP] Error looking up proxy for {parsed.hostname}: {e}")
+        self.proxy_cache[key] = (time.monotonic(), proxies)
+        return proxies
+
+    def _get_timeout(self, kind: str, timeout) -> tuple:
+        read_timeout = timeout if timeout is not None else self.READ_TIMEOUTS.get(kind, self.DEFAULT_READ_TIMEOUT)
+        return (min(self.CONNECT_TIMEOUT, read_timeout), read_timeout)
+
+    @contextlib.contextmanager
+    def stream(self, url: str, kind: str = "default", container_id: str = "default", timeout=None):
+        """Open a streamed GET; the request holds its concurrency slot until the block ends."""
+        session = self._get_session(container_id)
+        started = time.perf_counter()
+        with self.slots:
+            try:
+                with session.get(url, stream=True, timeout=self._get_timeout(kind, timeout),
+                                 proxies=self._get_proxies(url)) as response:
+                    yield response
+                    with self.lock:
+                        self.bytes_received += response.raw.tell()
+            except Exception:
+                with self.lock:
+                    self.errors += 1
+                raise
+            finally:
+                self._record(kind, started)
+
+    def get(self, url: str, kind: str = "default", container_id: str = "default", timeout=None,
+            headers: dict = None) -> requests.Response:
+        """GET a URL and read the whole body; raises requests exceptions like requests.get()."""
+        session = self._get_session(container_id)
+        started = time.perf_counter()
+        with self.slots:
+            try:
+                response = session.get(url, timeout=self._get_timeout(kind, timeout),
+                                       proxies=self._get_proxies(url), headers=headers)
+                with self.lock:
+                    self.bytes_received += len(response.content)
+                return response
+            except Exception:
+                with self.lock:
+                    self.errors += 1
+                raise
+            finally:
+                self._record(kind, started)
+
+    def _record(self, kind: str, started: float):
+        with self.lock:
+            self.requests_by_kind[kind] = self.requests_by_kind.get(kind, 0) + 1
+            self.total_ms += (time.perf_counter() - started) * 1000.0
+
+    def get_stats(self) -> dict:
+        """Get request and connection statistics."""
+        connections_opened = 0
+        with self.lock:
+            for session in self.sessions.values():
+                pools = session.get_adapter('https://').poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    connections_opened += getattr(pool, 'num_connections', 0) if pool else 0
+            requests_made = sum(self.requests_by_kind.values())
+            return {
+                'requests': requests_made,
+                'requests_by_kind': dict(self.requests_by_kind),
+                'errors': self.errors,
+                'bytes_received': self.bytes_received,
+                'average_ms': self.total_ms / requests_made if requests_made else 0.0,
+                'connections_opened': connections_opened,
+                'containers': len(self.sessions),
+                'doh': self.doh_resolver.get_stats() if self.doh_resolver else None,
+            }
+
+    def close_container(self, container_id: str):
+        """Drop the pooled connections and cookies of a container, e.g. when it is deleted."""
+        with self.lock:
+            session = self.sessions.pop(container_id, None)
+        if session:
+            session.close()
+
+    def cleanup(self):
+        with self.lock:
+            sessions, self.sessions = self.sessions, {}
+            resolver, self.doh_resolver = self.doh_resolver, None
+        for session in sessions.values():
+            session.close()
+        if resolver:
+            resolver.close()
+        debug_print("[HTTP] HTTP client cleaned up")
@@ -66,15 +66,60 @@ class SeoltoirApplication(Adw.Application):
 
         SeoltoirApplication._instance = self
 
+        # Bounded worker pools for all background work
+        from .executor_service import ExecutorService
+        self.executor_service = ExecutorService.get_default()
+
+        # Pooled connections for every fetch made outside of WebKit
+        from .http_client import HttpClient
+        self.http_client = HttpClient.get_default()
+
+        # Tab icons of visited sites, kept next to the browser database
+        from .favicon_store import FaviconStore
+        self.favicon_store = FaviconStore(db_dir)
+
         # Initialize search engine manager
         self.search_engine_manager = SearchEngineManager(self.db_manager)
 
+        # Which sites offer OpenSearch descriptors, so pages are not scanned on every load
+        from .opensearch_discovery import OpenSearchDiscovery
+        self.opensearch_discovery = OpenSearchDiscovery(self.db_manager, self.search_engine_manager)
+        self.db_manager.add_change_listener(self.opensearch_discovery.on_database_change)
+
         self.container_manager = ContainerManager(APP_ID)
 
+        # Injected scripts are built once and shared by every WebView
+        from .user_scripts import UserScriptRegistry
+        self.user_script_registry = UserScriptRegistry(self)
+
         # Initialize performance manager
         from .performance_manager import PerformanceManager
         self.performance_manager = PerformanceManager(self)
 
+        from .page_content_indexer import PageContentIndexer
+        self.page_content_indexer = PageContentIndexer(self, self.db_manager)
+
+        from .database_maintenance import DatabaseMaintenance
+        self.database_maintenance = DatabaseMaintenance(self, self.db_manager)
+
+        from .session_journal import SessionJournal
+        self.session_journal = SessionJournal(self, self.db_manager)
+
+        # Omnibox suggestions come from memory once the index is loaded
+        from .autocomplete_index import AutocompleteIndex
+        self.autocomplete_index = AutocompleteIndex()
+        self.db_manager.add_change_listener(self.autocomplete_index.on_database_change)
+        self.autocomplete_index.start_build(self.db_manager)
+        # Open tabs of every window, for switch-to-tab suggestions
+        from .tab_index import TabIndex
+        self.tab_index = TabIndex()
+
+        from .speculative_loader import SpeculativeLoader
+        self.speculative_loader = SpeculativeLoader(self)
+
+        from .prerender_manager import PrerenderManager
+        self.prerender_manager = PrerenderManager(self, self.db_manager, self.autocomplete_index)
+
         self.add_action(Gio.SimpleAction.new("show_history", None))
         self.lookup_action("show_history").connect("activate", self._on_show_history)
         self.add_action(Gio.SimpleAction.new("show_bookmarks", None))
@@ -82,8 +127,7 @@ class SeoltoirApplication(Adw.Application):
     def do_activate(self):
         if not self.window:
             try:
-                from .window import SeoltoirWindow
-                self.window = SeoltoirWindow(application=self)
+                self._create_initial_windows()
             except Exception as e:
                 debug_print("Exception during window import or creation:", e)
                 import traceback; traceback.print_exc()
@@ -91,6 +135,22 @@ class SeoltoirApplication(Adw.Application):
     
         self.window.present()
 
+    def _create_initial_windows(self):
+        """Reopen the windows of the last session, or a single window with the homepage."""
+        from .window import SeoltoirWindow
+        for session_window in self.session_journal.restore():
+            window = SeoltoirWindow(application=self, session_window=session_window)
+            if not self.window:
+                self.window = window
+            else:
+                window.present()
+        if not self.window:
+            self.window = SeoltoirWindow(application=self)
+
+    def _on_new_window(self, action, parameter):
+        from .window import SeoltoirWindow
+        SeoltoirWindow(application=self).present()
+
     def do_startup(self):
         Gtk.Application.do_startup(self)
         Gio.Settings.new(APP_ID)
@@ -101,6 +161,9 @@ class SeoltoirApplication(Adw.Application):
         # Add missing actions for menu
         self.add_action(Gio.SimpleAction.new("quit", None))
         self.lookup_action("quit").connect("activate", self._on_quit)
+        self.add_action(Gio.SimpleAction.new("new_window", None))
+        self.lookup_action("new_window").connect("activate", self._on_new_window)
+        self.set_accels_for_action("app.new_window", ["<Ctrl>n"])
         self.add_action(Gio.SimpleAction.new("about", None))
         self.lookup_action("about").connect("activate", self._on_about)
         
@@ -137,8 +200,7 @@ class SeoltoirApplication(Adw.Application):
 
     def do_open(self, files, hint):
         if not self.window:
-            from .window import SeoltoirWindow
-            self.window = SeoltoirWindow(application=self)
+            self._create_initial_windows()
         self.window.present()
         for file in files:
             debug_print(f"Opened file: {file.get_path()}")
@@ -152,8 +214,7 @@ class SeoltoirApplication(Adw.Application):
         if len(args) > 1:
             url_to_open = args[1]
             if not self.window:
-                from .window import SeoltoirWindow
-                self.window = SeoltoirWindow(application=self)
+                self._create_initial_windows()
             self.window.present()
             self.window.open_new_tab_with_url(url_to_open)
             return 0
@@ -330,31 +391,6 @@ class SeoltoirApplication(Adw.Application):
             # Regular search using default engine
             return self.search_engine_manager.search_with_engine(search_query)
 
-    def _get_current_session_data(self) -> list[dict]:
-        session_data = []
-        if self.window:
-            for i in range(self.window.tab_view.get_n_pages()):
-                page = self.window.tab_view.get_nth_page(i)
-                browser_view = page.get_child()
-                
-                # Try to serialize session state, but handle if method doesn't exist
-                serialized_state = ""
-                try:
-                    if hasattr(browser_view.webview, 'serialize_session_state'):
-                        serialized_state_gbytes = browser_view.webview.serialize_session_state()
-                        serialized_state = serialized_state_gbytes.get_data().decode('latin1') if serialized_state_gbytes else ""
-                except AttributeError:
-                    # Session serialization not available in this WebKit version
-                    pass
-                
-                session_data.append({
-                    "url": browser_view.get_uri(),
-                    "title": browser_view.get_title(),
-                    "is_private": browser_view.is_private,
-                    "serialized_state": serialized_state
-                })
-        return session_data
-
     def do_shutdown(self, *args):
         settings = Gio.Settings.new(APP_ID)
         if settings.get_boolean("delete-cookies-on-close"):
@@ -380,13 +416,55 @@ class SeoltoirApplication(Adw.Application):
                 cookie_manager.delete_cookies_for_domain(domain)
                 debug_print(f"Deleted cookies for non-bookmarked domain: {domain}")
         
-        session_data = self._get_current_session_data()
-        self.db_manager.save_session(session_data)
+        # Open tabs are journaled as they change, only the last few records are still buffered
+        if hasattr(self, 'session_journal'):
+            self.session_journal.cleanup()
 
         # Clean up performance manager
         if hasattr(self, 'performance_manager'):
             self.performance_manager.cleanup()
 
+        if hasattr(self, 'page_content_indexer'):
+            self.page_content_indexer.cleanup()
+
+        if hasattr(self, 'database_maintenance'):
+            self.database_maintenance.cleanup()
+
+        if hasattr(self, 'autocomplete_index'):
+            self.autocomplete_index.cleanup()
+
+        if hasattr(self, 'tab_index'):
+            self.tab_index.cleanup()
+
+        if hasattr(self, 'speculative_loader'):
+            self.speculative_loader.cleanup()
+
+        if hasattr(self, 'prerender_manager'):
+            self.prerender_manager.cleanup()
+
+        if hasattr(self, 'user_script_registry'):
+            self.user_script_registry.cleanup()
+
+        if hasattr(self, 'search_engine_manager'):
+            self.search_engine_manager.cleanup()
+
+        if hasattr(self, 'opensearch_discovery'):
+            self.opensearch_discovery.cleanup()
+
+        if hasattr(self, 'favicon_store'):
+            self.favicon_store.cleanup()
+
+        if hasattr(self, 'http_client'):
+            self.http_client.cleanup()
+
+        # Last: waits for the database writes queued by the cleanups above
+        if hasattr(self, 'executor_service'):
+            self.executor_service.cleanup()
+
+        # Nothing writes any more, so the rebuild cannot hold up a visit or other UI write
+        if hasattr(self, 'db_manager') and not self.db_manager.is_incremental_vacuum:
+            self.db_manager.enable_incremental_vacuum(DatabaseManager.AUTO_VACUUM_CONVERSION_TIME_BUDGET)
+
         Gtk.Application.do_shutdown(self)
 
 
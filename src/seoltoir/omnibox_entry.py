@@ -5,34 +5,56 @@ Enhanced address bar with autocomplete, search suggestions, and security indicat
 """
 
 import gi
+import html
 import re
 import time
 import urllib.parse
 gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
-from gi.repository import Gtk, Adw, GObject, GLib, Gdk, Pango
+from gi.repository import Gtk, Adw, GObject, GLib, Gdk, Gio, Pango
 
 from .debug import debug_print
 from .search_suggestions_client import SearchSuggestionsClient
+from .suggestion_scheduler import SuggestionScheduler
+from .page_content_indexer import snippet_to_markup
 
 
 class SuggestionType:
     """Types of suggestions in the omnibox."""
     URL = "url"
+    TAB = "tab"
     BOOKMARK = "bookmark"
     HISTORY = "history"
+    CONTENT = "content"
     SEARCH = "search"
 
 
-class Suggestion:
+SUGGESTION_ICONS = {
+    SuggestionType.TAB: "view-paged-symbolic",
+    SuggestionType.BOOKMARK: "starred-symbolic",
+    SuggestionType.HISTORY: "document-open-recent-symbolic",
+    SuggestionType.CONTENT: "edit-find-in-page-symbolic",
+    SuggestionType.SEARCH: "edit-find-symbolic",
+}
+
+
+class Suggestion(GObject.Object):
     """A single suggestion item."""
     def __init__(self, text: str, url: str, suggestion_type: SuggestionType, 
-                 title: str = "", favicon_url: str = ""):
+                 title: str = "", favicon_url: str = "", snippet: str = "", browser_view=None):
+        super().__init__()
         self.text = text
         self.url = url
         self.type = suggestion_type
         self.title = title
         self.favicon_url = favicon_url
+        self.snippet = snippet
+        self.browser_view = browser_view  # The open tab a TAB suggestion switches to
+    
+    def key(self) -> tuple:
+        """Everything a row shows, and the tab it switches to; equal keys render and act the same."""
+        return (self.type, self.url, self.text, self.title, self.snippet,
+                id(self.browser_view) if self.browser_view is not None else None)
 
 
 class OmniboxEntry(Gtk.Box):
@@ -41,22 +63,29 @@ class OmniboxEntry(Gtk.Box):
     __gsignals__ = {
         "navigate-requested": (GObject.SignalFlags.RUN_FIRST, None, (str,)),
         "suggestion-selected": (GObject.SignalFlags.RUN_FIRST, None, (str, str)),  # url, title
+        "switch-to-tab-requested": (GObject.SignalFlags.RUN_FIRST, None, (object,)),  # browser view
+        "top-suggestion-changed": (GObject.SignalFlags.RUN_FIRST, None, (str,)),  # url, empty when none
     }
     
-    def __init__(self, db_manager, search_engine_manager, *args, **kwargs):
+    def __init__(self, db_manager, search_engine_manager, autocomplete_index=None, tab_index=None,
+                 *args, **kwargs):
         super().__init__(orientation=Gtk.Orientation.HORIZONTAL, *args, **kwargs)
         
         print("[OMNIBOX-INIT] Starting OmniboxEntry initialization", flush=True)
         
         self.db_manager = db_manager
         self.search_engine_manager = search_engine_manager
+        self.autocomplete_index = autocomplete_index
+        self.tab_index = tab_index
         self.suggestions_client = SearchSuggestionsClient()
+        self.suggestion_scheduler = SuggestionScheduler(self.suggestions_client)
         
         # Current state
         self.current_suggestions = []
         self.selected_suggestion_index = -1
         self.is_showing_suggestions = False
         self.original_text = ""
+        self.top_suggestion_url = ""
         self.security_status = "none"  # none, secure, insecure, warning
         self.load_progress = 0.0
         
@@ -105,13 +134,21 @@ class OmniboxEntry(Gtk.Box):
         self.suggestions_popover.set_position(Gtk.PositionType.BOTTOM)
         self.suggestions_popover.set_autohide(False)  # We'll control this manually
         
-        # Suggestions list
-        self.suggestions_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        # Suggestions list; rows are recycled by the factory and only changed ranges of the model are replaced
+        self.suggestions_store = Gio.ListStore.new(Suggestion)
+        self.suggestions_selection = Gtk.SingleSelection(model=self.suggestions_store)
+        self.suggestions_selection.set_autoselect(False)
+        self.suggestions_selection.set_can_unselect(True)
+        factory = Gtk.SignalListItemFactory()
+        factory.connect("setup", self._on_suggestion_row_setup)
+        factory.connect("bind", self._on_suggestion_row_bind)
+        self.suggestions_list = Gtk.ListView(model=self.suggestions_selection, factory=factory)
         self.suggestions_scrolled = Gtk.ScrolledWindow()
         self.suggestions_scrolled.set_max_content_height(400)  # Increased height
         self.suggestions_scrolled.set_min_content_width(500)   # Set minimum width
+        self.suggestions_scrolled.set_propagate_natural_height(True)
         self.suggestions_scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
-        self.suggestions_scrolled.set_child(self.suggestions_box)
+        self.suggestions_scrolled.set_child(self.suggestions_list)
         self.suggestions_popover.set_child(self.suggestions_scrolled)
         
         # Make popover wider to match the entry width
@@ -145,9 +182,10 @@ class OmniboxEntry(Gtk.Box):
         
         # Only show suggestions if the entry has focus
         if entry.has_focus():
-            # Always fetch suggestions when focused, even for empty text
-            GLib.timeout_add(300, self._fetch_suggestions, text)
+            # Always fetch suggestions when focused, even for empty text; each keystroke supersedes the last
+            self.suggestion_scheduler.schedule(self._fetch_suggestions, text)
         else:
+            self.suggestion_scheduler.cancel()
             self._hide_suggestions()
     
     def _on_activate(self, entry):
@@ -163,6 +201,7 @@ class OmniboxEntry(Gtk.Box):
                 url = self._process_input(text)
                 self.emit("navigate-requested", url)
         
+        self.suggestion_scheduler.cancel()
         self._hide_suggestions()
     
     def _on_focus_in(self, controller=None):
@@ -204,7 +243,7 @@ class OmniboxEntry(Gtk.Box):
         text = self.entry.get_text().strip()
         print(f"[OMNIBOX-FOCUS] Fetching suggestions for text: '{text}'", flush=True)
         debug_print(f"[OMNIBOX] Fetching suggestions for text: '{text}'")
-        GLib.timeout_add(100, self._fetch_suggestions, text)
+        self.suggestion_scheduler.schedule(self._fetch_suggestions, text, delay_ms=100)
     
     def _select_all_text(self):
         """Select all text in the entry (called via idle_add)."""
@@ -235,6 +274,7 @@ class OmniboxEntry(Gtk.Box):
         """Handle focus out event."""
         debug_print("[OMNIBOX] Focus OUT event triggered")
         # Format URL when not focused
+        self.suggestion_scheduler.cancel()
         GLib.timeout_add(100, self._hide_suggestions)
         self._format_displayed_url()
     
@@ -250,8 +290,9 @@ class OmniboxEntry(Gtk.Box):
                 return True
         elif keyval == Gdk.KEY_Escape:
             if self.is_showing_suggestions:
+                self.suggestion_scheduler.cancel()
                 self._hide_suggestions()
-                self.entry.set_text(self.original_text)
+                self._set_text_quietly(self.original_text)
                 return True
         elif keyval == Gdk.KEY_Tab:
             if self.is_showing_suggestions and self.selected_suggestion_index >= 0:
@@ -287,14 +328,22 @@ class OmniboxEntry(Gtk.Box):
         # Update entry text
         if self.selected_suggestion_index >= 0:
             suggestion = self.current_suggestions[self.selected_suggestion_index]
-            self.entry.set_text(suggestion.text)
+            self._set_text_quietly(suggestion.text)
         else:
-            self.entry.set_text(self.original_text)
+            self._set_text_quietly(self.original_text)
         
         self.entry.set_position(-1)  # Move cursor to end
     
-    def _fetch_suggestions(self, query):
-        """Fetch and display suggestions for the given query."""
+    def _set_text_quietly(self, text):
+        """Set the entry text without starting a new suggestions lookup."""
+        self.entry.handler_block_by_func(self._on_text_changed)
+        try:
+            self.entry.set_text(text)
+        finally:
+            self.entry.handler_unblock_by_func(self._on_text_changed)
+    
+    def _fetch_suggestions(self, query, generation):
+        """Fetch and display suggestions for the given query; generation tags the remote request."""
         print(f"[OMNIBOX-SUGGEST] _fetch_suggestions called with query: '{query}'", flush=True)
         debug_print(f"[OMNIBOX] _fetch_suggestions called with query: '{query}'")
         
@@ -316,21 +365,39 @@ class OmniboxEntry(Gtk.Box):
         self.original_text = query
         suggestions = []
         
-        # Get history suggestions
-        history_suggestions = self._get_history_suggestions(query)
-        print(f"[OMNIBOX-SUGGEST] Got {len(history_suggestions)} history suggestions", flush=True)
-        debug_print(f"[OMNIBOX] Got {len(history_suggestions)} history suggestions")
-        suggestions.extend(history_suggestions)
+        # Open tabs first, so a page that is already open is switched to rather than loaded twice
+        if query.strip() and self.tab_index is not None:
+            tab_suggestions = self._get_tab_suggestions(query)
+            debug_print(f"[OMNIBOX] Got {len(tab_suggestions)} open tab suggestions")
+            suggestions.extend(tab_suggestions)
+        
+        if query.strip() and self.autocomplete_index is not None and self.autocomplete_index.is_ready:
+            # History and bookmarks ranked together, straight from memory
+            indexed_suggestions = self._get_indexed_suggestions(query)
+            debug_print(f"[OMNIBOX] Got {len(indexed_suggestions)} indexed suggestions "
+                        f"in {self.autocomplete_index.last_query_ms:.2f}ms")
+            suggestions.extend(self._without_open_tabs(indexed_suggestions, suggestions))
+        else:
+            # Get history suggestions
+            history_suggestions = self._get_history_suggestions(query)
+            print(f"[OMNIBOX-SUGGEST] Got {len(history_suggestions)} history suggestions", flush=True)
+            debug_print(f"[OMNIBOX] Got {len(history_suggestions)} history suggestions")
+            suggestions.extend(self._without_open_tabs(history_suggestions, suggestions))
+
+            # Get bookmark suggestions
+            bookmark_suggestions = self._get_bookmark_suggestions(query)
+            print(f"[OMNIBOX-SUGGEST] Got {len(bookmark_suggestions)} bookmark suggestions", flush=True)
+            debug_print(f"[OMNIBOX] Got {len(bookmark_suggestions)} bookmark suggestions")
+            suggestions.extend(self._without_open_tabs(bookmark_suggestions, suggestions))
         
-        # Get bookmark suggestions  
-        bookmark_suggestions = self._get_bookmark_suggestions(query)
-        print(f"[OMNIBOX-SUGGEST] Got {len(bookmark_suggestions)} bookmark suggestions", flush=True)
-        debug_print(f"[OMNIBOX] Got {len(bookmark_suggestions)} bookmark suggestions")
-        suggestions.extend(bookmark_suggestions)
+        # Get page content suggestions for pages not already listed
+        content_suggestions = self._get_content_suggestions(query, suggestions)
+        debug_print(f"[OMNIBOX] Got {len(content_suggestions)} page content suggestions")
+        suggestions.extend(content_suggestions)
         
         # Add search suggestions (async) - only for non-empty, non-URL queries
         if query and not self._is_url(query):
-            self._fetch_search_suggestions(query, suggestions)
+            self._fetch_search_suggestions(query, suggestions, generation)
         
         # Show current suggestions
         print(f"[OMNIBOX-SUGGEST] Total suggestions: {len(suggestions)}", flush=True)
@@ -339,44 +406,51 @@ class OmniboxEntry(Gtk.Box):
         
         return False  # Don't repeat timeout
     
+    def _get_tab_suggestions(self, query):
+        """Get switch-to-tab suggestions from the open tab index."""
+        # The tab being typed into is not worth switching to
+        tab_view = getattr(self.get_root(), 'tab_view', None)
+        selected_page = tab_view.get_selected_page() if tab_view else None
+        current_view = selected_page.get_child() if selected_page else None
+        
+        suggestions = []
+        for browser_view, url, title in self.tab_index.search(query, limit=3, exclude=current_view):
+            suggestions.append(Suggestion(
+                text=url,
+                url=url,
+                suggestion_type=SuggestionType.TAB,
+                title=f"Switch to tab: {title or url}",
+                browser_view=browser_view
+            ))
+        return suggestions
+    
+    def _without_open_tabs(self, new_suggestions, suggestions):
+        """Drop suggestions for pages already offered as an open tab."""
+        tab_urls = {s.url for s in suggestions if s.type == SuggestionType.TAB}
+        return [s for s in new_suggestions if s.url not in tab_urls]
+    
     def _get_history_suggestions(self, query):
         """Get suggestions from browsing history."""
         debug_print(f"[OMNIBOX] _get_history_suggestions called with query: '{query}'")
         suggestions = []
         
         try:
-            # Get more history entries to show comprehensive history
-            history_entries = self.db_manager.get_history(limit=100)
-            debug_print(f"[OMNIBOX] Retrieved {len(history_entries)} history entries from database")
-            query_lower = query.lower()
-            
-            # If query is empty, show recent history
             if not query.strip():
+                # If query is empty, show recent history
                 debug_print("[OMNIBOX] Query is empty, showing recent history")
-                for url, title, _ in history_entries[:10]:  # Show top 10 recent
-                    debug_print(f"[OMNIBOX] Adding recent history: {url}")
-                    suggestions.append(Suggestion(
-                        text=url,
-                        url=url,
-                        suggestion_type=SuggestionType.HISTORY,
-                        title=title or url
-                    ))
+                history_entries = self.db_manager.get_history(limit=10)
             else:
-                debug_print(f"[OMNIBOX] Query is not empty, filtering by: '{query_lower}'")
-                # Filter by query
-                for url, title, _ in history_entries:
-                    if (query_lower in url.lower() or 
-                        (title and query_lower in title.lower())):
-                        debug_print(f"[OMNIBOX] Adding filtered history: {url}")
-                        suggestions.append(Suggestion(
-                            text=url,
-                            url=url,
-                            suggestion_type=SuggestionType.HISTORY,
-                            title=title or url
-                        ))
-                        
-                        if len(suggestions) >= 8:  # Increased limit for better history
-                            break
+                # Ranked prefix search over the whole history
+                history_entries = self.db_manager.search_history(query, limit=8)
+            debug_print(f"[OMNIBOX] Retrieved {len(history_entries)} history entries from database")
+
+            for url, title, _ in history_entries:
+                suggestions.append(Suggestion(
+                    text=url,
+                    url=url,
+                    suggestion_type=SuggestionType.HISTORY,
+                    title=title or url
+                ))
         except Exception as e:
             debug_print(f"[OMNIBOX] Error getting history suggestions: {e}")
             import traceback
@@ -385,39 +459,74 @@ class OmniboxEntry(Gtk.Box):
         debug_print(f"[OMNIBOX] Returning {len(suggestions)} history suggestions")
         return suggestions
     
+    def _get_indexed_suggestions(self, query):
+        """Get history and bookmark suggestions from the in-memory autocomplete index."""
+        suggestions = []
+        for url, title, is_bookmark in self.autocomplete_index.search(query, limit=10):
+            suggestions.append(Suggestion(
+                text=url,
+                url=url,
+                suggestion_type=SuggestionType.BOOKMARK if is_bookmark else SuggestionType.HISTORY,
+                title=title or url
+            ))
+        return suggestions
+    
     def _get_bookmark_suggestions(self, query):
         """Get suggestions from bookmarks."""
         suggestions = []
         
         try:
-            bookmarks = self.db_manager.get_bookmarks()
-            query_lower = query.lower()
-            
-            for url, title, _ in bookmarks:
-                if (query_lower in url.lower() or 
-                    (title and query_lower in title.lower())):
-                    suggestions.append(Suggestion(
-                        text=url,
-                        url=url,
-                        suggestion_type=SuggestionType.BOOKMARK,
-                        title=title or url
-                    ))
-                    
-                    if len(suggestions) >= 3:  # Limit bookmark suggestions
-                        break
+            for url, title, _ in self.db_manager.search_bookmarks(query, limit=3):
+                suggestions.append(Suggestion(
+                    text=url,
+                    url=url,
+                    suggestion_type=SuggestionType.BOOKMARK,
+                    title=title or url
+                ))
         except Exception as e:
             debug_print(f"[OMNIBOX] Error getting bookmark suggestions: {e}")
         
         return suggestions
     
-    def _fetch_search_suggestions(self, query, current_suggestions):
+    def _get_content_suggestions(self, query, current_suggestions):
+        """Get suggestions from the text of previously visited pages."""
+        suggestions = []
+        if len(query) < 3 or self._is_url(query):
+            return suggestions
+        
+        try:
+            listed_urls = {suggestion.url for suggestion in current_suggestions}
+            for url, title, snippet, _ in self.db_manager.search_page_content(query, limit=6):
+                if url in listed_urls:
+                    continue
+                suggestions.append(Suggestion(
+                    text=url,
+                    url=url,
+                    suggestion_type=SuggestionType.CONTENT,
+                    title=title or url,
+                    snippet=snippet
+                ))
+                if len(suggestions) >= 3:
+                    break
+        except Exception as e:
+            debug_print(f"[OMNIBOX] Error getting page content suggestions: {e}")
+        
+        return suggestions
+    
+    def _fetch_search_suggestions(self, query, current_suggestions, generation):
         """Fetch search suggestions from search engine."""
         try:
             default_engine = self.search_engine_manager.get_default_engine()
             if default_engine and default_engine.get("suggestions_url"):
                 suggestions_url = default_engine["suggestions_url"]
-                self.suggestions_client.fetch_suggestions(
-                    query, suggestions_url, 
+                cached, is_exact = self.suggestions_client.get_cached_suggestions(query, suggestions_url)
+                if cached:
+                    # Shown with the local suggestions right away
+                    current_suggestions.extend(self._make_search_suggestions(cached))
+                if is_exact:
+                    return
+                self.suggestion_scheduler.fetch_remote(
+                    query, suggestions_url, generation,
                     self._on_search_suggestions_received,
                     (query, current_suggestions)
                 )
@@ -435,42 +544,37 @@ class OmniboxEntry(Gtk.Box):
         if query != self.original_text:
             return
         
-        # Add search suggestions
-        for suggestion_text in search_suggestions[:5]:  # Limit to 5
-            current_suggestions.append(Suggestion(
-                text=suggestion_text,
-                url=self._get_search_url(suggestion_text),
-                suggestion_type=SuggestionType.SEARCH,
-                title=f"Search for '{suggestion_text}'"
-            ))
+        # Replace provisional search suggestions taken from the cache
+        current_suggestions[:] = [s for s in current_suggestions if s.type != SuggestionType.SEARCH]
+        current_suggestions.extend(self._make_search_suggestions(search_suggestions))
         
         # Update suggestions display
         self._show_suggestions(current_suggestions)
     
+    def _make_search_suggestions(self, search_suggestions):
+        """Turn search engine suggestion texts into search suggestions."""
+        return [Suggestion(
+            text=suggestion_text,
+            url=self._get_search_url(suggestion_text),
+            suggestion_type=SuggestionType.SEARCH,
+            title=f"Search for '{suggestion_text}'"
+        ) for suggestion_text in search_suggestions[:5]]  # Limit to 5
+    
     def _show_suggestions(self, suggestions):
         """Display suggestions in the popover."""
         debug_print(f"[OMNIBOX] _show_suggestions called with {len(suggestions)} suggestions")
         self.current_suggestions = suggestions
         self.selected_suggestion_index = -1
+        self.suggestions_selection.set_selected(Gtk.INVALID_LIST_POSITION)
         
-        # Clear existing suggestions
-        child = self.suggestions_box.get_first_child()
-        while child:
-            next_child = child.get_next_sibling()
-            self.suggestions_box.remove(child)
-            child = next_child
+        self._update_suggestion_store(suggestions)
+        self._update_top_suggestion(suggestions)
         
         if not suggestions:
             debug_print("[OMNIBOX] No suggestions, hiding popover")
             self._hide_suggestions()
             return
         
-        # Add suggestion rows
-        for i, suggestion in enumerate(suggestions):
-            debug_print(f"[OMNIBOX] Adding suggestion {i}: {suggestion.text}")
-            row = self._create_suggestion_row(suggestion, i)
-            self.suggestions_box.append(row)
-        
         # Show popover
         if not self.is_showing_suggestions:
             debug_print("[OMNIBOX] Showing popover")
@@ -479,8 +583,25 @@ class OmniboxEntry(Gtk.Box):
         else:
             debug_print("[OMNIBOX] Popover already showing")
     
-    def _create_suggestion_row(self, suggestion, index):
-        """Create a suggestion row widget."""
+    def _update_suggestion_store(self, suggestions):
+        """Replace only the range of the model that changed, so unchanged rows keep their widgets."""
+        old_keys = [self.suggestions_store.get_item(i).key() for i in range(self.suggestions_store.get_n_items())]
+        new_keys = [suggestion.key() for suggestion in suggestions]
+        
+        start = 0
+        while start < min(len(old_keys), len(new_keys)) and old_keys[start] == new_keys[start]:
+            start += 1
+        old_end, new_end = len(old_keys), len(new_keys)
+        while old_end > start and new_end > start and old_keys[old_end - 1] == new_keys[new_end - 1]:
+            old_end -= 1
+            new_end -= 1
+        
+        if old_end > start or new_end > start:
+            debug_print(f"[OMNIBOX] Replacing suggestions {start}-{old_end} with {new_end - start} new ones")
+            self.suggestions_store.splice(start, old_end - start, suggestions[start:new_end])
+    
+    def _on_suggestion_row_setup(self, factory, list_item):
+        """Create the widgets of a suggestion row; they are reused for whatever suggestion is bound."""
         row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
         row.set_margin_top(8)   # Increased margins
         row.set_margin_bottom(8)
@@ -489,111 +610,112 @@ class OmniboxEntry(Gtk.Box):
         row.set_size_request(-1, 48)  # Set minimum row height
         
         # Icon based on suggestion type
-        icon = Gtk.Image()
-        icon.set_pixel_size(20)  # Make icons slightly larger
-        if suggestion.type == SuggestionType.BOOKMARK:
-            icon.set_from_icon_name("starred-symbolic")
-        elif suggestion.type == SuggestionType.HISTORY:
-            icon.set_from_icon_name("document-open-recent-symbolic")
-        elif suggestion.type == SuggestionType.SEARCH:
-            icon.set_from_icon_name("edit-find-symbolic")
-        else:
-            icon.set_from_icon_name("applications-internet-symbolic")
-        
-        row.append(icon)
+        row.icon = Gtk.Image()
+        row.icon.set_pixel_size(20)  # Make icons slightly larger
+        row.append(row.icon)
         
         # Text content
         text_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
         text_box.set_hexpand(True)
         
         # Main text
-        main_label = Gtk.Label()
-        main_label.set_halign(Gtk.Align.START)
-        main_label.set_ellipsize(Pango.EllipsizeMode.END)
-        main_label.set_size_request(-1, 20)  # Set label height
-        # Escape text to prevent markup issues
-        import html
-        escaped_text = html.escape(suggestion.text)
-        main_label.set_markup(f"<span size='medium'><b>{escaped_text}</b></span>")  # Make text bold and larger
-        text_box.append(main_label)
+        row.main_label = Gtk.Label()
+        row.main_label.set_halign(Gtk.Align.START)
+        row.main_label.set_ellipsize(Pango.EllipsizeMode.END)
+        row.main_label.set_size_request(-1, 20)  # Set label height
+        text_box.append(row.main_label)
         
         # Subtitle (title or URL)
-        if suggestion.title and suggestion.title != suggestion.text:
-            subtitle_label = Gtk.Label()
-            subtitle_label.set_halign(Gtk.Align.START)
-            subtitle_label.set_ellipsize(Pango.EllipsizeMode.END)
-            subtitle_label.set_size_request(-1, 16)  # Set subtitle height
-            subtitle_label.add_css_class("dim-label")
-            # Use markup for better readability
-            escaped_title = html.escape(suggestion.title)
-            subtitle_label.set_markup(f"<span size='small' alpha='70%'>{escaped_title}</span>")
-            text_box.append(subtitle_label)
+        row.subtitle_label = Gtk.Label()
+        row.subtitle_label.set_halign(Gtk.Align.START)
+        row.subtitle_label.set_ellipsize(Pango.EllipsizeMode.END)
+        row.subtitle_label.set_size_request(-1, 16)  # Set subtitle height
+        row.subtitle_label.add_css_class("dim-label")
+        text_box.append(row.subtitle_label)
+        
+        # Matching passage from the page text, with matched words highlighted
+        row.snippet_label = Gtk.Label()
+        row.snippet_label.set_halign(Gtk.Align.START)
+        row.snippet_label.set_ellipsize(Pango.EllipsizeMode.END)
+        row.snippet_label.add_css_class("dim-label")
+        text_box.append(row.snippet_label)
         
         row.append(text_box)
         
         # Click handler
         gesture = Gtk.GestureClick()
-        gesture.connect("pressed", self._on_suggestion_clicked, suggestion)
+        gesture.connect("pressed", self._on_suggestion_clicked, list_item)
         row.add_controller(gesture)
         
-        # Hover effect
-        motion_controller = Gtk.EventControllerMotion()
-        motion_controller.connect("enter", self._on_suggestion_hover_enter, row)
-        motion_controller.connect("leave", self._on_suggestion_hover_leave, row)
-        row.add_controller(motion_controller)
+        list_item.set_child(row)
+    
+    def _on_suggestion_row_bind(self, factory, list_item):
+        """Show a suggestion in a recycled row."""
+        suggestion = list_item.get_item()
+        row = list_item.get_child()
         
-        # Store index for selection highlighting
-        row.suggestion_index = index
+        row.icon.set_from_icon_name(SUGGESTION_ICONS.get(suggestion.type, "applications-internet-symbolic"))
         
-        return row
-    
-    def _on_suggestion_hover_enter(self, controller, x, y, row):
-        """Handle mouse hover enter on suggestion."""
-        row.add_css_class("hover")
-    
-    def _on_suggestion_hover_leave(self, controller, row):
-        """Handle mouse hover leave on suggestion."""
-        row.remove_css_class("hover")
+        # Escape text to prevent markup issues
+        escaped_text = html.escape(suggestion.text)
+        row.main_label.set_markup(f"<span size='medium'><b>{escaped_text}</b></span>")  # Make text bold and larger
+        
+        has_subtitle = bool(suggestion.title and suggestion.title != suggestion.text)
+        row.subtitle_label.set_visible(has_subtitle)
+        if has_subtitle:
+            # Use markup for better readability
+            escaped_title = html.escape(suggestion.title)
+            row.subtitle_label.set_markup(f"<span size='small' alpha='70%'>{escaped_title}</span>")
+        
+        row.snippet_label.set_visible(bool(suggestion.snippet))
+        if suggestion.snippet:
+            row.snippet_label.set_markup(f"<span size='small'>{snippet_to_markup(suggestion.snippet)}</span>")
     
-    def _on_suggestion_clicked(self, gesture, n_press, x, y, suggestion):
+    def _on_suggestion_clicked(self, gesture, n_press, x, y, list_item):
         """Handle suggestion click."""
-        self._select_suggestion(suggestion)
+        suggestion = list_item.get_item()
+        if suggestion:
+            self._select_suggestion(suggestion)
     
     def _select_suggestion(self, suggestion):
         """Select and navigate to a suggestion."""
-        self.entry.set_text(suggestion.text)
-        self.emit("suggestion-selected", suggestion.url, suggestion.title)
-        self.emit("navigate-requested", suggestion.url)
+        self.suggestion_scheduler.cancel()
+        self._set_text_quietly(suggestion.text)
+        if suggestion.type == SuggestionType.TAB and suggestion.browser_view is not None:
+            self.emit("switch-to-tab-requested", suggestion.browser_view)
+        else:
+            self.emit("suggestion-selected", suggestion.url, suggestion.title)
+            self.emit("navigate-requested", suggestion.url)
         self._hide_suggestions()
     
+    def _update_top_suggestion(self, suggestions):
+        """Announce where Enter would most likely go: a typed URL, or else the first suggestion."""
+        text = self.entry.get_text().strip()
+        if text and self._is_url(text):
+            url = self._process_input(text)
+        else:
+            url = suggestions[0].url if suggestions else ""
+        if url != self.top_suggestion_url:
+            self.top_suggestion_url = url
+            self.emit("top-suggestion-changed", url)
+    
     def _hide_suggestions(self):
         """Hide the suggestions popover."""
         if self.is_showing_suggestions:
             self.suggestions_popover.popdown()
             self.is_showing_suggestions = False
         self.selected_suggestion_index = -1
+        if self.top_suggestion_url:
+            self.top_suggestion_url = ""
+            self.emit("top-suggestion-changed", "")
     
     def _update_suggestion_selection(self, old_index):
         """Update visual selection in suggestions."""
-        # Remove old selection
-        if old_index >= 0:
-            child = self.suggestions_box.get_first_child()
-            for i in range(old_index):
-                if child:
-                    child = child.get_next_sibling()
-            if child:
-                child.remove_css_class("suggested-action")
-                child.remove_css_class("accent")
-        
-        # Add new selection
         if self.selected_suggestion_index >= 0:
-            child = self.suggestions_box.get_first_child()
-            for i in range(self.selected_suggestion_index):
-                if child:
-                    child = child.get_next_sibling()
-            if child:
-                child.add_css_class("suggested-action")
-                child.add_css_class("accent")  # Better highlighting
+            self.suggestions_selection.set_selected(self.selected_suggestion_index)
+            self.suggestions_list.scroll_to(self.selected_suggestion_index, Gtk.ListScrollFlags.NONE, None)
+        else:
+            self.suggestions_selection.set_selected(Gtk.INVALID_LIST_POSITION)
     
     def _is_url(self, text):
         """Check if text looks like a URL."""
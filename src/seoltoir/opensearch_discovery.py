@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+OpenSearch discovery cache for Seoltoir browser.
+Remembers per origin which OpenSearch descriptors a site offers, including
+that it offers none, so the link scan runs once per origin instead of on
+every page load and each descriptor is fetched once, on the network pool.
+"""
+
+from gi.repository import GLib
+
+import json
+from datetime import datetime, timedelta
+from .debug import debug_print
+from .executor_service import ExecutorService, Priority
+from .favicon_store import get_origin
+from .opensearch_parser import OpenSearchParser
+
+
+class _Descriptor:
+    """An OpenSearch descriptor linked from an origin, and what became of it."""
+
+    NEW = "new"            # Fetched, and not yet one of the configured search engines
+    IMPORTED = "imported"  # Its search URL is already a configured search engine
+    FAILED = "failed"      # Could not be fetched or parsed
+    PENDING = "pending"    # Being fetched
+
+    def __init__(self, title: str, href: str, status: str = PENDING):
+        self.title = title
+        self.href = href
+        self.status = status
+
+    def to_dict(self) -> dict:
+        return {'title': self.title, 'href': self.href, 'status': self.status}
+
+
+class OpenSearchDiscovery:
+    """Per-origin cache of OpenSearch discovery results, kept in memory and in the database."""
+
+    # Days an origin that links no descriptor is not scanned again
+    NO_DESCRIPTOR_TTL_DAYS = 7
+    # Days an origin's descriptors are remembered
+    DESCRIPTOR_TTL_DAYS = 30
+    # Days before an origin whose descriptor could not be fetched is tried again
+    FAILED_TTL_DAYS = 1
+    # Seconds between writes of new results
+    FLUSH_INTERVAL = 10
+
+    def __init__(self, db_manager, search_engine_manager):
+        self.db_manager = db_manager
+        self.search_engine_manager = search_engine_manager
+        self.parser = OpenSearchParser()
+
+        self.records = {}  # origin -> (list of _Descriptor, expires datetime)
+        self.pending_writes = {}  # origin -> row for set_opensearch_discoveries
+        self.flush_timer_id = None
+        self.is_loaded = False
+
+        # Statistics
+        self.scans = 0
+        self.skipped_scans = 0
+        self.fetches = 0
+
+        ExecutorService.get_default().submit(ExecutorService.DISK, self._load_in_thread,
+                                             priority=Priority.LOW, callback=self._on_loaded)
+
+    def _load_in_thread(self):
+        self.db_manager.prune_opensearch_discoveries()
+        return self.db_manager.get_opensearch_discoveries()
+
+    def _on_loaded(self, rows):
+        for origin, descriptors_json, expires in rows:
+            if origin in self.records:
+                continue  # Scanned while loading
+            try:
+                descriptors = [_Descriptor(d['title'], d['href'], d['status'])
+                               for d in json.loads(descriptors_json)]
+                self.records[origin] = (descriptors, datetime.fromisoformat(expires))
+            except (ValueError, KeyError, TypeError) as e:
+                debug_print(f"[OPENSEARCH] Ignoring unreadable discovery result for {origin}: {e}")
+        self.is_loaded = True
+        debug_print(f"[OPENSEARCH] Loaded discovery results for {len(self.records)} origins")
+
+    def should_scan(self, page_url: str) -> bool:
+        """Check whether a page's origin has to be scanned for OpenSearch links."""
+        origin = get_origin(page_url)
+        if not origin or not self.is_loaded:
+            # Until the cache is loaded, pages are not scanned at all rather than all scanned
+            return False
+        record = self.records.get(origin)
+        if record is not None and record[1] > datetime.now():
+            self.skipped_scans += 1
+            return False
+        return True
+
+    def get_new_descriptors(self, page_url: str) -> list[tuple]:
+        """Get (title, href) of the known descriptors of a page's origin that are not configured engines."""
+        record = self.records.get(get_origin(page_url))
+        if record is None:
+            return []
+        return [(d.title, d.href) for d in record[0] if d.status == _Descriptor.NEW]
+
+    def record_scan(self, page_url: str, links: list[tuple], callback, token=None,
+                    container_id: str = "default", is_private: bool = False):
+        """Remember the (title, href) OpenSearch links found on a page and fetch the descriptors.
+
+        callback(origin, title, href) runs on the main thread for each
+        descriptor that turns out to be a new search engine, unless token has
+        been cancelled by then. The fetches themselves are shared by every tab
+        of the origin and finish even if this tab closes. Descriptors are
+        fetched with the tab's container session; private tabs fetch nothing
+        and record nothing.
+        """
+        origin = get_origin(page_url)
+        if not origin or is_private:
+            return
+        self.scans += 1
+        descriptors = self._unique_descriptors(links)
+        if not descriptors:
+            self._store(origin, [], self.NO_DESCRIPTOR_TTL_DAYS)
+            return
+
+        # Known until fetched, so other tabs of the origin do not scan it again meanwhile
+        self.records[origin] = (descriptors, datetime.now() + timedelta(days=self.FAILED_TTL_DAYS))
+        for descriptor in descriptors:
+            self.fetches += 1
+            ExecutorService.get_default().submit(
+                ExecutorService.NETWORK, self.parser.parse_opensearch_url, descriptor.href, container_id,
+                priority=Priority.LOW,
+                callback=lambda engine_data, descriptor=descriptor: self._on_descriptor_fetched(
+                    origin, descriptors, descriptor, engine_data, callback, token))
+
+    @staticmethod
+    def _unique_descriptors(links: list[tuple]) -> list:
+        descriptors = {}
+        for title, href in links:
+            descriptors.setdefault(href, _Descriptor(title, href))
+        return list(descriptors.values())
+
+    def _on_descriptor_fetched(self, origin: str, descriptors: list, descriptor: _Descriptor,
+                               engine_data, callback, token):
+        if engine_data is None or not self.parser.validate_search_engine_data(engine_data):
+            descriptor.status = _Descriptor.FAILED
+        else:
+            configured_urls = {engine["url"] for engine in self.search_engine_manager.get_all_engines()}
+            descriptor.status = _Descriptor.IMPORTED if engine_data['url'] in configured_urls else _Descriptor.NEW
+
+        if all(d.status != _Descriptor.PENDING for d in descriptors):
+            failed = any(d.status == _Descriptor.FAILED for d in descriptors)
+            self._store(origin, descriptors, self.FAILED_TTL_DAYS if failed else self.DESCRIPTOR_TTL_DAYS)
+
+        if descriptor.status == _Descriptor.NEW:
+            debug_print(f"[OPENSEARCH] Found search engine {engine_data['name']} at {descriptor.href}")
+            if token is None or not token.is_cancelled():
+                callback(origin, descriptor.title, descriptor.href)
+
+    def _store(self, origin: str, descriptors: list, ttl_days: int):
+        expires = datetime.now() + timedelta(days=ttl_days)
+        self.records[origin] = (descriptors, expires)
+        self.pending_writes[origin] = (origin, json.dumps([d.to_dict() for d in descriptors]), expires.isoformat())
+        if not self.flush_timer_id:
+            self.flush_timer_id = GLib.timeout_add_seconds(self.FLUSH_INTERVAL, self._flush)
+
+    def _flush(self) -> bool:
+        self.flush_timer_id = None
+        discoveries, self.pending_writes = list(self.pending_writes.values()), {}
+        if discoveries:
+            ExecutorService.get_default().submit(ExecutorService.DISK, self.db_manager.set_opensearch_discoveries,
+                                                 discoveries, priority=Priority.LOW)
+        return False
+
+    def on_database_change(self, event: str, data: dict):
+        """DatabaseManager change listener; the stored results go with the history."""
+        if event == "history-cleared":
+            GLib.idle_add(self._clear)
+
+    def _clear(self) -> bool:
+        self.records.clear()
+        self.pending_writes.clear()
+        return False
+
+    def get_stats(self) -> dict:
+        """Get discovery cache statistics."""
+        return {
+            'origins': len(self.records),
+            'scans': self.scans,
+            'skipped_scans': self.skipped_scans,
+            'fetches': self.fetches,
+        }
+
+    def cleanup(self):
+        if self.flush_timer_id:
+            GLib.source_remove(self.flush_timer_id)
+        # Queued ahead of the disk pool drain at shutdown
+        self._flush()
+        debug_print("[OPENSEARCH] OpenSearch discovery cleaned up")
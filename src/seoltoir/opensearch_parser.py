@@ -3,6 +3,7 @@ import urllib.parse
 from typing import Optional, Dict, Any
 import requests
 from .debug import debug_print
+from .http_client import HttpClient
 
 class OpenSearchParser:
     """Parser for OpenSearch description documents."""
@@ -12,15 +13,13 @@ class OpenSearchParser:
     
     def __init__(self, timeout: int = 10):
         self.timeout = timeout
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.http_client = HttpClient.get_default()
     
-    def parse_opensearch_url(self, opensearch_url: str) -> Optional[Dict[str, Any]]:
-        """Parse OpenSearch description from URL."""
+    def parse_opensearch_url(self, opensearch_url: str, container_id: str = "default") -> Optional[Dict[str, Any]]:
+        """Parse OpenSearch description from URL, fetched with the given container's session."""
         try:
-            response = self.session.get(opensearch_url, timeout=self.timeout)
+            response = self.http_client.get(opensearch_url, kind="opensearch", container_id=container_id,
+                                            timeout=self.timeout)
             response.raise_for_status()
             
             return self.parse_opensearch_xml(response.text, opensearch_url)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Page content indexer for Seoltoir browser.
+Collects the visible text of visited pages and writes it to the history
+full-text index in throttled background batches.
+"""
+
+from gi.repository import GLib, Gio
+
+import html
+from collections import OrderedDict
+from .database import DatabaseManager
+from .debug import debug_print
+from .executor_service import ExecutorService, Priority
+
+
+def snippet_to_markup(snippet: str) -> str:
+    """Convert a page content search snippet to Pango markup with matches in bold."""
+    escaped = html.escape(snippet or "")
+    return (escaped
+            .replace(DatabaseManager.SNIPPET_MATCH_START, "<b>")
+            .replace(DatabaseManager.SNIPPET_MATCH_END, "</b>"))
+
+
+class PageContentIndexer:
+    """Queues extracted page text and indexes it off the main thread."""
+
+    # Characters of visible text kept per page
+    MAX_TEXT_LENGTH = 64 * 1024
+    # Pages written per background transaction
+    BATCH_SIZE = 10
+    # Seconds between batches, so indexing never competes with page loads
+    FLUSH_INTERVAL = 5
+    # Pending pages kept before the oldest are dropped
+    MAX_PENDING = 100
+
+    def __init__(self, application, db_manager):
+        self.db_manager = db_manager
+        self.settings = Gio.Settings.new(application.get_application_id())
+
+        self.pending_pages = OrderedDict()  # url -> text, latest extraction wins
+        self.flush_timer_id = None
+        self.is_writing = False
+        self.pages_indexed = 0
+
+        debug_print("[INDEX] Page content indexer initialized")
+
+    def should_index(self, is_private: bool, container_id: str) -> bool:
+        """Check whether pages from a tab may be added to the content index."""
+        if is_private or container_id == "private":
+            return False
+        if not self.settings.get_boolean("enable-page-content-indexing"):
+            return False
+        excluded = self.settings.get_strv("page-content-index-excluded-containers")
+        return container_id not in excluded
+
+    def queue_page(self, url: str, text: str):
+        """Queue the visible text of a page for indexing."""
+        text = self._normalize_text(text)
+        if not url or not text:
+            return
+
+        self.pending_pages.pop(url, None)
+        self.pending_pages[url] = text
+        while len(self.pending_pages) > self.MAX_PENDING:
+            self.pending_pages.popitem(last=False)
+
+        if not self.flush_timer_id:
+            self.flush_timer_id = GLib.timeout_add_seconds(self.FLUSH_INTERVAL, self._flush_batch)
+
+    def _normalize_text(self, text: str) -> str:
+        """Collapse whitespace and drop repeated lines such as menus and footers."""
+        if not text:
+            return ""
+        seen = set()
+        lines = []
+        length = 0
+        for line in text.splitlines():
+            line = " ".join(line.split())
+            if not line or line in seen:
+                continue
+            seen.add(line)
+            lines.append(line)
+            length += len(line) + 1
+            if length >= self.MAX_TEXT_LENGTH:
+                break
+        return "\n".join(lines)[:self.MAX_TEXT_LENGTH]
+
+    def _flush_batch(self) -> bool:
+        """Write the next batch of pending pages in a background thread."""
+        if self.is_writing:
+            return True  # Previous batch still running, try again next interval
+
+        if not self.pending_pages:
+            self.flush_timer_id = None
+            return False
+
+        batch = []
+        while self.pending_pages and len(batch) < self.BATCH_SIZE:
+            batch.append(self.pending_pages.popitem(last=False))
+
+        self.is_writing = True
+        ExecutorService.get_default().submit(ExecutorService.DISK, self._write_batch, batch,
+                                             priority=Priority.LOW)
+
+        if not self.pending_pages:
+            self.flush_timer_id = None
+            return False
+        return True
+
+    def _write_batch(self, batch: list):
+        """Store a batch of pages; runs in a worker thread."""
+        try:
+            stored = self.db_manager.store_page_contents(batch)
+            debug_print(f"[INDEX] Indexed {stored} of {len(batch)} pages")
+        except Exception as e:
+            stored = 0
+            debug_print(f"[INDEX] Error indexing page content: {e}")
+        GLib.idle_add(self._on_batch_written, stored)
+
+    def _on_batch_written(self, stored: int) -> bool:
+        self.is_writing = False
+        self.pages_indexed += stored
+        return False
+
+    def cleanup(self):
+        """Stop the flush timer and write what is still pending."""
+        if self.flush_timer_id:
+            GLib.source_remove(self.flush_timer_id)
+            self.flush_timer_id = None
+
+        if self.pending_pages:
+            try:
+                self.db_manager.store_page_contents(list(self.pending_pages.items()))
+            except Exception as e:
+                debug_print(f"[INDEX] Error indexing page content on shutdown: {e}")
+            self.pending_pages.clear()
+
+        debug_print("[INDEX] Page content indexer cleaned up")
@@ -9,6 +9,8 @@ gi.require_version("Gtk", "4.0")
 gi.require_version("WebKit", "6.0")
 from gi.repository import GLib, Gio, WebKit
 
+import heapq
+import itertools
 import time
 import psutil
 import threading
@@ -67,7 +69,10 @@ class PerformanceManager:
         
         # Startup optimization
         self.startup_mode = self.settings.get_string("startup-tab-loading-mode")
-        self.deferred_tabs = []  # Tabs waiting to be loaded
+        self.deferred_tabs: Dict[str, object] = {}  # tab_id -> browser view without a WebView yet
+        self.restore_queue: List[Tuple[int, int, str]] = []  # heap of (priority, sequence, tab_id)
+        self.restore_sequence = itertools.count()
+        self.restore_timer_id = None
         self.startup_complete = False
         
         # Process monitoring
@@ -133,10 +138,6 @@ class PerformanceManager:
         
         debug_print(f"[PERF] Registered tab {tab_id}, active: {is_active}")
         
-        # Apply lazy loading if enabled
-        if self.settings.get_boolean("enable-lazy-image-loading"):
-            self._apply_lazy_loading(browser_view)
-            
         return tab_state
     
     def unregister_tab(self, tab_id: str):
@@ -146,6 +147,7 @@ class PerformanceManager:
             if tab_state.is_suspended:
                 self._resume_tab(tab_id, force=True)
             del self.tab_states[tab_id]
+            self.deferred_tabs.pop(tab_id, None)
             debug_print(f"[PERF] Unregistered tab {tab_id}")
     
     def set_tab_active(self, tab_id: str, is_active: bool):
@@ -177,8 +179,9 @@ class PerformanceManager:
         suspension_timeout = self.settings.get_int("tab-suspension-timeout")
         max_concurrent_tabs = self.settings.get_int("max-concurrent-tabs")
         
-        # Count active tabs
-        active_tabs = [t for t in self.tab_states.values() if not t.is_suspended]
+        # Count active tabs; deferred tabs have no WebView to suspend
+        active_tabs = [t for t in self.tab_states.values()
+                       if not t.is_suspended and t.browser_view.webview is not None]
         inactive_tabs = [t for t in active_tabs if not t.is_active]
         
         # Sort by inactive time (oldest first)
@@ -216,6 +219,8 @@ class PerformanceManager:
             
         browser_view = tab_state.browser_view
         webview = browser_view.webview
+        if webview is None:
+            return  # Deferred tabs hold no web process to suspend
         
         # Store tab information
         tab_state.suspended_uri = browser_view.get_uri() or ""
@@ -409,55 +414,6 @@ class PerformanceManager:
         if tabs_to_suspend > 0:
             debug_print(f"[PERF] Suspended {tabs_to_suspend} tabs due to memory pressure")
     
-    def _apply_lazy_loading(self, browser_view):
-        """Apply lazy loading to images in the browser view."""
-        threshold = self.settings.get_int("lazy-loading-threshold")
-        
-        # Inject lazy loading JavaScript
-        lazy_loading_script = f"""
-        (function() {{
-            const threshold = {threshold};
-            const images = document.querySelectorAll('img');
-            
-            const lazyLoad = (entries, observer) => {{
-                entries.forEach(entry => {{
-                    if (entry.isIntersecting) {{
-                        const img = entry.target;
-                        if (img.dataset.src) {{
-                            img.src = img.dataset.src;
-                            img.removeAttribute('data-src');
-                            observer.unobserve(img);
-                        }}
-                    }}
-                }});
-            }};
-            
-            const observer = new IntersectionObserver(lazyLoad, {{
-                rootMargin: `${{threshold}}px`
-            }});
-            
-            images.forEach(img => {{
-                if (img.src && !img.complete) {{
-                    img.dataset.src = img.src;
-                    img.src = '';
-                    observer.observe(img);
-                }}
-            }});
-        }})();
-        """
-        
-        # Apply the script after page load
-        def apply_lazy_loading():
-            browser_view.webview.evaluate_javascript(
-                lazy_loading_script, -1, None, None, None
-            )
-            
-        # Connect to load events
-        browser_view.webview.connect("load-changed", 
-            lambda webview, load_event: 
-                apply_lazy_loading() if load_event == WebKit.LoadEvent.FINISHED else None
-        )
-    
     def get_performance_stats(self) -> Dict:
         """Get current performance statistics."""
         try:
@@ -466,6 +422,7 @@ class PerformanceManager:
             
             active_tabs = len([t for t in self.tab_states.values() if not t.is_suspended])
             suspended_tabs = len([t for t in self.tab_states.values() if t.is_suspended])
+            deferred_tabs = len(self.deferred_tabs)
             
             return {
                 "memory_percent": memory.percent,
@@ -474,6 +431,7 @@ class PerformanceManager:
                 "cpu_percent": cpu_percent,
                 "active_tabs": active_tabs,
                 "suspended_tabs": suspended_tabs,
+                "deferred_tabs": deferred_tabs,
                 "total_tabs": len(self.tab_states),
                 "is_on_battery": self._check_battery_status()
             }
@@ -597,6 +555,8 @@ class PerformanceManager:
                     
                 browser_view = tab_state.browser_view
                 webview = browser_view.webview
+                if webview is None:
+                    continue
                 
                 # Check if the web process is responsive
                 try:
@@ -928,27 +888,35 @@ class PerformanceManager:
         
         return False
     
-    def defer_tab_loading(self, tab_id: str, url: str, browser_view):
-        """Defer tab loading until later."""
-        if tab_id not in [t[0] for t in self.deferred_tabs]:
-            self.deferred_tabs.append((tab_id, url, browser_view))
-            debug_print(f"[PERF] Deferred loading for tab {tab_id}: {url}")
-    
+    def defer_tab_loading(self, tab_id: str, browser_view, priority: int = 0):
+        """Defer creating the WebView of a tab; lower priorities are restored first in the background."""
+        if tab_id not in self.deferred_tabs:
+            self.deferred_tabs[tab_id] = browser_view
+            heapq.heappush(self.restore_queue, (priority, next(self.restore_sequence), tab_id))
+            debug_print(f"[PERF] Deferred loading for tab {tab_id}: {browser_view.get_uri()}")
+
     def load_deferred_tab(self, tab_id: str):
         """Load a specific deferred tab."""
-        for i, (deferred_id, url, browser_view) in enumerate(self.deferred_tabs):
-            if deferred_id == tab_id:
-                debug_print(f"[PERF] Loading deferred tab {tab_id}: {url}")
-                browser_view.load_url(url)
-                del self.deferred_tabs[i]
-                break
-    
+        browser_view = self.deferred_tabs.pop(tab_id, None)
+        if browser_view:
+            debug_print(f"[PERF] Loading deferred tab {tab_id}: {browser_view.get_uri()}")
+            browser_view.ensure_webview()
+
     def load_all_deferred_tabs(self):
         """Load all deferred tabs."""
         debug_print(f"[PERF] Loading {len(self.deferred_tabs)} deferred tabs")
-        for tab_id, url, browser_view in self.deferred_tabs:
-            browser_view.load_url(url)
-        self.deferred_tabs.clear()
+        while self.restore_queue:
+            self._load_next_deferred_tab()
+
+    def _load_next_deferred_tab(self) -> bool:
+        """Load the deferred tab with the lowest priority; returns False when none is left."""
+        while self.restore_queue:
+            _, _, tab_id = heapq.heappop(self.restore_queue)
+            # Tabs selected or closed since they were queued are skipped
+            if tab_id in self.deferred_tabs:
+                self.load_deferred_tab(tab_id)
+                return True
+        return False
     
     def mark_startup_complete(self):
         """Mark startup as complete and load deferred tabs if needed."""
@@ -957,105 +925,17 @@ class PerformanceManager:
         
         if self.startup_mode == "lazy":
             # Load deferred tabs after a short delay
-            GLib.timeout_add_seconds(2, self._delayed_tab_loading)
+            self.restore_timer_id = GLib.timeout_add_seconds(2, self._delayed_tab_loading)
     
     def _delayed_tab_loading(self) -> bool:
         """Load deferred tabs with a delay."""
-        if self.deferred_tabs:
-            # Load one tab at a time to avoid overwhelming the system
-            tab_id, url, browser_view = self.deferred_tabs.pop(0)
-            debug_print(f"[PERF] Loading deferred tab: {url}")
-            browser_view.load_url(url)
-            
-            if self.deferred_tabs:
-                # Schedule next tab in 1 second
-                GLib.timeout_add_seconds(1, self._delayed_tab_loading)
-                
+        # Load one tab at a time to avoid overwhelming the system
+        if self._load_next_deferred_tab() and self.restore_queue:
+            # Schedule next tab in 1 second
+            self.restore_timer_id = GLib.timeout_add_seconds(1, self._delayed_tab_loading)
+        else:
+            self.restore_timer_id = None
         return False  # Don't repeat this timer
-    
-    def create_lazy_loading_placeholder(self, url: str, title: str = "Tab") -> str:
-        """Create HTML placeholder for lazy-loaded tabs."""
-        return f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>{title}</title>
-    <style>
-        body {{
-            margin: 0;
-            padding: 40px;
-            font-family: -webkit-system-font, system-ui, sans-serif;
-            background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
-            color: white;
-            min-height: 100vh;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            text-align: center;
-        }}
-        .container {{
-            max-width: 500px;
-            background: rgba(255, 255, 255, 0.1);
-            padding: 40px;
-            border-radius: 20px;
-            backdrop-filter: blur(10px);
-            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3);
-        }}
-        .icon {{
-            font-size: 64px;
-            margin-bottom: 20px;
-            opacity: 0.8;
-        }}
-        h1 {{
-            margin: 0 0 10px 0;
-            font-size: 24px;
-            font-weight: 300;
-        }}
-        .url {{
-            opacity: 0.7;
-            font-size: 14px;
-            word-break: break-all;
-            margin: 10px 0 20px 0;
-        }}
-        .load-btn {{
-            background: rgba(255, 255, 255, 0.2);
-            border: 1px solid rgba(255, 255, 255, 0.3);
-            color: white;
-            padding: 12px 24px;
-            border-radius: 8px;
-            cursor: pointer;
-            font-size: 16px;
-            margin-top: 20px;
-            transition: all 0.3s ease;
-        }}
-        .load-btn:hover {{
-            background: rgba(255, 255, 255, 0.3);
-            transform: translateY(-2px);
-        }}
-        .note {{
-            opacity: 0.6;
-            font-size: 12px;
-            margin-top: 20px;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="icon">⚡</div>
-        <h1>Tab Ready to Load</h1>
-        <div class="url">{url}</div>
-        <p>This tab will load when you visit it to improve startup performance.</p>
-        <button class="load-btn" onclick="window.location.href='{url}'">
-            Load Now
-        </button>
-        <div class="note">
-            Click the tab or the button above to load the page.
-        </div>
-    </div>
-</body>
-</html>
-        """
 
     def cleanup(self):
         """Clean up performance manager resources."""
@@ -1078,5 +958,9 @@ class PerformanceManager:
         if self.battery_monitor_timer_id:
             GLib.source_remove(self.battery_monitor_timer_id)
             self.battery_monitor_timer_id = None
+
+        if self.restore_timer_id:
+            GLib.source_remove(self.restore_timer_id)
+            self.restore_timer_id = None
             
         debug_print("[PERF] Performance manager cleaned up")
\ No newline at end of file
@@ -13,6 +13,7 @@ import time
 import psutil
 from typing import Dict, List
 from .debug import debug_print
+from .executor_service import ExecutorService
 
 
 class PerformanceMonitorWindow(Adw.PreferencesWindow):
@@ -119,6 +120,29 @@ class PerformanceMonitorWindow(Adw.PreferencesWindow):
         self.cache_row.add_suffix(self.cache_label)
         browser_group.add(self.cache_row)
         
+        # Background Work Group
+        background_group = Adw.PreferencesGroup()
+        background_group.set_title("Background Work")
+        background_group.set_description("Queued and running tasks of each worker pool")
+        system_page.add(background_group)
+        
+        self.pool_labels = {}
+        for pool_name, title in ((ExecutorService.NETWORK, "Network"),
+                                 (ExecutorService.CPU, "CPU"),
+                                 (ExecutorService.DISK, "Disk")):
+            pool_row = Adw.ActionRow()
+            pool_row.set_title(title)
+            pool_label = Gtk.Label()
+            pool_row.add_suffix(pool_label)
+            background_group.add(pool_row)
+            self.pool_labels[pool_name] = (pool_row, pool_label)
+
+        self.database_row = Adw.ActionRow()
+        self.database_row.set_title("Database Maintenance")
+        self.database_label = Gtk.Label()
+        self.database_row.add_suffix(self.database_label)
+        background_group.add(self.database_row)
+        
         # Tab Details Page
         tabs_page = Adw.PreferencesPage()
         tabs_page.set_title("Tab Details")
@@ -225,6 +249,7 @@ class PerformanceMonitorWindow(Adw.PreferencesWindow):
         try:
             self._update_system_stats()
             self._update_browser_stats()
+            self._update_background_stats()
             self._update_tab_lists()
         except Exception as e:
             debug_print(f"[PERF] Error updating performance monitor: {e}")
@@ -290,6 +315,28 @@ class PerformanceMonitorWindow(Adw.PreferencesWindow):
         except Exception as e:
             debug_print(f"[PERF] Error updating browser stats: {e}")
     
+    def _update_background_stats(self):
+        """Update worker pool statistics."""
+        try:
+            for pool_name, pool_stats in ExecutorService.get_default().get_stats().items():
+                pool_row, pool_label = self.pool_labels[pool_name]
+                pool_label.set_text(f"{pool_stats['queue_depth']} queued, "
+                                    f"{pool_stats['running']}/{pool_stats['max_workers']} running")
+                pool_row.set_subtitle(f"Wait {pool_stats['average_wait_ms']:.0f} ms, "
+                                      f"run {pool_stats['average_run_ms']:.0f} ms on average")
+        except Exception as e:
+            debug_print(f"[PERF] Error updating background work stats: {e}")
+
+        maintenance = getattr(Gio.Application.get_default(), 'database_maintenance', None)
+        if maintenance:
+            maintenance_stats = maintenance.get_stats()
+            if maintenance_stats['is_incremental_vacuum']:
+                self.database_label.set_text(f"{maintenance_stats['pages_vacuumed']} pages freed")
+                self.database_row.set_subtitle("Freed space is returned to the filesystem")
+            else:
+                self.database_label.set_text("Not shrinking")
+                self.database_row.set_subtitle("Incremental vacuum is switched on when the browser exits")
+    
     def _update_tab_lists(self):
         """Update the tab lists."""
         if not self.performance_manager:
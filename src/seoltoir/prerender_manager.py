@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Prerender manager for Seoltoir browser.
+Loads the top omnibox suggestion in a hidden browser view when it is a page
+the user visits very often, so pressing Enter swaps in a finished page. At
+most one page is prerendered, within a memory budget and for a limited time.
+"""
+
+from gi.repository import GLib, Gio
+
+import psutil
+import time
+from .debug import debug_print
+
+
+def _get_web_process_pids() -> set:
+    """Get the pids of the WebKit web processes the browser has running."""
+    pids = set()
+    try:
+        for child in psutil.Process().children(recursive=True):
+            try:
+                # Process names are cut to 15 characters
+                if child.name().startswith("WebKitWebProc"):
+                    pids.add(child.pid)
+            except psutil.Error:
+                pass
+    except psutil.Error:
+        pass
+    return pids
+
+
+class _Prerender:
+    """A page loading in a hidden browser view, waiting to be swapped into a tab."""
+
+    def __init__(self, url: str, container_id: str, browser_view, pids_before: set):
+        self.url = url
+        self.container_id = container_id
+        self.browser_view = browser_view
+        self.started = time.monotonic()
+        self.pids_before = pids_before
+        self.pids = None  # Web processes started for the prerender, found on the first memory check
+        self.available_before = psutil.virtual_memory().available
+
+    def get_memory_used(self) -> int:
+        """Bytes the prerender's own web process takes.
+
+        Falls back to how much less memory the whole system has available
+        than when the prerender started, a rough estimate, when its web
+        process cannot be told apart from the others.
+        """
+        if self.pids is None:
+            self.pids = _get_web_process_pids() - self.pids_before
+        used = 0
+        for pid in self.pids:
+            try:
+                used += psutil.Process(pid).memory_info().rss
+            except psutil.Error:
+                pass
+        if not used:
+            used = self.available_before - psutil.virtual_memory().available
+        return used
+
+
+class PrerenderManager:
+    """Prerenders high-frecency omnibox suggestions, one at a time."""
+
+    # Milliseconds the top suggestion has to stay the same before it is prerendered
+    DWELL_MS = 500
+    # Seconds an unused prerender is kept
+    TIMEOUT_SECONDS = 30
+    # Seconds between checks of the memory a prerender has taken
+    MEMORY_CHECK_INTERVAL = 1
+
+    def __init__(self, application, db_manager, autocomplete_index):
+        self.db_manager = db_manager
+        self.autocomplete_index = autocomplete_index
+        self.settings = Gio.Settings.new(application.get_application_id())
+
+        self.prerender = None
+        self.dwell_timer_id = None
+        self.timeout_id = None
+        self.memory_timer_id = None
+
+        # Statistics
+        self.started = 0
+        self.used = 0
+        self.discarded = {'timeout': 0, 'memory': 0, 'replaced': 0, 'unused': 0}
+
+        debug_print("[PERF] Prerender manager initialized")
+
+    def should_prerender(self, browser_view, url: str) -> bool:
+        """Check whether a suggestion is worth loading before Enter is pressed."""
+        if browser_view is None or browser_view.is_private or browser_view.container_id == "private":
+            return False
+        if not url.startswith(("http://", "https://")):
+            return False
+        if not self.settings.get_boolean("enable-prerender"):
+            return False
+        if browser_view.container_id in self.settings.get_strv("speculative-loading-excluded-containers"):
+            return False
+        if self.autocomplete_index.get_frecency(url) < self.settings.get_double("prerender-min-frecency"):
+            return False
+
+        # Never prerender into memory the system is already short of
+        memory = psutil.virtual_memory()
+        budget = self.settings.get_int("prerender-memory-budget-mb") * 1024 * 1024
+        return (memory.available > 2 * budget
+                and memory.percent < self.settings.get_int("memory-pressure-threshold"))
+
+    def top_suggestion_changed(self, browser_view, url: str):
+        """Restart the dwell time for a new top suggestion; a running prerender of it is kept."""
+        self._cancel_dwell()
+        if self._matches(browser_view, url) or not url or not self.should_prerender(browser_view, url):
+            return
+        self.dwell_timer_id = GLib.timeout_add(self.DWELL_MS, self._on_dwell_elapsed,
+                                               url, browser_view.container_id)
+
+    def _on_dwell_elapsed(self, url: str, container_id: str) -> bool:
+        self.dwell_timer_id = None
+        self._start(url, container_id)
+        return False
+
+    def _start(self, url: str, container_id: str):
+        from .browser_view import SeoltoirBrowserView
+        self.discard("replaced")
+
+        pids_before = _get_web_process_pids()
+        browser_view = SeoltoirBrowserView(self.db_manager, container_id=container_id)
+        browser_view.start_prerender()
+        browser_view.load_url(url)
+        self.prerender = _Prerender(url, container_id, browser_view, pids_before)
+        self.timeout_id = GLib.timeout_add_seconds(self.TIMEOUT_SECONDS, self._on_timeout)
+        self.memory_timer_id = GLib.timeout_add_seconds(self.MEMORY_CHECK_INTERVAL, self._check_memory)
+        self.started += 1
+        debug_print(f"[PERF] Prerendering {url} in container {container_id}")
+
+    def _on_timeout(self) -> bool:
+        self.timeout_id = None
+        self.discard("timeout")
+        return False
+
+    def _check_memory(self) -> bool:
+        """Drop the prerender once it takes more memory than the budget."""
+        if not self.prerender:
+            self.memory_timer_id = None
+            return False
+        used = self.prerender.get_memory_used()
+        if used > self.settings.get_int("prerender-memory-budget-mb") * 1024 * 1024:
+            self.memory_timer_id = None
+            self.discard("memory")
+            return False
+        return True
+
+    def _matches(self, browser_view, url: str) -> bool:
+        return (self.prerender is not None and browser_view is not None
+                and self.prerender.container_id == browser_view.container_id
+                and self.prerender.url.rstrip("/") == (url or "").rstrip("/"))
+
+    def take(self, browser_view, url: str):
+        """Hand over the prerendered view for a navigation of browser_view to url, or None."""
+        self._cancel_dwell()
+        if not self.prerender:
+            return None
+        if not self._matches(browser_view, url):
+            self.discard("unused")
+            return None
+        if browser_view.webview is not None and browser_view.webview.can_go_back():
+            # Swapping views would lose the tab's back/forward history
+            self.discard("unused")
+            return None
+
+        prerendered_view = self.prerender.browser_view
+        self.prerender.browser_view = None
+        self.discard(None)
+        self.used += 1
+        debug_print(f"[PERF] Swapping in prerendered {url}")
+        return prerendered_view
+
+    def discard(self, reason: str = "unused"):
+        """Drop the prerender, if any, counting why."""
+        if self.timeout_id:
+            GLib.source_remove(self.timeout_id)
+            self.timeout_id = None
+        if self.memory_timer_id:
+            GLib.source_remove(self.memory_timer_id)
+            self.memory_timer_id = None
+
+        prerender, self.prerender = self.prerender, None
+        if prerender and prerender.browser_view is not None:
+            # Nothing else holds the view; its page, web process and settings handlers go with it
+            prerender.browser_view.teardown()
+            prerender.browser_view = None
+            if reason:
+                self.discarded[reason] += 1
+                debug_print(f"[PERF] Discarded prerender of {prerender.url} ({reason})")
+
+    def _cancel_dwell(self):
+        if self.dwell_timer_id:
+            GLib.source_remove(self.dwell_timer_id)
+            self.dwell_timer_id = None
+
+    def get_stats(self) -> dict:
+        """Get prerender statistics."""
+        return {
+            'started': self.started,
+            'used': self.used,
+            'discarded': dict(self.discarded),
+            'active_url': self.prerender.url if self.prerender else None,
+        }
+
+    def cleanup(self):
+        self._cancel_dwell()
+        self.discard(None)
+        debug_print("[PERF] Prerender manager cleaned up")
@@ -1,13 +1,32 @@
 import json
 import urllib.parse
+from datetime import datetime
 from typing import Optional, List, Dict, Any
 from .database import DatabaseManager
 from .debug import debug_print
-from gi.repository import Gio
+from .executor_service import ExecutorService, Priority
+from gi.repository import Gio, GLib
+
+
+class _EngineRegistry:
+    """Snapshot of the search engines table, looked up by id and keyword; replaced, never modified."""
+
+    def __init__(self, engines: List[Dict[str, Any]]):
+        self.engines = tuple(engines)
+        self.by_id = {engine["id"]: engine for engine in self.engines}
+        self.by_keyword = {}
+        for engine in self.engines:
+            if engine["keyword"]:
+                self.by_keyword.setdefault(engine["keyword"], engine)
+        self.default = next((engine for engine in self.engines if engine["is_default"]), None)
+
 
 class SearchEngineManager:
     """Manages search engines with database storage and GSettings integration."""
     
+    # Seconds between writes of the last used timestamps
+    LAST_USED_FLUSH_INTERVAL = 30
+    
     DEFAULT_SEARCH_ENGINES = [
         {
             "name": "DuckDuckGo",
@@ -113,6 +132,10 @@ class SearchEngineManager:
     def __init__(self, database_manager: DatabaseManager):
         self.db = database_manager
         self.settings = Gio.Settings.new("io.github.tobagin.seoltoir")
+        # Query dispatch reads engines from memory; the table is only read again after a change
+        self._registry = None
+        self.pending_last_used = {}  # engine id -> ISO time, written in batches
+        self.last_used_timer_id = None
         self._initialize_search_engines()
     
     def _initialize_search_engines(self):
@@ -127,6 +150,7 @@ class SearchEngineManager:
         else:
             # Check if we have all the expected default engines
             self._ensure_all_default_engines_exist()
+        self._invalidate()
     
     def _migrate_from_gsettings(self):
         """Migrate search engines from GSettings to database."""
@@ -184,6 +208,7 @@ class SearchEngineManager:
                 self.db.remove_search_engine(engine_to_remove["id"])
         
         # Refresh existing engines after removal
+        self._invalidate()
         existing_engines = self.get_all_engines()
         existing_names = {engine["name"]: engine for engine in existing_engines}
         
@@ -216,41 +241,60 @@ class SearchEngineManager:
                         is_builtin=True  # Mark as builtin
                     )
     
+    def _get_registry(self) -> _EngineRegistry:
+        if self._registry is None:
+            self._registry = _EngineRegistry([self._tuple_to_dict(engine) for engine in self.db.get_search_engines()])
+        return self._registry
+    
+    def _invalidate(self):
+        """Drop the in-memory engines after a change; the next lookup reads the table again."""
+        self._registry = None
+    
+    def _copy(self, engine: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Copy a registry engine for callers, with a last use that is not written yet."""
+        if engine is None:
+            return None
+        engine = dict(engine)
+        engine["last_used"] = self.pending_last_used.get(engine["id"], engine["last_used"])
+        return engine
+    
     def get_all_engines(self) -> List[Dict[str, Any]]:
         """Get all search engines as a list of dictionaries."""
-        engines = self.db.get_search_engines()
-        return [self._tuple_to_dict(engine) for engine in engines]
+        return [self._copy(engine) for engine in self._get_registry().engines]
     
     def get_engine_by_id(self, engine_id: int) -> Optional[Dict[str, Any]]:
         """Get a search engine by ID."""
-        engine = self.db.get_search_engine_by_id(engine_id)
-        return self._tuple_to_dict(engine) if engine else None
+        return self._copy(self._get_registry().by_id.get(engine_id))
     
     def get_engine_by_keyword(self, keyword: str) -> Optional[Dict[str, Any]]:
         """Get a search engine by keyword."""
-        engine = self.db.get_search_engine_by_keyword(keyword)
-        return self._tuple_to_dict(engine) if engine else None
+        return self._copy(self._get_registry().by_keyword.get(keyword))
     
     def get_default_engine(self) -> Optional[Dict[str, Any]]:
         """Get the default search engine."""
-        engine = self.db.get_default_search_engine()
-        return self._tuple_to_dict(engine) if engine else None
+        return self._copy(self._get_registry().default)
     
     def add_engine(self, name: str, url: str, keyword: str = None, favicon_url: str = None, 
                   suggestions_url: str = None, is_default: bool = False) -> bool:
         """Add a new search engine."""
-        return self.db.add_search_engine(
-            name=name, url=url, keyword=keyword, favicon_url=favicon_url,
-            suggestions_url=suggestions_url, is_default=is_default, is_builtin=False
-        )
+        try:
+            return self.db.add_search_engine(
+                name=name, url=url, keyword=keyword, favicon_url=favicon_url,
+                suggestions_url=suggestions_url, is_default=is_default, is_builtin=False
+            )
+        finally:
+            self._invalidate()
     
     def update_engine(self, engine_id: int, name: str, url: str, keyword: str = None, 
                      favicon_url: str = None, suggestions_url: str = None, is_default: bool = False, is_builtin: bool = False) -> bool:
         """Update an existing search engine."""
-        return self.db.update_search_engine(
-            engine_id=engine_id, name=name, url=url, keyword=keyword,
-            favicon_url=favicon_url, suggestions_url=suggestions_url, is_default=is_default, is_builtin=is_builtin
-        )
+        try:
+            return self.db.update_search_engine(
+                engine_id=engine_id, name=name, url=url, keyword=keyword,
+                favicon_url=favicon_url, suggestions_url=suggestions_url, is_default=is_default, is_builtin=is_builtin
+            )
+        finally:
+            self._invalidate()
     
     def remove_engine(self, engine_id: int) -> bool:
         """Remove a search engine."""
@@ -272,11 +316,19 @@ class SearchEngineManager:
                     break
         
         self.db.remove_search_engine(engine_id)
+        self.pending_last_used.pop(engine_id, None)
+        self._invalidate()
         return True
     
     def set_default_engine(self, engine_id: int):
         """Set a search engine as default."""
         self.db.set_default_search_engine(engine_id)
+        self._invalidate()
+    
+    def reorder_engines(self, engine_positions: list[tuple]):
+        """Move search engines to new positions, given as (engine id, position) pairs."""
+        self.db.reorder_search_engines(engine_positions)
+        self._invalidate()
     
     def search_with_engine(self, query: str, engine_id: int = None) -> str:
         """Generate search URL for a query using specified engine or default."""
@@ -294,8 +346,8 @@ class SearchEngineManager:
                 # Ultimate fallback to DuckDuckGo
                 return f"https://duckduckgo.com/?q={urllib.parse.quote(query)}"
         
-        # Update last used timestamp
-        self.db.update_search_engine_last_used(engine["id"])
+        # Update last used timestamp; written with the next batch
+        self._mark_used(engine["id"])
         
         # Replace %s with encoded query
         search_url = engine["url"].replace("%s", urllib.parse.quote(query))
@@ -339,6 +391,34 @@ class SearchEngineManager:
         
         return engine.get("suggestions_url") if engine else None
     
+    def _mark_used(self, engine_id: int):
+        self.pending_last_used[engine_id] = datetime.now().isoformat()
+        if not self.last_used_timer_id:
+            self.last_used_timer_id = GLib.timeout_add_seconds(self.LAST_USED_FLUSH_INTERVAL,
+                                                               self._on_last_used_timeout)
+    
+    def _on_last_used_timeout(self) -> bool:
+        self.last_used_timer_id = None
+        last_used, self.pending_last_used = self.pending_last_used, {}
+        ExecutorService.get_default().submit(ExecutorService.DISK, self._write_last_used, last_used,
+                                             priority=Priority.LOW)
+        return False
+    
+    def _write_last_used(self, last_used: dict):
+        """Write last used timestamps; runs in a worker thread."""
+        try:
+            self.db.update_search_engines_last_used(last_used)
+        except Exception as e:
+            debug_print(f"Error writing search engine last used times: {e}")
+    
+    def cleanup(self):
+        """Write the last used timestamps that are still buffered."""
+        if self.last_used_timer_id:
+            GLib.source_remove(self.last_used_timer_id)
+            self.last_used_timer_id = None
+        last_used, self.pending_last_used = self.pending_last_used, {}
+        self._write_last_used(last_used)
+    
     def export_engines(self) -> str:
         """Export all search engines to JSON format."""
         engines = self.get_all_engines()
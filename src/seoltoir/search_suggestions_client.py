@@ -1,20 +1,103 @@
 import json
+import time
 import urllib.parse
-from typing import List, Optional, Dict, Any
-import requests
+from collections import OrderedDict
+from typing import List, Optional, Dict, Any, Tuple
 from gi.repository import GLib
 import threading
 from .debug import debug_print
+from .http_client import HttpClient
+from .executor_service import ExecutorService, Priority
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases a query and collapses its whitespace, for cache keys."""
+    return " ".join(query.lower().split())
+
 
 class SearchSuggestionsClient:
     """Client for fetching search suggestions from search engines."""
     
+    # Seconds cached suggestions are used for
+    CACHE_TTL = 300
+    # Queries kept in the cache, least recently used dropped first
+    CACHE_SIZE = 256
+    
     def __init__(self, timeout: int = 5):
         self.timeout = timeout
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.http_client = HttpClient.get_default()
+        
+        # (suggestions URL, normalized query) -> (time stored, suggestions)
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_prefix_hits = 0
+        self.cache_misses = 0
+    
+    def get_cached_suggestions(self, query: str, suggestions_url: str) -> Tuple[Optional[List[str]], bool]:
+        """Get cached suggestions for a query, and whether they were fetched for this very query.
+        
+        Without an entry for the query itself, the suggestions of the longest
+        cached prefix that still start with the query are returned as
+        provisional results (False). Returns (None, False) on a miss.
+        """
+        normalized = normalize_query(query)
+        if not normalized or not suggestions_url:
+            return None, False
+        
+        with self.cache_lock:
+            suggestions = self._get_cache_entry(suggestions_url, normalized)
+            if suggestions is not None:
+                self.cache_hits += 1
+                return suggestions, True
+            
+            for length in range(len(normalized) - 1, 0, -1):
+                prefix_suggestions = self._get_cache_entry(suggestions_url, normalized[:length])
+                if prefix_suggestions is None:
+                    continue
+                filtered = [s for s in prefix_suggestions if normalize_query(s).startswith(normalized)]
+                if filtered:
+                    self.cache_prefix_hits += 1
+                    return filtered, False
+            
+            self.cache_misses += 1
+            return None, False
+    
+    def _get_cache_entry(self, suggestions_url: str, normalized: str) -> Optional[List[str]]:
+        key = (suggestions_url, normalized)
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        stored, suggestions = entry
+        if time.monotonic() - stored > self.CACHE_TTL:
+            del self.cache[key]
+            return None
+        self.cache.move_to_end(key)
+        return suggestions
+    
+    def _store_cached_suggestions(self, query: str, suggestions_url: str, suggestions: List[str]):
+        normalized = normalize_query(query)
+        if not normalized:
+            return
+        with self.cache_lock:
+            self.cache[(suggestions_url, normalized)] = (time.monotonic(), suggestions)
+            self.cache.move_to_end((suggestions_url, normalized))
+            while len(self.cache) > self.CACHE_SIZE:
+                self.cache.popitem(last=False)
+    
+    def get_cache_stats(self) -> Dict[str, int]:
+        """Get suggestion cache statistics."""
+        with self.cache_lock:
+            return {
+                'entries': len(self.cache),
+                'hits': self.cache_hits,
+                'prefix_hits': self.cache_prefix_hits,
+                'misses': self.cache_misses,
+            }
+    
+    def clear_cache(self):
+        with self.cache_lock:
+            self.cache.clear()
     
     def fetch_suggestions(self, query: str, suggestions_url: str, callback, user_data=None):
         """Fetch search suggestions asynchronously."""
@@ -22,13 +105,11 @@ class SearchSuggestionsClient:
             callback([], user_data)
             return
         
-        # Start request in a separate thread
-        thread = threading.Thread(
-            target=self._fetch_suggestions_thread,
-            args=(query, suggestions_url, callback, user_data)
+        # Run the request on the network pool
+        ExecutorService.get_default().submit(
+            ExecutorService.NETWORK, self._fetch_suggestions_thread,
+            query, suggestions_url, callback, user_data, priority=Priority.HIGH
         )
-        thread.daemon = True
-        thread.start()
     
     def _fetch_suggestions_thread(self, query: str, suggestions_url: str, callback, user_data):
         """Fetch suggestions in a background thread."""
@@ -40,11 +121,12 @@ class SearchSuggestionsClient:
             debug_print(f"[DEBUG] Fetching suggestions from: {url}")
             
             # Make the request
-            response = self.session.get(url, timeout=self.timeout)
+            response = self.http_client.get(url, kind="suggestions", timeout=self.timeout)
             response.raise_for_status()
             
             # Parse the response
             suggestions = self._parse_suggestions_response(response.text, url)
+            self._store_cached_suggestions(query, suggestions_url, suggestions)
             
             # Call the callback in the main thread
             GLib.idle_add(callback, suggestions, user_data)
@@ -53,6 +135,43 @@ class SearchSuggestionsClient:
             debug_print(f"[DEBUG] Error fetching suggestions: {e}")
             GLib.idle_add(callback, [], user_data)
     
+    def fetch_suggestions_cancellable(self, query: str, suggestions_url: str, cancelled: threading.Event,
+                                      on_response=None) -> Optional[List[str]]:
+        """Fetch suggestions in the calling thread; returns None once cancelled is set.
+
+        The body is streamed and on_response(response) is called once the
+        headers arrive, so another thread can abort the request by closing
+        the response. Until then cancelling only keeps the result from being
+        used; the request runs on until its headers arrive or it times out.
+        """
+        if not query.strip() or not suggestions_url:
+            return []
+        try:
+            encoded_query = urllib.parse.quote(query)
+            url = suggestions_url.replace('%s', encoded_query)
+
+            debug_print(f"[DEBUG] Fetching suggestions from: {url}")
+
+            with self.http_client.stream(url, kind="suggestions", timeout=self.timeout) as response:
+                if on_response is not None:
+                    on_response(response)
+                response.raise_for_status()
+                chunks = []
+                for chunk in response.iter_content(chunk_size=4096):
+                    if cancelled.is_set():
+                        return None
+                    chunks.append(chunk)
+                if cancelled.is_set():
+                    return None
+                text = b"".join(chunks).decode(response.encoding or "utf-8", errors="replace")
+                suggestions = self._parse_suggestions_response(text, url)
+                self._store_cached_suggestions(query, suggestions_url, suggestions)
+                return suggestions
+
+        except Exception as e:
+            debug_print(f"[DEBUG] Error fetching suggestions: {e}")
+            return None if cancelled.is_set() else []
+
     def _parse_suggestions_response(self, response_text: str, url: str) -> List[str]:
         """Parse search suggestions response based on the format."""
         try:
@@ -154,7 +273,7 @@ class SearchSuggestionsClient:
             debug_print(f"[DEBUG] Fetching suggestions from: {url}")
             
             # Make the request
-            response = self.session.get(url, timeout=self.timeout)
+            response = self.http_client.get(url, kind="suggestions", timeout=self.timeout)
             response.raise_for_status()
             
             # Parse the response
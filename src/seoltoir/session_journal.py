@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Session journal for Seoltoir browser.
+Records tab open, close, navigate and move events as they happen, so a
+crash loses at most a few seconds of session state and shutdown does not
+have to serialize every tab.
+"""
+
+from gi.repository import GLib, Gio
+
+import threading
+import uuid
+from .debug import debug_print
+from .executor_service import ExecutorService, Priority
+
+
+class SessionJournal:
+    """Buffers session events and appends them to the database journal."""
+
+    # Seconds between journal writes; the most session state a crash can lose
+    FLUSH_INTERVAL = 2
+    # Seconds between folding the journal into the session snapshot
+    COMPACT_INTERVAL = 60
+
+    def __init__(self, application, db_manager):
+        self.db_manager = db_manager
+        self.settings = Gio.Settings.new(application.get_application_id())
+
+        self.pending_records = []
+        self.flush_timer_id = None
+        self.compact_timer_id = GLib.timeout_add_seconds(self.COMPACT_INTERVAL, self._compact)
+        self.write_lock = threading.Lock()
+        self.records_since_compaction = 0
+        self.is_stopped = False
+        self.next_window_id = 1
+
+        debug_print("[SESSION] Session journal initialized")
+
+    @staticmethod
+    def new_tab_key() -> str:
+        """Create the key that identifies a tab across journal records."""
+        return uuid.uuid4().hex
+
+    def new_window_id(self) -> int:
+        """Allocate the id that groups the tabs of a window in the session."""
+        window_id = self.next_window_id
+        self.next_window_id += 1
+        return window_id
+
+    def should_record(self, browser_view) -> bool:
+        """Private tabs never reach the session on disk."""
+        return (not self.is_stopped and not browser_view.is_private
+                and getattr(browser_view, 'session_key', None) is not None)
+
+    def tab_opened(self, browser_view, window_id: int, after_key: str = None, is_pinned: bool = False):
+        if self.should_record(browser_view):
+            self._append("open", browser_view.session_key, {
+                "after": after_key,
+                "window_id": window_id,
+                "container_id": browser_view.container_id,
+                "is_pinned": is_pinned,
+                "is_selected": False,
+                **self._tab_state(browser_view),
+            })
+
+    def tab_navigated(self, browser_view):
+        if self.should_record(browser_view):
+            self._append("navigate", browser_view.session_key, self._tab_state(browser_view))
+
+    def tab_moved(self, browser_view, window_id: int, after_key: str = None):
+        if self.should_record(browser_view):
+            self._append("move", browser_view.session_key, {"after": after_key, "window_id": window_id})
+
+    def tab_selected(self, browser_view):
+        if self.should_record(browser_view):
+            self._append("select", browser_view.session_key, {})
+
+    def tab_pinned(self, browser_view, is_pinned: bool):
+        if self.should_record(browser_view):
+            self._append("pin", browser_view.session_key, {"is_pinned": is_pinned})
+
+    def tab_closed(self, browser_view):
+        if self.should_record(browser_view):
+            self._append("close", browser_view.session_key, {})
+
+    def window_changed(self, window_id: int, width: int, height: int, is_maximized: bool):
+        if not self.is_stopped:
+            self._append("window", str(window_id), {
+                "window_id": window_id,
+                "width": width,
+                "height": height,
+                "is_maximized": is_maximized,
+            })
+
+    def window_closed(self, window_id: int):
+        """Drop a window and its tabs from the session when it is closed on its own."""
+        if not self.is_stopped:
+            self._append("close-window", str(window_id), {"window_id": window_id})
+
+    def _tab_state(self, browser_view) -> dict:
+        return {
+            "url": browser_view.get_uri() or "",
+            "title": browser_view.get_title() or "",
+            "is_private": False,
+            "serialized_state": browser_view.serialize_session_state(),
+        }
+
+    def _append(self, event: str, tab_key: str, payload: dict):
+        # Consecutive navigations of one tab, or resizes of one window, collapse into the latest
+        if (event in ("navigate", "window") and self.pending_records
+                and self.pending_records[-1][0] == event and self.pending_records[-1][1] == tab_key):
+            self.pending_records[-1] = (event, tab_key, payload)
+        else:
+            self.pending_records.append((event, tab_key, payload))
+
+        if not self.flush_timer_id:
+            self.flush_timer_id = GLib.timeout_add_seconds(self.FLUSH_INTERVAL, self._on_flush_timeout)
+
+    def _on_flush_timeout(self) -> bool:
+        self.flush_timer_id = None
+        records, self.pending_records = self.pending_records, []
+        if records:
+            ExecutorService.get_default().submit(ExecutorService.DISK, self._write_records, records,
+                                                 priority=Priority.HIGH)
+        return False
+
+    def _write_records(self, records: list):
+        """Append records to the journal; runs in a worker thread."""
+        with self.write_lock:
+            try:
+                self.db_manager.append_session_journal(records)
+                self.records_since_compaction += len(records)
+            except Exception as e:
+                debug_print(f"[SESSION] Error writing session journal: {e}")
+
+    def _compact(self) -> bool:
+        if self.records_since_compaction and not self.is_stopped:
+            ExecutorService.get_default().submit(ExecutorService.DISK, self._compact_in_thread,
+                                                 priority=Priority.LOW)
+        return True  # Keep the periodic timer
+
+    def _compact_in_thread(self):
+        with self.write_lock:
+            try:
+                folded = self.db_manager.compact_session_journal()
+                self.records_since_compaction = 0
+                debug_print(f"[SESSION] Compacted {folded} journal records into the snapshot")
+            except Exception as e:
+                debug_print(f"[SESSION] Error compacting session journal: {e}")
+
+    def restore(self) -> list[dict]:
+        """Get the windows of the last session, each with its tabs: the snapshot with the journal replayed."""
+        try:
+            if not self.settings.get_boolean("restore-session-on-startup"):
+                # Start a new session instead of journaling on top of the old one
+                self.db_manager.save_session([])
+                return []
+            windows = self.db_manager.load_session_windows()
+        except Exception as e:
+            debug_print(f"[SESSION] Error loading session: {e}")
+            return []
+
+        # Fold what was replayed so the next startup starts from a fresh snapshot
+        self.records_since_compaction += 1
+        self._compact()
+
+        for window in windows:
+            window["tabs"] = [tab for tab in window["tabs"] if tab.get("url") and not tab.get("is_private")]
+        windows = [window for window in windows if window["tabs"]]
+        self.next_window_id = max([window["window_id"] for window in windows], default=0) + 1
+        return windows
+
+    def cleanup(self):
+        """Write the last buffered records; the journal is already on disk otherwise."""
+        self.is_stopped = True
+        if self.flush_timer_id:
+            GLib.source_remove(self.flush_timer_id)
+            self.flush_timer_id = None
+        if self.compact_timer_id:
+            GLib.source_remove(self.compact_timer_id)
+            self.compact_timer_id = None
+
+        # Queued behind earlier writes, which keeps the journal in order; being high priority,
+        # shutdown writes it even when the disk pool cannot drain in time
+        records, self.pending_records = self.pending_records, []
+        if records:
+            ExecutorService.get_default().submit(ExecutorService.DISK, self._write_records, records,
+                                                 priority=Priority.HIGH)
+        debug_print("[SESSION] Session journal cleaned up")
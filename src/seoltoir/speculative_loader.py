@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Speculative loader for Seoltoir browser.
+Resolves the host of the top omnibox suggestion once it has stayed the same
+for a moment, in the network session of the tab being typed into, so that
+navigating to it does not wait on DNS. Off unless enabled, and never used
+for private tabs or excluded containers.
+"""
+
+from gi.repository import GLib, Gio
+
+import time
+import urllib.parse
+from collections import OrderedDict
+from .debug import debug_print
+
+
+class SpeculativeLoader:
+    """Prefetches DNS for the top omnibox suggestion and measures how often navigation benefits."""
+
+    # Milliseconds the top suggestion has to stay the same before its host is resolved
+    DWELL_MS = 300
+    # Seconds a prefetched host counts as warm; roughly how long resolvers cache a lookup
+    PREFETCH_TTL = 60
+    # Prefetched hosts remembered for hit/miss accounting
+    MAX_TRACKED_HOSTS = 64
+
+    def __init__(self, application):
+        self.settings = Gio.Settings.new(application.get_application_id())
+
+        self.dwell_timer_id = None
+        self.candidate = None  # (container id, host) waiting for the dwell time
+        self.prefetched_hosts = OrderedDict()  # (container id, host) -> monotonic time of the prefetch
+
+        # Statistics
+        self.prefetches = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted = 0
+
+        debug_print("[PERF] Speculative loader initialized")
+
+    def should_speculate(self, browser_view) -> bool:
+        """Check whether lookups may be made ahead of navigation for a tab."""
+        if browser_view is None or browser_view.is_private or browser_view.container_id == "private":
+            return False
+        if not self.settings.get_boolean("enable-speculative-loading"):
+            return False
+        excluded = self.settings.get_strv("speculative-loading-excluded-containers")
+        return browser_view.container_id not in excluded
+
+    @staticmethod
+    def _get_host(url: str) -> str:
+        try:
+            parsed = urllib.parse.urlparse(url or "")
+        except ValueError:
+            return ""
+        return (parsed.hostname or "") if parsed.scheme in ("http", "https") else ""
+
+    def top_suggestion_changed(self, browser_view, url: str):
+        """Restart the dwell time for a new top suggestion; an empty URL just cancels."""
+        self.cancel()
+        host = self._get_host(url)
+        if not host or not self.should_speculate(browser_view):
+            return
+        key = (browser_view.container_id, host)
+        if self._is_warm(key):
+            return
+        self.candidate = key
+        self.dwell_timer_id = GLib.timeout_add(self.DWELL_MS, self._on_dwell_elapsed, browser_view)
+
+    def _on_dwell_elapsed(self, browser_view) -> bool:
+        self.dwell_timer_id = None
+        key, self.candidate = self.candidate, None
+        if key:
+            self._prefetch(browser_view, key)
+        return False
+
+    def _prefetch(self, browser_view, key: tuple):
+        from .browser_view import SeoltoirBrowserView
+        container_id, host = key
+        try:
+            _, network_session = SeoltoirBrowserView.get_context_and_network_session(
+                browser_view.is_private, container_id)
+            network_session.prefetch_dns(host)
+        except Exception as e:
+            debug_print(f"[PERF] Error prefetching DNS for {host}: {e}")
+            return
+
+        self.prefetched_hosts.pop(key, None)
+        self.prefetched_hosts[key] = time.monotonic()
+        while len(self.prefetched_hosts) > self.MAX_TRACKED_HOSTS:
+            self.prefetched_hosts.popitem(last=False)
+            self.wasted += 1
+        self.prefetches += 1
+        debug_print(f"[PERF] Prefetched DNS for {host} in container {container_id}")
+
+    def _is_warm(self, key: tuple) -> bool:
+        prefetched_at = self.prefetched_hosts.get(key)
+        return prefetched_at is not None and time.monotonic() - prefetched_at < self.PREFETCH_TTL
+
+    def navigation_started(self, browser_view, url: str):
+        """Count whether an omnibox navigation found its host already resolved."""
+        self.cancel()
+        host = self._get_host(url)
+        if not host or not self.should_speculate(browser_view):
+            return
+        key = (browser_view.container_id, host)
+        if self._is_warm(key):
+            self.hits += 1
+        else:
+            self.misses += 1
+        self.prefetched_hosts.pop(key, None)
+
+    def cancel(self):
+        """Forget the suggestion waiting for its dwell time."""
+        if self.dwell_timer_id:
+            GLib.source_remove(self.dwell_timer_id)
+            self.dwell_timer_id = None
+        self.candidate = None
+
+    def get_stats(self) -> dict:
+        """Get speculation statistics."""
+        navigations = self.hits + self.misses
+        expired = sum(1 for prefetched_at in self.prefetched_hosts.values()
+                      if time.monotonic() - prefetched_at >= self.PREFETCH_TTL)
+        return {
+            'prefetches': self.prefetches,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / navigations if navigations else 0.0,
+            'wasted': self.wasted + expired,
+        }
+
+    def cleanup(self):
+        self.cancel()
+        self.prefetched_hosts.clear()
+        debug_print("[PERF] Speculative loader cleaned up")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Suggestion scheduler for Seoltoir browser.
+Debounces omnibox keystrokes and runs remote search suggestion requests so
+that superseded ones are aborted once their response starts arriving, and
+the newest request starts right away instead of waiting for them.
+"""
+
+from gi.repository import GLib
+
+import threading
+from .debug import debug_print
+from .executor_service import ExecutorService, Priority
+
+
+class _SuggestionRequest:
+    """A remote suggestions request for one query, tagged with the generation it belongs to."""
+
+    def __init__(self, query: str, suggestions_url: str, generation: int, callback, user_data):
+        self.query = query
+        self.suggestions_url = suggestions_url
+        self.generation = generation
+        self.callback = callback
+        self.user_data = user_data
+        self.cancelled = threading.Event()
+        self.response = None
+        self.lock = threading.Lock()
+
+    def set_response(self, response):
+        """Remember the response once its headers arrive, closing it at once if already cancelled."""
+        with self.lock:
+            self.response = response
+        if self.cancelled.is_set():
+            response.close()
+
+    def cancel(self):
+        """Stop the request; closing its response aborts a body that is still being read."""
+        self.cancelled.set()
+        with self.lock:
+            response = self.response
+        if response is not None:
+            response.close()
+
+
+class _EngineSlot:
+    """The requests running against one engine, and the newest one waiting for a free place."""
+
+    def __init__(self):
+        self.running = []  # The live request last, any others already cancelled
+        self.queued = None
+
+
+class SuggestionScheduler:
+    """Debounces omnibox queries and runs at most one remote suggestions request per engine."""
+
+    # Milliseconds typing has to pause before suggestions are looked up
+    DEBOUNCE_MS = 150
+    # Requests running against one engine at once, counting cancelled ones still waiting for headers
+    MAX_REQUESTS_PER_ENGINE = 2
+
+    def __init__(self, suggestions_client):
+        self.suggestions_client = suggestions_client
+        self.generation = 0
+        self.debounce_id = None
+        self.engine_slots = {}  # suggestions URL -> _EngineSlot
+
+        # Statistics
+        self.requests_started = 0
+        self.requests_cancelled = 0
+        self.requests_skipped = 0
+
+    def schedule(self, callback, query: str, delay_ms: int = None) -> int:
+        """Call callback(query, generation) once typing pauses; supersedes everything scheduled before."""
+        self.cancel()
+        self.generation += 1
+        self.debounce_id = GLib.timeout_add(delay_ms if delay_ms is not None else self.DEBOUNCE_MS,
+                                            self._on_debounce_elapsed, callback, query, self.generation)
+        return self.generation
+
+    def _on_debounce_elapsed(self, callback, query: str, generation: int) -> bool:
+        self.debounce_id = None
+        if generation == self.generation:
+            callback(query, generation)
+        return False
+
+    def is_current(self, generation: int) -> bool:
+        return generation == self.generation
+
+    def cancel(self):
+        """Drop the pending lookup and stop the remote requests of earlier generations."""
+        if self.debounce_id:
+            GLib.source_remove(self.debounce_id)
+            self.debounce_id = None
+        # Results of older generations are never shown, even if a request slips through
+        self.generation += 1
+        for slot in self.engine_slots.values():
+            if slot.queued:
+                slot.queued = None
+                self.requests_skipped += 1
+            for running in slot.running:
+                running.cancel()
+
+    def fetch_remote(self, query: str, suggestions_url: str, generation: int, callback, user_data=None):
+        """Fetch search suggestions; callback(suggestions, user_data) runs only if generation is still current."""
+        if not self.is_current(generation):
+            return
+        slot = self.engine_slots.setdefault(suggestions_url, _EngineSlot())
+        request = _SuggestionRequest(query, suggestions_url, generation, callback, user_data)
+        for running in slot.running:
+            running.cancel()
+        if len(slot.running) < self.MAX_REQUESTS_PER_ENGINE:
+            self._start(slot, request)
+        else:
+            # Cancelled requests still waiting for headers cannot be aborted; the newest waits for one
+            if slot.queued:
+                self.requests_skipped += 1
+            slot.queued = request
+
+    def _start(self, slot: _EngineSlot, request: _SuggestionRequest):
+        slot.running.append(request)
+        self.requests_started += 1
+        # Suggestions are what the user is waiting for; they go ahead of other network work
+        ExecutorService.get_default().submit(ExecutorService.NETWORK, self._run_request, slot, request,
+                                             priority=Priority.HIGH)
+
+    def _run_request(self, slot: _EngineSlot, request: _SuggestionRequest):
+        """Run one request; runs in a worker thread."""
+        suggestions = None
+        if not request.cancelled.is_set():
+            suggestions = self.suggestions_client.fetch_suggestions_cancellable(
+                request.query, request.suggestions_url, request.cancelled, request.set_response
+            )
+        ExecutorService.run_on_main(self._on_request_finished, slot, request, suggestions)
+
+    def _on_request_finished(self, slot: _EngineSlot, request: _SuggestionRequest, suggestions) -> bool:
+        slot.running.remove(request)
+        if suggestions is None or request.cancelled.is_set():
+            self.requests_cancelled += 1
+            debug_print(f"[OMNIBOX] Cancelled suggestions request for '{request.query}'")
+        elif self.is_current(request.generation):
+            request.callback(suggestions, request.user_data)
+
+        queued, slot.queued = slot.queued, None
+        if queued:
+            if self.is_current(queued.generation) and not queued.cancelled.is_set():
+                self._start(slot, queued)
+            else:
+                self.requests_skipped += 1
+        return False
+
+    def get_stats(self) -> dict:
+        """Get request statistics."""
+        return {
+            'requests_started': self.requests_started,
+            'requests_cancelled': self.requests_cancelled,
+            'requests_skipped': self.requests_skipped,
+            'requests_in_flight': sum(len(slot.running) for slot in self.engine_slots.values()),
+        }
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Open tab index for Seoltoir browser.
+Keeps the URL and title of every open tab in memory, across all windows and
+including suspended and deferred tabs, so the omnibox can offer switching to
+a tab that is already open instead of loading the page a second time.
+"""
+
+import time
+
+from .debug import debug_print
+from .autocomplete_index import AutocompleteIndex, strip_url
+
+
+class _TabEntry:
+    __slots__ = ("url", "title", "tokens", "last_used")
+
+    def __init__(self, url: str, title: str, last_used: float = None):
+        self.url = url
+        self.title = title
+        self.tokens = AutocompleteIndex.tokenize(url, title)
+        self.last_used = last_used if last_used is not None else time.monotonic()
+
+
+class TabIndex:
+    """Prefix search over the URLs and titles of open tabs, kept current from tab signals."""
+
+    def __init__(self):
+        self.entries = {}  # browser view -> _TabEntry
+
+        # Statistics
+        self.queries = 0
+        self.last_query_ms = 0.0
+
+    @staticmethod
+    def _is_indexable(url: str) -> bool:
+        # Suspended tabs show a placeholder page at about:blank but keep their real URL here
+        return bool(url) and url != "about:blank"
+
+    def update(self, browser_view, url: str = None, title: str = None):
+        """Index a tab, or refresh its URL or title; private tabs are never indexed."""
+        if getattr(browser_view, 'is_private', False):
+            return
+        entry = self.entries.get(browser_view)
+        url = url if url is not None else browser_view.get_uri()
+        title = title if title is not None else browser_view.get_title()
+        if not self._is_indexable(url):
+            if entry is None:
+                return
+            url = entry.url
+        title = title or (entry.title if entry and entry.url == url else "")
+        if entry is None or entry.url != url or entry.title != title:
+            self.entries[browser_view] = _TabEntry(url, title, entry.last_used if entry else None)
+
+    def touch(self, browser_view):
+        """Record that a tab was selected; recently used tabs rank first."""
+        entry = self.entries.get(browser_view)
+        if entry:
+            entry.last_used = time.monotonic()
+
+    def remove(self, browser_view):
+        self.entries.pop(browser_view, None)
+
+    def search(self, query: str, limit: int = 3, exclude=None) -> list[tuple]:
+        """Get (browser_view, url, title) of the open tabs matching every query word, best first."""
+        start = time.perf_counter()
+        words = AutocompleteIndex.tokenize(query, "")
+        stripped_query = strip_url(query)
+        matches = []
+        if words:
+            for browser_view, entry in self.entries.items():
+                if browser_view is exclude:
+                    continue
+                if all(any(token.startswith(word) for token in entry.tokens) for word in words):
+                    # Tabs whose URL starts with what was typed come first, then whole-word matches
+                    matches.append((not strip_url(entry.url).startswith(stripped_query),
+                                    -sum(word in entry.tokens for word in words),
+                                    -entry.last_used, browser_view, entry))
+        matches.sort(key=lambda match: match[:3])
+
+        self.queries += 1
+        self.last_query_ms = (time.perf_counter() - start) * 1000
+        return [(browser_view, entry.url, entry.title) for *_, browser_view, entry in matches[:limit]]
+
+    def get_stats(self) -> dict:
+        """Get index statistics."""
+        return {
+            'tabs': len(self.entries),
+            'queries': self.queries,
+            'last_query_ms': self.last_query_ms,
+        }
+
+    def cleanup(self):
+        self.entries.clear()
+        debug_print("[OMNIBOX] Tab index cleaned up")
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+User script registry for Seoltoir browser.
+Builds each injected script (fingerprinting protection, password form
+detection, lazy image loading) once and adds the same WebKit.UserScript to
+the UserContentManager of every tab. When a setting changes, only the
+scripts it affects are swapped in the tabs that use them.
+"""
+
+import gi
+gi.require_version("WebKit", "6.0")
+from gi.repository import WebKit, Gio
+
+import weakref
+from .debug import debug_print
+
+
+CANVAS_SPOOFING_SCRIPT = """
+(function() {
+    const addNoise = (value, factor = 0.001) => value * (1 + (Math.random() - 0.5) * factor);
+    const randomInt = (min, max) => Math.floor(Math.random() * (max - min + 1)) + min;
+
+    const spoofWebGL = (gl) => {
+        const originalGetParameter = gl.getParameter;
+        gl.getParameter = function(pname) {
+            const result = originalGetParameter.apply(this, arguments);
+            if (typeof result === 'number' && [
+                gl.MAX_COMBINED_TEXTURE_IMAGE_UNITS,
+                gl.MAX_CUBE_MAP_TEXTURE_SIZE,
+                gl.MAX_RENDERBUFFER_SIZE,
+                gl.MAX_TEXTURE_SIZE,
+                gl.MAX_VIEWPORT_DIMS,
+            ].includes(pname)) {
+                return addNoise(result, 0.0001);
+            } else if (typeof result === 'string' && [
+                gl.RENDERER, gl.VENDOR, gl.VERSION, gl.SHADING_LANGUAGE_VERSION
+            ].includes(pname)) {
+                return result + ' (spoofed)';
+            }
+            return result;
+        };
+    };
+
+    const originalGetContext = HTMLCanvasElement.prototype.getContext;
+    HTMLCanvasElement.prototype.getContext = function(contextType, contextAttributes) {
+        const context = originalGetContext.apply(this, arguments);
+        if (context && (contextType === 'webgl' || contextType === 'webgl2')) {
+            spoofWebGL(context);
+        }
+        return context;
+    };
+
+    const originalToDataURL = HTMLCanvasElement.prototype.toDataURL;
+    HTMLCanvasElement.prototype.toDataURL = function(type, encoderOptions) {
+        const context = this.getContext('2d');
+        if (context) {
+            const imageData = context.getImageData(0, 0, this.width, this.height);
+            if (imageData && imageData.data) {
+                for (let i = 0; i < 20; i++) {
+                    const pixelIndex = randomInt(0, imageData.data.length / 4 - 1) * 4;
+                    imageData.data[pixelIndex + 0] = addNoise(imageData.data[pixelIndex + 0], 0.01);
+                    imageData.data[pixelIndex + 1] = addNoise(imageData.data[pixelIndex + 1], 0.01);
+                    imageData.data[pixelIndex + 2] = addNoise(imageData.data[pixelIndex + 2], 0.01);
+                }
+            }
+            context.putImageData(imageData, 0, 0);
+        }
+        return originalToDataURL.apply(this, arguments);
+    };
+
+    const originalGetImageData = CanvasRenderingContext2D.prototype.getImageData;
+    CanvasRenderingContext2D.prototype.getImageData = function(sx, sy, sw, sh) {
+        const imageData = originalGetImageData.apply(this, arguments);
+        if (imageData && imageData.data) {
+            for (let i = 0; i < 20; i++) {
+                const pixelIndex = randomInt(0, imageData.data.length / 4 - 1) * 4;
+                imageData.data[pixelIndex + 0] = addNoise(imageData.data[pixelIndex + 0], 0.01);
+                imageData.data[pixelIndex + 1] = addNoise(imageData.data[pixelIndex + 1], 0.01);
+                imageData.data[pixelIndex + 2] = addNoise(imageData.data[pixelIndex + 2], 0.01);
+            }
+        }
+        return imageData;
+    };
+
+    if (window.AudioContext) {
+        const originalCreateOscillator = AudioContext.prototype.createOscillator;
+        AudioContext.prototype.createOscillator = function() {
+            const oscillator = originalCreateOscillator.apply(this, arguments);
+            oscillator.frequency.value = addNoise(oscillator.frequency.value, 0.001);
+            return oscillator;
+        };
+
+        const originalCreateAnalyser = AudioContext.prototype.createAnalyser;
+        AudioContext.prototype.createAnalyser = function() {
+            const analyser = originalCreateAnalyser.apply(this, arguments);
+            analyser.fftSize = randomInt(analyser.fftSize - 2, analyser.fftSize + 2);
+            return analyser;
+        };
+    }
+})();
+"""
+
+FONT_SPOOFING_SCRIPT = """
+(function() {
+    const spoofedFonts = ["Arial", "Courier New", "Georgia", "Times New Roman", "Verdana", "Roboto", "Noto Sans", "Open Sans", "Segoe UI"];
+    Object.defineProperty(navigator, 'fonts', {
+        get: () => ({
+            ready: Promise.resolve(),
+            check: () => true,
+            forEach: (callback) => {
+                spoofedFonts.forEach(font => callback({ family: font, style: 'normal', weight: 'normal' }));
+            },
+            keys: () => spoofedFonts.values(),
+            values: () => spoofedFonts.values(),
+            entries: () => {
+                const entries = spoofedFonts.map(font => [font, { family: font, style: 'normal', weight: 'normal' }]);
+                return entries.values();
+            },
+            [Symbol.iterator]: function* () {
+                for (const font of spoofedFonts) {
+                    yield { family: font, style: 'normal', weight: 'normal' };
+                }
+            }
+        })
+    });
+})();
+"""
+
+HARDWARE_SPOOFING_SCRIPT = """
+(function() {
+    const randomInt = (min, max) => Math.floor(Math.random() * (max - min + 1)) + min;
+    Object.defineProperty(navigator, 'hardwareConcurrency', {
+        get: () => randomInt(2, 8)
+    });
+    Object.defineProperty(navigator, 'deviceMemory', {
+        get: () => randomInt(4, 16)
+    });
+})();
+"""
+
+PASSWORD_FORM_SCRIPT = """
+(function() {
+    console.log('[PASSWORD-JS] Password form detection script starting...');
+    
+    // Keep track of processed forms to avoid duplicates
+    window.seoltoirProcessedForms = window.seoltoirProcessedForms || new Set();
+    
+    function findPasswordForms() {
+        console.log('[PASSWORD-JS] Looking for password forms...');
+        const forms = document.querySelectorAll('form');
+        const passwordForms = [];
+        
+        forms.forEach((form, index) => {
+            const formId = form.id || `form-${index}`;
+            if (window.seoltoirProcessedForms.has(formId)) {
+                return; // Skip already processed forms
+            }
+            
+            const passwordInputs = form.querySelectorAll('input[type="password"]');
+            const usernameInputs = form.querySelectorAll('input[type="text"], input[type="email"], input[name*="user"], input[name*="login"], input[name*="email"]');
+            
+            if (passwordInputs.length > 0) {
+                console.log('[PASSWORD-JS] Found password form:', formId);
+                
+                const formData = {
+                    formId: formId,
+                    action: form.action || window.location.href,
+                    method: form.method || 'POST',
+                    passwordFields: [],
+                    usernameFields: []
+                };
+                
+                // Collect password field info
+                passwordInputs.forEach((input, idx) => {
+                    formData.passwordFields.push({
+                        id: input.id || `password-${idx}`,
+                        name: input.name || '',
+                        placeholder: input.placeholder || '',
+                        autocomplete: input.autocomplete || ''
+                    });
+                });
+                
+                // Collect username field info
+                usernameInputs.forEach((input, idx) => {
+                    formData.usernameFields.push({
+                        id: input.id || `username-${idx}`,
+                        name: input.name || '',
+                        type: input.type || '',
+                        placeholder: input.placeholder || '',
+                        autocomplete: input.autocomplete || ''
+                    });
+                });
+                
+                passwordForms.push(formData);
+                window.seoltoirProcessedForms.add(formId);
+                
+                // Add form submit listener for password save detection
+                form.addEventListener('submit', function(e) {
+                    handleFormSubmit(formData, form);
+                });
+            }
+        });
+        
+        return passwordForms;
+    }
+    
+    function handleFormSubmit(formData, form) {
+        console.log('[PASSWORD-JS] Form submitted:', formData.formId);
+        
+        const submitData = {
+            type: 'password_form_submit',
+            formId: formData.formId,
+            url: window.location.href,
+            action: formData.action,
+            username: '',
+            password: '',
+            title: document.title
+        };
+        
+        // Get actual values from form fields
+        const passwordField = form.querySelector('input[type="password"]');
+        if (passwordField && passwordField.value) {
+            submitData.password = passwordField.value;
+        }
+        
+        // Try to find username value
+        const usernameField = form.querySelector('input[type="text"], input[type="email"]') ||
+                            form.querySelector('input[name*="user"], input[name*="login"], input[name*="email"]');
+        if (usernameField && usernameField.value) {
+            submitData.username = usernameField.value;
+        }
+        
+        // Only proceed if we have both username and password
+        if (submitData.username && submitData.password) {
+            console.log('[PASSWORD-JS] Sending password save data');
+            if (window.webkit && window.webkit.messageHandlers && window.webkit.messageHandlers.passwordHandler) {
+                window.webkit.messageHandlers.passwordHandler.postMessage(submitData);
+            }
+        }
+    }
+    
+    function requestAutofill() {
+        const passwordForms = findPasswordForms();
+        
+        if (passwordForms.length > 0) {
+            console.log('[PASSWORD-JS] Requesting autofill for forms');
+            const autofillRequest = {
+                type: 'password_autofill_request',
+                url: window.location.href,
+                forms: passwordForms
+            };
+            
+            if (window.webkit && window.webkit.messageHandlers && window.webkit.messageHandlers.passwordHandler) {
+                window.webkit.messageHandlers.passwordHandler.postMessage(autofillRequest);
+            }
+        }
+    }
+    
+    function fillPassword(username, password, formId) {
+        console.log('[PASSWORD-JS] Filling password for form:', formId);
+        
+        const form = formId ? document.getElementById(formId) || document.querySelector(`form:nth-child(${formId})`) : document.querySelector('form');
+        if (!form) {
+            console.log('[PASSWORD-JS] Form not found for autofill');
+            return false;
+        }
+        
+        // Fill username
+        const usernameField = form.querySelector('input[type="text"], input[type="email"]') ||
+                            form.querySelector('input[name*="user"], input[name*="login"], input[name*="email"]');
+        if (usernameField) {
+            usernameField.value = username;
+            usernameField.dispatchEvent(new Event('input', { bubbles: true }));
+            usernameField.dispatchEvent(new Event('change', { bubbles: true }));
+        }
+        
+        // Fill password
+        const passwordField = form.querySelector('input[type="password"]');
+        if (passwordField) {
+            passwordField.value = password;
+            passwordField.dispatchEvent(new Event('input', { bubbles: true }));
+            passwordField.dispatchEvent(new Event('change', { bubbles: true }));
+        }
+        
+        console.log('[PASSWORD-JS] Password filled successfully');
+        return true;
+    }
+    
+    // Expose fillPassword function globally for external calls
+    window.seoltoirFillPassword = fillPassword;
+    
+    // Initial form detection
+    const forms = findPasswordForms();
+    if (forms.length > 0) {
+        console.log('[PASSWORD-JS] Found', forms.length, 'password forms');
+        // Request autofill for existing forms
+        setTimeout(requestAutofill, 100);
+    }
+    
+    // Watch for dynamically added forms
+    const observer = new MutationObserver(function(mutations) {
+        let shouldCheck = false;
+        mutations.forEach(function(mutation) {
+            if (mutation.type === 'childList') {
+                mutation.addedNodes.forEach(function(node) {
+                    if (node.nodeType === Node.ELEMENT_NODE) {
+                        if (node.tagName === 'FORM' || node.querySelector('form')) {
+                            shouldCheck = true;
+                        }
+                    }
+                });
+            }
+        });
+        
+        if (shouldCheck) {
+            console.log('[PASSWORD-JS] DOM changed, checking for new forms...');
+            setTimeout(function() {
+                const newForms = findPasswordForms();
+                if (newForms.length > 0) {
+                    setTimeout(requestAutofill, 100);
+                }
+            }, 500);
+        }
+    });
+    
+    observer.observe(document.body, {
+        childList: true,
+        subtree: true
+    });
+    
+    console.log('[PASSWORD-JS] Password form detection initialized');
+})();
+"""
+
+LAZY_IMAGE_LOADING_SCRIPT = """
+(function() {
+    const threshold = %d;
+    const images = document.querySelectorAll('img');
+
+    const lazyLoad = (entries, observer) => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                const img = entry.target;
+                if (img.dataset.src) {
+                    img.src = img.dataset.src;
+                    img.removeAttribute('data-src');
+                    observer.unobserve(img);
+                }
+            }
+        });
+    };
+
+    const observer = new IntersectionObserver(lazyLoad, {
+        rootMargin: `${threshold}px`
+    });
+
+    images.forEach(img => {
+        if (img.src && !img.complete) {
+            img.dataset.src = img.src;
+            img.src = '';
+            observer.observe(img);
+        }
+    });
+})();
+"""
+
+
+class _ScriptSpec:
+    """How a registered script is built and when a tab gets it."""
+
+    def __init__(self, build, injection_time, injected_frames=WebKit.UserContentInjectedFrames.ALL_FRAMES,
+                 enable_key: str = None, source_keys: tuple = (), needs_passwords: bool = False):
+        self.build = build  # settings -> JavaScript source
+        self.injection_time = injection_time
+        self.injected_frames = injected_frames
+        self.enable_key = enable_key  # Boolean setting that turns the script on, or None for always
+        self.source_keys = source_keys  # Settings the source is built from
+        self.needs_passwords = needs_passwords  # Only for tabs that save passwords
+
+
+class UserScriptRegistry:
+    """Shares one WebKit.UserScript per script between the UserContentManagers of all tabs."""
+
+    SCRIPTS = {
+        "canvas-spoofing": _ScriptSpec(lambda settings: CANVAS_SPOOFING_SCRIPT,
+                                       WebKit.UserScriptInjectionTime.START,
+                                       enable_key="enable-canvas-spoofing"),
+        "font-spoofing": _ScriptSpec(lambda settings: FONT_SPOOFING_SCRIPT,
+                                     WebKit.UserScriptInjectionTime.START,
+                                     enable_key="enable-font-spoofing"),
+        "hardware-spoofing": _ScriptSpec(lambda settings: HARDWARE_SPOOFING_SCRIPT,
+                                         WebKit.UserScriptInjectionTime.START,
+                                         enable_key="enable-hardware-concurrency-spoofing"),
+        "password-forms": _ScriptSpec(lambda settings: PASSWORD_FORM_SCRIPT,
+                                      WebKit.UserScriptInjectionTime.END,
+                                      needs_passwords=True),
+        "lazy-image-loading": _ScriptSpec(
+            lambda settings: LAZY_IMAGE_LOADING_SCRIPT % settings.get_int("lazy-loading-threshold"),
+            WebKit.UserScriptInjectionTime.END, WebKit.UserContentInjectedFrames.TOP_FRAME,
+            enable_key="enable-lazy-image-loading", source_keys=("lazy-loading-threshold",)),
+    }
+
+    def __init__(self, application):
+        self.settings = Gio.Settings.new(application.get_application_id())
+        self.scripts = {}  # name -> WebKit.UserScript, built on first use
+        # UserContentManager -> (whether it gets password scripts, names of the scripts added to it)
+        self.managers = weakref.WeakKeyDictionary()
+        self.builds = 0
+        self.swaps = 0
+
+        for name, spec in self.SCRIPTS.items():
+            for key in ((spec.enable_key,) if spec.enable_key else ()) + spec.source_keys:
+                self.settings.connect(f"changed::{key}", self._on_setting_changed, name)
+
+        debug_print("[PERF] User script registry initialized")
+
+    def _get_script(self, name: str) -> WebKit.UserScript:
+        script = self.scripts.get(name)
+        if script is None:
+            spec = self.SCRIPTS[name]
+            script = WebKit.UserScript.new(spec.build(self.settings), spec.injected_frames,
+                                           spec.injection_time, None, None)
+            self.scripts[name] = script
+            self.builds += 1
+        return script
+
+    def _is_wanted(self, name: str, with_passwords: bool) -> bool:
+        spec = self.SCRIPTS[name]
+        if spec.needs_passwords and not with_passwords:
+            return False
+        return spec.enable_key is None or self.settings.get_boolean(spec.enable_key)
+
+    def attach(self, user_content_manager: WebKit.UserContentManager, with_passwords: bool = False):
+        """Add the enabled scripts to a tab's UserContentManager and keep them in step with the settings."""
+        added = set()
+        for name in self.SCRIPTS:
+            if self._is_wanted(name, with_passwords):
+                user_content_manager.add_script(self._get_script(name))
+                added.add(name)
+        self.managers[user_content_manager] = (with_passwords, added)
+
+    def _on_setting_changed(self, settings, key: str, name: str):
+        """Swap a single script in every tab that uses it."""
+        old_script = self.scripts.get(name)
+        if key in self.SCRIPTS[name].source_keys:
+            self.scripts.pop(name, None)
+
+        for user_content_manager, (with_passwords, added) in list(self.managers.items()):
+            if name in added:
+                user_content_manager.remove_script(old_script)
+                added.discard(name)
+            if self._is_wanted(name, with_passwords):
+                user_content_manager.add_script(self._get_script(name))
+                added.add(name)
+                self.swaps += 1
+        debug_print(f"[PERF] Updated user script {name} after {key} changed")
+
+    def get_stats(self) -> dict:
+        """Get script build and sharing statistics."""
+        return {
+            'scripts_built': self.builds,
+            'scripts_cached': len(self.scripts),
+            'content_managers': len(self.managers),
+            'swaps': self.swaps,
+        }
+
+    def cleanup(self):
+        self.managers.clear()
+        self.scripts.clear()
+        debug_print("[PERF] User script registry cleaned up")
@@ -22,12 +22,21 @@ from .bookmark_manager import BookmarkManager
 from .ui_loader import UILoader
 from .omnibox_entry import OmniboxEntry
 from .reader_mode_preferences import ReaderModePreferencesPopover
+from .session_journal import SessionJournal
 
 
 class SeoltoirWindow(Adw.ApplicationWindow):
-    def __init__(self, application: Adw.Application, *args, **kwargs):
+    def __init__(self, application: Adw.Application, session_window: dict = None, open_homepage: bool = True, *args, **kwargs):
         super().__init__(application=application, *args, **kwargs)
 
+        # Window id groups this window's tabs in the saved session
+        if session_window:
+            self.window_id = session_window["window_id"]
+        elif hasattr(application, 'session_journal'):
+            self.window_id = application.session_journal.new_window_id()
+        else:
+            self.window_id = 1
+
         # Load UI from file
         builder = Gtk.Builder()
         builder.add_from_file(UILoader.get_ui_file_path('main-content.ui'))
@@ -74,22 +83,34 @@ class SeoltoirWindow(Adw.ApplicationWindow):
         self.forward_button.connect("clicked", self._on_forward_button_clicked)
         self.reload_button.connect("clicked", self._on_reload_button_clicked)
 
+        # Tab page -> [(object, handler id)] of the signals this window connected for it
+        self.page_handler_ids = {}
+
         # Connect tab_view signals to update address bar and button sensitivity
         self.tab_view.connect("page-attached", self._on_page_attached)
         self.tab_view.connect("page-detached", self._on_page_closed)
         self.tab_view.connect("notify::selected-page", self._on_selected_page_changed)
         self.tab_view.connect("notify::n-pages", self._on_n_pages_changed)
+        self.tab_view.connect("page-reordered", self._on_page_reordered)
+        self.tab_view.connect("create-window", self._on_create_window)
+
+        # Tabs detached while the window closes stay in the saved session
+        self.is_closing = False
+        self.connect("close-request", self._on_close_request)
 
         # Database Manager from the Application
         self.db_manager = application.db_manager
         
         # Create and add omnibox entry (after db_manager is available)
-        self.address_bar = OmniboxEntry(self.db_manager, application.search_engine_manager)
+        self.address_bar = OmniboxEntry(self.db_manager, application.search_engine_manager,
+                                        application.autocomplete_index, application.tab_index)
         self.address_bar_container.append(self.address_bar)
         
         # Connect omnibox signals
         self.address_bar.connect("navigate-requested", self._on_navigate_requested)
         self.address_bar.connect("suggestion-selected", self._on_suggestion_selected)
+        self.address_bar.connect("switch-to-tab-requested", self._on_switch_to_tab_requested)
+        self.address_bar.connect("top-suggestion-changed", self._on_top_suggestion_changed)
         
         # Connect other UI signals
         self.new_tab_button.connect("clicked", self._on_new_tab_clicked)
@@ -115,10 +136,19 @@ class SeoltoirWindow(Adw.ApplicationWindow):
         self.find_key_controller.connect("key-pressed", self._on_find_key_pressed)
         self.find_bar.add_controller(self.find_key_controller)
 
-        # Initial Tab - use GSettings for homepage
-        settings = Gio.Settings.new(self.get_application().get_application_id())
-        initial_homepage = settings.get_string("homepage")
-        self.open_new_tab_with_url(initial_homepage)
+        # Initial Tabs - restore the session window, or use GSettings for homepage
+        app = self.get_application()
+        if session_window:
+            self._restore_session_window(session_window)
+        elif open_homepage:
+            settings = Gio.Settings.new(app.get_application_id())
+            initial_homepage = settings.get_string("homepage")
+            self.open_new_tab_with_url(initial_homepage)
+
+        self.connect("notify::default-width", self._on_window_geometry_changed)
+        self.connect("notify::default-height", self._on_window_geometry_changed)
+        self.connect("notify::maximized", self._on_window_geometry_changed)
+        self._on_window_geometry_changed(self, None)
         
         # Mark startup as complete after a short delay to allow UI to settle
         GLib.timeout_add_seconds(1, self._mark_startup_complete)
@@ -215,7 +245,34 @@ class SeoltoirWindow(Adw.ApplicationWindow):
         current_page = self.tab_view.get_selected_page()
         if current_page:
             browser_view = current_page.get_child()
-            browser_view.load_url(url)
+            app = self.get_application()
+            if hasattr(app, 'speculative_loader'):
+                app.speculative_loader.navigation_started(browser_view, url)
+            prerendered_view = app.prerender_manager.take(browser_view, url) if hasattr(app, 'prerender_manager') else None
+            if prerendered_view:
+                self._swap_in_prerendered_view(current_page, prerendered_view, url)
+            else:
+                browser_view.load_url(url)
+
+    def _swap_in_prerendered_view(self, page, prerendered_view, url):
+        """Replace a tab with the hidden view that already loaded the page it navigates to."""
+        position = self.tab_view.get_page_position(page)
+        new_page = self.open_new_tab_with_url(url, prerendered_view=prerendered_view, pinned=page.get_pinned())
+        self.tab_view.reorder_page(new_page, position)
+        self.tab_view.close_page(page)
+        prerendered_view.finish_prerender()
+        self._on_browser_title_changed(prerendered_view, prerendered_view.get_title())
+
+    def _on_top_suggestion_changed(self, omnibox, url):
+        """Resolve or prerender the likely destination ahead of Enter, in the current tab's container."""
+        app = self.get_application()
+        current_page = self.tab_view.get_selected_page()
+        if not current_page:
+            return
+        if hasattr(app, 'speculative_loader'):
+            app.speculative_loader.top_suggestion_changed(current_page.get_child(), url)
+        if hasattr(app, 'prerender_manager'):
+            app.prerender_manager.top_suggestion_changed(current_page.get_child(), url)
     
     def _on_suggestion_selected(self, omnibox, url, title):
         """Handle suggestion selection from omnibox."""
@@ -226,6 +283,16 @@ class SeoltoirWindow(Adw.ApplicationWindow):
             browser_view = current_page.get_child()
             browser_view.load_url(url)
 
+    def _on_switch_to_tab_requested(self, omnibox, browser_view):
+        """Select an open tab, in whichever window it is, instead of loading its page again."""
+        for window in [self] + self._get_other_browser_windows():
+            page = window._get_page_for_child(browser_view)
+            if page:
+                window.tab_view.set_selected_page(page)
+                window.present()
+                return
+        debug_print("[OMNIBOX] Tab to switch to is no longer open")
+
     def _on_new_tab_action_activated(self, action, parameter):
         self._on_new_tab_clicked(None)
 
@@ -262,54 +329,71 @@ class SeoltoirWindow(Adw.ApplicationWindow):
         dialog.connect("response", self._on_new_container_tab_response, name_entry)
         dialog.present()
 
-    def open_new_tab_with_url(self, url: str, web_view: WebKit.WebView = None, is_private: bool = False, serialized_state: str = None, container_id: str = "default"):
+    def _restore_session_window(self, session_window: dict):
+        """Reopen the tabs of a saved window in their containers, keeping order, pins and selection."""
+        if session_window.get("width") and session_window.get("height"):
+            self.set_default_size(session_window["width"], session_window["height"])
+        if session_window.get("is_maximized"):
+            self.maximize()
+
+        selected_page = None
+        for tab in session_window["tabs"]:
+            page = self.open_new_tab_with_url(tab["url"], serialized_state=tab.get("serialized_state"),
+                                              container_id=tab.get("container_id") or "default",
+                                              session_key=tab.get("tab_key"), title=tab.get("title"),
+                                              pinned=tab.get("is_pinned", False), select=False)
+            if tab.get("is_selected") or selected_page is None:
+                selected_page = page
+        if selected_page:
+            self.tab_view.set_selected_page(selected_page)
+
+    def open_new_tab_with_url(self, url: str, web_view: WebKit.WebView = None, is_private: bool = False, serialized_state: bytes = None, container_id: str = "default", session_key: str = None, title: str = None, pinned: bool = False, select: bool = True, prerendered_view: SeoltoirBrowserView = None):
         # If is_private is True, always use container_id='private'
         if is_private:
             container_id = "private"
-        # Create a new browser view or use the provided one (for new windows)
-        if web_view:
+
+        # Check if we should defer loading for startup optimization
+        app = self.get_application()
+        is_initial_tab = self.tab_view.get_n_pages() == 0  # First tab
+        is_restored = session_key is not None
+        defer_loading = (not web_view and hasattr(app, 'performance_manager') and
+                         app.performance_manager.should_defer_tab_loading(is_initial_tab))
+
+        # Create a new browser view or use the provided one (for new windows and prerendered pages)
+        if prerendered_view:
+            browser_view = prerendered_view
+            defer_loading = False
+        elif web_view:
             # For WebViews created by WebKit itself (e.g., target=_blank), they initially
             # share the parent's context. We need to decide if they should inherit container
             # or be treated as default. For simplicity, they will inherit parent's container.
             parent_view = self.tab_view.get_selected_page().get_child() if self.tab_view.get_selected_page() else None
             browser_view = SeoltoirBrowserView.new_from_webkit_view(web_view, self.db_manager, parent_view.container_id if parent_view else "default")
         else:
-            browser_view = SeoltoirBrowserView(self.db_manager, is_private=is_private, container_id=container_id)
+            # Restored and deferred tabs start as a session record; the WebView is created
+            # and its back/forward history restored by ensure_webview()
+            restore_record = None
+            if is_restored or defer_loading:
+                restore_record = {"url": url, "title": title, "serialized_state": serialized_state}
+            browser_view = SeoltoirBrowserView(self.db_manager, is_private=is_private, container_id=container_id,
+                                               restore_record=restore_record)
             
-        # Tier 6: Restore WebKit Session State
-        if serialized_state:
-            try:
-                browser_view.webview.restore_session_state(GLib.Bytes.new(serialized_state.encode('latin1')))
-            except Exception as e:
-                debug_print(f"Error restoring session state for {url}: {e}")
-
-        # Connect signals
-        browser_view.connect("uri-changed", self._on_browser_uri_changed)
-        browser_view.connect("title-changed", self._on_browser_title_changed)
-        browser_view.connect("favicon-changed", self._on_browser_favicon_changed)
-        browser_view.connect("load-changed", self._on_browser_load_changed)
-        browser_view.connect("can-go-back-changed", self._on_browser_can_go_back_changed)
-        browser_view.connect("can-go-forward-changed", self._on_browser_can_go_forward_changed)
-        browser_view.connect("new-window-requested", self._on_new_window_requested)
-        #browser_view.connect("create-download", self.get_application().download_manager.add_download)
-        
-        # Connect view-specific signals for UI updates (not global)
-        browser_view.connect("blocked-count-changed", self._on_blocked_count_changed)
-        browser_view.connect("show-notification", self._on_show_notification)
-        browser_view.connect("zoom-level-changed", self._on_zoom_level_changed)
-        browser_view.connect("find-matches-found", self._on_find_matches_found)
-        browser_view.connect("load-changed", self._on_browser_load_progress_changed)
-        browser_view.connect("reader-mode-changed", self._on_reader_mode_changed)
+        # Key the tab in the session journal; restored tabs keep the key they were saved with
+        if not browser_view.is_private:
+            browser_view.session_key = session_key or SessionJournal.new_tab_key()
+        browser_view.session_window_id = self.window_id
 
         if is_private:
             page_title = "Private Tab"
             page_icon = "dialog-password-symbolic"  # More commonly available
         else:
-            page_title = "Loading..."
+            page_title = title or "Loading..."
             page_icon = "applications-internet"  # More commonly available
 
         page = self.tab_view.append(browser_view)
         page.set_title(page_title)
+        if pinned:
+            self.tab_view.set_page_pinned(page, True)
         try:
             icon = Gio.ThemedIcon.new(page_icon)
             debug_print(f"[DEBUG] Setting initial tab icon: {page_icon} -> {icon}")
@@ -324,43 +408,44 @@ class SeoltoirWindow(Adw.ApplicationWindow):
             except Exception as e2:
                 debug_print(f"[DEBUG] Error setting fallback icon: {e2}")
 
-        # Load the URL if no web_view was provided
-        if not web_view:
-            # Set the initial URL in the address bar
-            self.address_bar.set_url(url)
-            
-            # Check if we should defer loading for startup optimization
-            app = self.get_application()
-            is_initial_tab = self.tab_view.get_n_pages() == 1  # First tab
-            
-            if (hasattr(app, 'performance_manager') and 
-                hasattr(browser_view, 'tab_id') and
-                app.performance_manager.should_defer_tab_loading(is_initial_tab)):
-                
-                # Defer loading and show placeholder
-                app.performance_manager.defer_tab_loading(browser_view.tab_id, url, browser_view)
-                placeholder_html = app.performance_manager.create_lazy_loading_placeholder(url, "Loading...")
-                browser_view.webview.load_html(placeholder_html, None)
-            else:
-                # Load normally
-                browser_view.load_url(url)
-        
-        self.tab_view.set_selected_page(page)
-        
-        # Register tab with performance manager
-        app = self.get_application()
+        # Register tab with performance manager before selecting it, which loads deferred tabs
         if hasattr(app, 'performance_manager'):
             # Generate unique tab ID
             tab_id = f"tab_{int(time.time() * 1000)}_{id(browser_view)}"
             # Store tab ID in browser view for later reference
             browser_view.tab_id = tab_id
-            # Register with performance manager (mark as active since it's the new selected tab)
-            app.performance_manager.register_tab(tab_id, browser_view, is_active=True)
+            # Register with performance manager (mark as active if it becomes the selected tab)
+            app.performance_manager.register_tab(tab_id, browser_view, is_active=select)
+
+        # Load the URL if no web_view was provided
+        if not web_view and not prerendered_view:
+            if select:
+                # Set the initial URL in the address bar
+                self.address_bar.set_url(url)
+
+            if defer_loading:
+                # Background restores follow tab order
+                app.performance_manager.defer_tab_loading(browser_view.tab_id, browser_view,
+                                                          priority=self.tab_view.get_page_position(page))
+            elif browser_view.is_deferred():
+                browser_view.ensure_webview()
+            elif restore_record is None:
+                # Load normally
+                browser_view.load_url(url)
+        
+        if select:
+            self.tab_view.set_selected_page(page)
+
+        if hasattr(app, 'session_journal') and not is_restored:
+            app.session_journal.tab_opened(browser_view, self.window_id, self._get_session_key_before(page),
+                                           is_pinned=pinned)
         
         # Update address bar immediately for the initial page
-        if not web_view:
+        if not web_view and select:
             GLib.idle_add(self._update_address_bar_for_page, page)
 
+        return page
+
     def _on_back_button_clicked(self, button):
         current_page = self.tab_view.get_selected_page()
         if current_page:
@@ -384,6 +469,61 @@ class SeoltoirWindow(Adw.ApplicationWindow):
         if current_page and current_page.get_child() == browser_view:
             self.address_bar.set_url(uri)
 
+        app = self.get_application()
+        if hasattr(app, 'session_journal'):
+            app.session_journal.tab_navigated(browser_view)
+        if hasattr(app, 'tab_index'):
+            app.tab_index.update(browser_view, url=uri)
+
+    def _get_session_key_before(self, page):
+        """Get the session key of the closest journaled tab left of a page."""
+        for position in range(self.tab_view.get_page_position(page) - 1, -1, -1):
+            session_key = getattr(self.tab_view.get_nth_page(position).get_child(), 'session_key', None)
+            if session_key:
+                return session_key
+        return None
+
+    def _on_page_reordered(self, tab_view, page, position):
+        app = self.get_application()
+        if hasattr(app, 'session_journal'):
+            app.session_journal.tab_moved(page.get_child(), self.window_id, self._get_session_key_before(page))
+
+    def _on_page_pinned_changed(self, page, param):
+        app = self.get_application()
+        if hasattr(app, 'session_journal'):
+            app.session_journal.tab_pinned(page.get_child(), page.get_pinned())
+
+    def _on_window_geometry_changed(self, window, param):
+        app = self.get_application()
+        if hasattr(app, 'session_journal'):
+            width, height = self.get_default_size()
+            app.session_journal.window_changed(self.window_id, width, height, self.is_maximized())
+
+    def _on_create_window(self, tab_view):
+        """Open a new window for a tab dragged out of the tab bar."""
+        window = SeoltoirWindow(application=self.get_application(), open_homepage=False)
+        window.present()
+        return window.tab_view
+
+    def _get_other_browser_windows(self) -> list:
+        return [window for window in self.get_application().get_windows()
+                if isinstance(window, SeoltoirWindow) and window is not self]
+
+    def _on_close_request(self, window):
+        self.is_closing = True
+        app = self.get_application()
+        other_windows = self._get_other_browser_windows()
+        if other_windows:
+            # Closing one of several windows removes it from the session; the last one is kept
+            if hasattr(app, 'session_journal'):
+                app.session_journal.window_closed(self.window_id)
+            if app.window is self:
+                app.window = other_windows[0]
+        if hasattr(app, 'tab_index'):
+            for i in range(self.tab_view.get_n_pages()):
+                app.tab_index.remove(self.tab_view.get_nth_page(i).get_child())
+        return False
+
     def _get_page_for_child(self, child):
         # Helper to find the page for a given child in tab_view
         for i in range(self.tab_view.get_n_pages()):
@@ -393,6 +533,10 @@ class SeoltoirWindow(Adw.ApplicationWindow):
         return None
 
     def _on_browser_title_changed(self, browser_view, title):
+        app = self.get_application()
+        if hasattr(app, 'tab_index'):
+            app.tab_index.update(browser_view, title=title)
+
         page = self._get_page_for_child(browser_view)
         if page:
             # Show a fallback title if the page title is empty
@@ -490,17 +634,34 @@ class SeoltoirWindow(Adw.ApplicationWindow):
 
     def _on_page_attached(self, tab_view, page, position):
         browser_view = page.get_child()
-        browser_view.connect("uri-changed", self._on_browser_uri_changed)
-        browser_view.connect("title-changed", self._on_browser_title_changed)
-        browser_view.connect("favicon-changed", self._on_browser_favicon_changed)
-        browser_view.connect("load-changed", self._on_browser_load_changed)
-        browser_view.connect("can-go-back-changed", self._on_browser_can_go_back_changed)
-        browser_view.connect("can-go-forward-changed", self._on_browser_can_go_forward_changed)
-        browser_view.connect("new-window-requested", self._on_new_window_requested)
-        browser_view.connect("blocked-count-changed", self._on_blocked_count_changed)
-        browser_view.connect("show-notification", self._on_show_notification)
-        browser_view.connect("zoom-level-changed", self._on_zoom_level_changed)
-        browser_view.connect("find-matches-found", self._on_find_matches_found)
+
+        # A tab dragged in from another window moves to this window in the session
+        app = self.get_application()
+        if getattr(browser_view, 'session_window_id', self.window_id) != self.window_id:
+            browser_view.session_window_id = self.window_id
+            if hasattr(app, 'session_journal'):
+                app.session_journal.tab_opened(browser_view, self.window_id, self._get_session_key_before(page),
+                                               is_pinned=page.get_pinned())
+        # Connected here only, and disconnected when the page leaves, so a tab dragged to
+        # another window stops reporting to this one
+        self.page_handler_ids[page] = [(page, page.connect("notify::pinned", self._on_page_pinned_changed))] + [
+            (browser_view, browser_view.connect(signal, handler)) for signal, handler in (
+                ("uri-changed", self._on_browser_uri_changed),
+                ("title-changed", self._on_browser_title_changed),
+                ("favicon-changed", self._on_browser_favicon_changed),
+                ("load-changed", self._on_browser_load_changed),
+                ("load-changed", self._on_browser_load_progress_changed),
+                ("can-go-back-changed", self._on_browser_can_go_back_changed),
+                ("can-go-forward-changed", self._on_browser_can_go_forward_changed),
+                ("new-window-requested", self._on_new_window_requested),
+                ("blocked-count-changed", self._on_blocked_count_changed),
+                ("show-notification", self._on_show_notification),
+                ("zoom-level-changed", self._on_zoom_level_changed),
+                ("find-matches-found", self._on_find_matches_found),
+                ("reader-mode-changed", self._on_reader_mode_changed),
+            )]
+        if hasattr(app, 'tab_index'):
+            app.tab_index.update(browser_view)
 
     def _on_selected_page_changed(self, tab_view, param):
         # Update performance manager about tab changes
@@ -522,6 +683,7 @@ class SeoltoirWindow(Adw.ApplicationWindow):
                 app.performance_manager.set_tab_active(browser_view.tab_id, True)
                 # Load deferred tab if it's waiting
                 app.performance_manager.load_deferred_tab(browser_view.tab_id)
+            browser_view.ensure_webview()
             
             uri = browser_view.get_uri()
             # Always update address bar, even if URI is None initially
@@ -533,18 +695,38 @@ class SeoltoirWindow(Adw.ApplicationWindow):
             self._update_zoom_indicator(browser_view.get_zoom_level())
             # Update reader mode button state
             self._update_reader_mode_button_state()
-        else:
-            self.get_application().quit()
+
+            if hasattr(app, 'session_journal'):
+                app.session_journal.tab_selected(browser_view)
+            if hasattr(app, 'tab_index'):
+                app.tab_index.touch(browser_view)
+        elif not self.is_closing:
+            self.close()
 
     def _on_page_closed(self, tab_view, page):
+        for target, handler_id in self.page_handler_ids.pop(page, []):
+            target.disconnect(handler_id)
+
         # Unregister tab from performance manager
         browser_view = page.get_child()
         app = self.get_application()
         if hasattr(app, 'performance_manager') and hasattr(browser_view, 'tab_id'):
             app.performance_manager.unregister_tab(browser_view.tab_id)
+
+        if hasattr(app, 'session_journal') and not self.is_closing:
+            app.session_journal.tab_closed(browser_view)
+        if hasattr(app, 'tab_index'):
+            app.tab_index.remove(browser_view)
+        # A tab dragged to another window is attached there by then; a closed one is not
+        GLib.idle_add(self._cancel_background_work_if_closed, browser_view)
         
-        if self.tab_view.get_n_pages() == 0:
-            self.get_application().quit()
+        if self.tab_view.get_n_pages() == 0 and not self.is_closing:
+            self.close()
+
+    def _cancel_background_work_if_closed(self, browser_view) -> bool:
+        if browser_view.get_parent() is None:
+            browser_view.cancellation_token.cancel()
+        return False
 
     def _on_bookmark_current_page(self, action, parameter):
         current_page = self.tab_view.get_selected_page()
@@ -933,8 +1115,8 @@ class SeoltoirWindow(Adw.ApplicationWindow):
         self.tab_view.remove(page)
 
     def _on_n_pages_changed(self, tab_view, param):
-        if self.tab_view.get_n_pages() == 0:
-            self.get_application().quit()
+        if self.tab_view.get_n_pages() == 0 and not self.is_closing:
+            self.close()
 
     def _update_address_bar_for_page(self, page):
         browser_view = page.get_child()
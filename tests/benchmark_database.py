@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Database benchmark for Seoltoir browser.
+
+Builds synthetic browsing profiles in a temporary database and times every
+public DatabaseManager method, the omnibox suggestion queries (from the
+database and from the in-memory autocomplete index) and the session
+save/load round trip. Runs headless: only the standard library and the
+seoltoir database module are needed.
+
+Usage:
+    python tests/benchmark_database.py
+    python tests/benchmark_database.py --sizes 10000 --iterations 50 --json results.json
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from seoltoir.debug import set_debug_mode
+from seoltoir.database import DatabaseManager
+from seoltoir.autocomplete_index import AutocompleteIndex
+
+
+WORDS = (
+    "news weather github python gnome browser privacy linux kernel release notes "
+    "search video music recipe travel shop review guide docs issue pull request "
+    "forum wiki blog article photo map mail calendar sport science health games "
+    "finance market code library package download install config server cloud"
+).split()
+
+TLDS = ["com", "org", "net", "io", "dev", "ie", "de"]
+
+# Prefixes typed one character at a time when timing the omnibox path
+OMNIBOX_QUERIES = ["github", "python docs", "news", "wiki linux"]
+# The same, mistyped, for the fuzzy matching of the autocomplete index
+OMNIBOX_TYPOS = ["gihtub", "pyhton dcos", "nwes", "wkii linxu"]
+
+
+class Profile:
+    """Sizes of a synthetic browsing profile."""
+    def __init__(self, history_rows, bookmarks=10000, zoom_levels=2000,
+                 permissions=2000, notifications=5000, indexed_pages=2000):
+        self.history_rows = history_rows
+        self.bookmarks = bookmarks
+        self.zoom_levels = zoom_levels
+        self.permissions = permissions
+        self.notifications = notifications
+        self.indexed_pages = indexed_pages
+
+
+def percentile(sorted_samples, fraction):
+    index = min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+class Benchmark:
+    """Populates one profile and times the DatabaseManager API against it."""
+
+    def __init__(self, profile, iterations, seed=42):
+        self.profile = profile
+        self.iterations = iterations
+        self.random = random.Random(seed)
+        self.temp_dir = tempfile.mkdtemp(prefix="seoltoir-bench-")
+        self.db_path = os.path.join(self.temp_dir, "browser_data.db")
+        self.db = DatabaseManager(self.db_path)
+        self.hosts = []
+        self.history_urls = []
+        self.bookmark_urls = []
+        self.domains = []
+
+    def close(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    # Profile generation
+
+    def _host(self):
+        return f"{self.random.choice(WORDS)}{self.random.randint(0, 999)}.{self.random.choice(TLDS)}"
+
+    def _title(self, min_words=3, max_words=7):
+        return " ".join(self.random.choice(WORDS).capitalize()
+                        for _ in range(self.random.randint(min_words, max_words)))
+
+    def _url(self):
+        path = "/".join(self.random.choice(WORDS) for _ in range(self.random.randint(1, 4)))
+        return f"https://{self.random.choice(self.hosts)}/{path}/{self.random.randint(0, 10 ** 6)}"
+
+    def populate(self):
+        """Bulk-load the profile; triggers keep the full-text indexes in sync as in real use."""
+        profile = self.profile
+        self.hosts = list({self._host() for _ in range(max(100, profile.history_rows // 20))})
+        now = datetime.now()
+
+        conn = self.db._get_connection()
+        cursor = conn.cursor()
+
+        history = {}
+        while len(history) < profile.history_rows:
+            url = self._url()
+            last_visit = (now - timedelta(minutes=self.random.randint(0, 60 * 24 * 365))).isoformat()
+            history[url] = (url, self._title(), self.random.randint(1, 50), last_visit)
+        cursor.executemany(
+            "INSERT INTO history (url, title, visit_count, last_visit) VALUES (?, ?, ?, ?)",
+            history.values())
+        self.history_urls = list(history)
+
+        self.bookmark_urls = self.random.sample(self.history_urls, min(profile.bookmarks, len(self.history_urls)))
+        cursor.executemany(
+            "INSERT INTO bookmarks (url, title, added_date) VALUES (?, ?, ?)",
+            [(url, self._title(1, 4), now.isoformat()) for url in self.bookmark_urls])
+
+        self.domains = self.random.sample(self.hosts, min(len(self.hosts), profile.zoom_levels))
+        cursor.executemany(
+            "INSERT INTO zoom_levels (domain, zoom_level, last_updated) VALUES (?, ?, ?)",
+            [(domain, self.random.choice([0.8, 0.9, 1.1, 1.25, 1.5]), now.isoformat()) for domain in self.domains])
+        cursor.executemany(
+            "INSERT INTO notification_permissions (domain, permission, granted_date) VALUES (?, ?, ?)",
+            [(domain, self.random.choice(["allow", "deny"]), now.isoformat())
+             for domain in self.random.sample(self.hosts, min(len(self.hosts), profile.permissions))])
+        cursor.executemany(
+            "INSERT INTO notification_history (domain, title, body, timestamp) VALUES (?, ?, ?, ?)",
+            [(self.random.choice(self.hosts), self._title(), self._title(5, 15),
+              (now - timedelta(days=self.random.randint(0, 120))).isoformat())
+             for _ in range(profile.notifications)])
+        conn.commit()
+        conn.close()
+
+        pages = [(url, "\n".join(self._title(8, 20) for _ in range(40)))
+                 for url in self.random.sample(self.history_urls, min(profile.indexed_pages, len(self.history_urls)))]
+        for start in range(0, len(pages), 500):
+            self.db.store_page_contents(pages[start:start + 500])
+
+        for i in range(10):
+            self.db.add_search_engine(f"Engine {i}", f"https://engine{i}.example/search?q=%s",
+                                      keyword=f"e{i}", suggestions_url=f"https://engine{i}.example/s?q=%s",
+                                      is_default=(i == 0), is_builtin=True)
+
+        # Reopen like the browser does at startup, so in-memory state reflects the bulk-loaded rows
+        self.db = DatabaseManager(self.db_path)
+
+    # Benchmark cases: name -> (callable taking the iteration number, iterations)
+
+    def _session_tabs(self, count=50):
+        # Serialized back/forward lists are mostly URLs and titles, so they compress well
+        state = "\n".join(self.random.sample(self.history_urls, min(200, len(self.history_urls)))).encode()
+        return [{"url": url, "title": self._title(), "is_private": False, "serialized_state": state}
+                for url in self.random.sample(self.history_urls, min(count, len(self.history_urls)))]
+
+    def _omnibox_keystrokes(self, i):
+        """The database queries OmniboxEntry issues while a query is typed."""
+        query = OMNIBOX_QUERIES[i % len(OMNIBOX_QUERIES)]
+        self.db.get_history(limit=10)  # Empty entry on focus
+        for length in range(1, len(query) + 1):
+            prefix = query[:length]
+            self.db.search_history(prefix, limit=8)
+            self.db.search_bookmarks(prefix, limit=3)
+            if len(prefix) >= 3:
+                self.db.search_page_content(prefix, limit=6)
+
+    def _indexed_keystrokes(self, index, i, queries=OMNIBOX_QUERIES):
+        """The lookups OmniboxEntry makes once the autocomplete index is loaded."""
+        query = queries[i % len(queries)]
+        for length in range(1, len(query) + 1):
+            index.search(query[:length], limit=10)
+
+    def _remove_bench_engine(self, i):
+        engine_ids = [engine[0] for engine in self.db.get_search_engines() if engine[1] == f"Bench {i}"]
+        self.db.remove_search_engine(engine_ids[0] if engine_ids else -1)
+
+    def _session_round_trip(self, tabs):
+        self.db.save_session(tabs)
+        self.db.load_session()
+
+    def _journal_records(self, i, tabs):
+        """One journal flush: a navigation in an open tab, a new tab every few flushes."""
+        tab = tabs[i % len(tabs)]
+        records = [("navigate", tab["tab_key"], {**tab, "url": self.random.choice(self.history_urls)})]
+        if i % 5 == 0:
+            records.append(("open", f"bench-{i}", {**tab, "after": tab["tab_key"]}))
+        return records
+
+    def cases(self):
+        db = self.db
+        n = self.iterations
+        pick = self.random.choice
+        new_urls = [f"https://new{i}.example/page" for i in range(n)]
+        new_bookmarks = [f"https://bookmark{i}.example/" for i in range(n)]
+        session_tabs = self._session_tabs()
+        db.save_session(session_tabs)
+        journaled_tabs = db.load_session()
+        engine_id = db.get_default_search_engine()[0]
+        index = AutocompleteIndex()
+
+        # Read-only and additive cases first; destructive ones run last on the populated profile
+        return [
+            ("add_history_entry (new)", lambda i: db.add_history_entry(new_urls[i], "New page"), n),
+            ("add_history_entry (revisit)", lambda i: db.add_history_entry(pick(self.history_urls), "Revisit"), n),
+            ("get_history", lambda i: db.get_history(), n),
+            ("get_history_batch", lambda i: db.get_history_batch(i * 5000, 5000), n),
+            ("search_history", lambda i: db.search_history(pick(WORDS)[:3], limit=8), n),
+            ("store_page_contents", lambda i: db.store_page_contents(
+                [(pick(self.history_urls), self._title(50, 100))]), n),
+            ("search_page_content", lambda i: db.search_page_content(pick(WORDS), limit=20), n),
+            ("add_bookmark", lambda i: db.add_bookmark(new_bookmarks[i], "New bookmark"), n),
+            ("get_bookmarks", lambda i: db.get_bookmarks(), max(5, n // 10)),
+            ("search_bookmarks", lambda i: db.search_bookmarks(pick(WORDS)[:3], limit=3), n),
+            ("is_bookmarked", lambda i: db.is_bookmarked(pick(self.history_urls)), n),
+            ("get_all_non_bookmarked_domains", lambda i: db.get_all_non_bookmarked_domains(), max(3, n // 20)),
+            ("save_session", lambda i: db.save_session(session_tabs), max(5, n // 10)),
+            ("load_session", lambda i: db.load_session(), max(5, n // 10)),
+            ("session round trip (50 tabs)", lambda i: self._session_round_trip(session_tabs), max(5, n // 10)),
+            ("append_session_journal", lambda i: db.append_session_journal(
+                self._journal_records(i, journaled_tabs)), n),
+            ("load_session_with_journal", lambda i: db.load_session_with_journal(), max(5, n // 10)),
+            ("load_session_windows", lambda i: db.load_session_windows(), max(5, n // 10)),
+            ("compact_session_journal", lambda i: db.compact_session_journal(), max(3, n // 20)),
+            ("get_zoom_level", lambda i: db.get_zoom_level(pick(self.domains)), n),
+            ("set_zoom_level", lambda i: db.set_zoom_level(pick(self.domains), 1.1), n),
+            ("get_all_zoom_levels", lambda i: db.get_all_zoom_levels(), max(5, n // 10)),
+            ("get_search_engines", lambda i: db.get_search_engines(), n),
+            ("get_search_engine_by_id", lambda i: db.get_search_engine_by_id(engine_id), n),
+            ("get_search_engine_by_keyword", lambda i: db.get_search_engine_by_keyword("e3"), n),
+            ("get_default_search_engine", lambda i: db.get_default_search_engine(), n),
+            ("search_engines_exist", lambda i: db.search_engines_exist(), n),
+            ("add_search_engine", lambda i: db.add_search_engine(f"Bench {i}", "https://b.example/?q=%s"), n),
+            ("update_search_engine", lambda i: db.update_search_engine(
+                engine_id, "Engine 0", "https://engine0.example/search?q=%s", keyword="e0", is_default=True), n),
+            ("set_default_search_engine", lambda i: db.set_default_search_engine(engine_id), n),
+            ("update_search_engine_last_used", lambda i: db.update_search_engine_last_used(engine_id), n),
+            ("update_search_engines_last_used", lambda i: db.update_search_engines_last_used(
+                {engine_id: datetime.now().isoformat()}), n),
+            ("reorder_search_engines", lambda i: db.reorder_search_engines(
+                [(engine_id, i % 10)]), n),
+            ("set_opensearch_discoveries", lambda i: db.set_opensearch_discoveries(
+                [(f"https://{pick(self.hosts)}", "[]", (datetime.now() + timedelta(days=7)).isoformat())]), n),
+            ("get_opensearch_discoveries", lambda i: db.get_opensearch_discoveries(), max(5, n // 10)),
+            ("prune_opensearch_discoveries", lambda i: db.prune_opensearch_discoveries(), max(5, n // 10)),
+            ("set_notification_permission", lambda i: db.set_notification_permission(pick(self.hosts), "allow"), n),
+            ("get_notification_permission", lambda i: db.get_notification_permission(pick(self.hosts)), n),
+            ("update_notification_last_used", lambda i: db.update_notification_last_used(pick(self.hosts)), n),
+            ("get_all_notification_permissions", lambda i: db.get_all_notification_permissions(), max(5, n // 10)),
+            ("log_notification", lambda i: db.log_notification(pick(self.hosts), "Title", "Body"), n),
+            ("get_notification_history", lambda i: db.get_notification_history(), n),
+            ("get_database_stats", lambda i: db.get_database_stats(), max(5, n // 10)),
+            ("get_session_state_stats", lambda i: db.get_session_state_stats(), max(5, n // 10)),
+            ("omnibox suggestions (typed query)", self._omnibox_keystrokes, max(5, n // 5)),
+            ("add_change_listener (autocomplete index)", lambda i: db.add_change_listener(
+                index.on_database_change), 1),
+            ("autocomplete index build", lambda i: index.build(db), 1),
+            ("autocomplete index search (typed query)", lambda i: self._indexed_keystrokes(index, i), n),
+            ("autocomplete index search (typos)", lambda i: self._indexed_keystrokes(index, i, OMNIBOX_TYPOS), n),
+            ("autocomplete index update (visit)", lambda i: db.add_history_entry(
+                pick(self.history_urls), "Revisit"), n),
+            # Destructive
+            ("remove_bookmark", lambda i: db.remove_bookmark(new_bookmarks[i]), n),
+            ("remove_zoom_level", lambda i: db.remove_zoom_level(self.domains[i % len(self.domains)]), n),
+            ("remove_notification_permission", lambda i: db.remove_notification_permission(pick(self.hosts)), n),
+            ("remove_search_engine", self._remove_bench_engine, n),
+            ("prune_history (one batch)", lambda i: db.prune_history(
+                max_age_days=300, keep_bookmarked=True, keep_frecency=5.0), 3),
+            ("prune_notification_history (one batch)", lambda i: db.prune_notification_history(60), 3),
+            ("enable_incremental_vacuum", lambda i: db.enable_incremental_vacuum(), 1),
+            ("incremental_vacuum", lambda i: db.incremental_vacuum(), 3),
+            ("optimize", lambda i: db.optimize(), 1),
+            ("clear_notification_history", lambda i: db.clear_notification_history(), 1),
+            ("clear_history", lambda i: db.clear_history(), 1),
+        ]
+
+    def run(self):
+        started = time.perf_counter()
+        self.populate()
+        populate_seconds = time.perf_counter() - started
+        size_after_populate = self._file_size()
+
+        cases = self.cases()
+        results = []
+        for name, function, iterations in cases:
+            samples = []
+            for i in range(iterations):
+                t0 = time.perf_counter()
+                function(i)
+                samples.append((time.perf_counter() - t0) * 1000.0)
+            samples.sort()
+            results.append({
+                "name": name,
+                "iterations": iterations,
+                "p50_ms": percentile(samples, 0.50),
+                "p95_ms": percentile(samples, 0.95),
+                "p99_ms": percentile(samples, 0.99),
+                "max_ms": samples[-1],
+            })
+
+        return {
+            "history_rows": self.profile.history_rows,
+            "populate_seconds": populate_seconds,
+            "db_size_bytes": size_after_populate,
+            "db_size_after_bytes": self._file_size(),
+            "results": results,
+            "uncovered_methods": uncovered_methods([name for name, _, _ in cases]),
+        }
+
+    def _file_size(self):
+        return sum(os.path.getsize(self.db_path + suffix)
+                   for suffix in ("", "-wal") if os.path.exists(self.db_path + suffix))
+
+
+def uncovered_methods(case_names):
+    """Public DatabaseManager methods without a benchmark case."""
+    public = [name for name in dir(DatabaseManager)
+              if not name.startswith("_") and callable(getattr(DatabaseManager, name))]
+    return [name for name in public if not any(case.split(" ")[0] == name for case in case_names)]
+
+
+def print_report(report):
+    print(f"\n=== {report['history_rows']:,} history rows "
+          f"(populated in {report['populate_seconds']:.1f}s, "
+          f"DB {report['db_size_bytes'] / 1048576:.1f} MiB) ===")
+    print(f"{'case':<42}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for result in report["results"]:
+        print(f"{result['name']:<42}{result['iterations']:>6}"
+              f"{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}"
+              f"{result['p99_ms']:>10.3f}{result['max_ms']:>10.3f}")
+    print(f"DB size after run: {report['db_size_after_bytes'] / 1048576:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Seoltoir's DatabaseManager")
+    parser.add_argument("--sizes", default="10000,100000,1000000",
+                        help="Comma-separated history row counts to benchmark")
+    parser.add_argument("--iterations", type=int, default=100,
+                        help="Samples per benchmark case")
+    parser.add_argument("--json", help="Write results to this file as JSON")
+    parser.add_argument("--strict", action="store_true",
+                        help="Fail if a public DatabaseManager method has no benchmark case")
+    args = parser.parse_args()
+
+    set_debug_mode(False)
+    reports = []
+    missing = []
+    for size in (int(value) for value in args.sizes.split(",")):
+        benchmark = Benchmark(Profile(history_rows=size), args.iterations)
+        try:
+            report = benchmark.run()
+        finally:
+            benchmark.close()
+        print_report(report)
+        reports.append(report)
+        missing = report["uncovered_methods"]
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+
+    if missing:
+        print(f"\nPublic methods without a benchmark case: {', '.join(missing)}")
+        if args.strict:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())